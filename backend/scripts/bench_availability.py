@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска цепочек подряд идущих свободных слотов на плотном дне: проход по списку слотов (как было)
+против битовых масок DayAvailability для свободных слотов и для цепочки брони.
+
+Запуск: python scripts/bench_availability.py [--slot-minutes 15] [--capacity 20] [--repeat 200]
+"""
+
+import argparse
+import random
+import sys
+import time as timer
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import List
+
+# Добавляем путь к src в sys.path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from src.services.availability import DayAvailability, DaySlot
+from src.services.booking import BookingService
+
+
+def make_day(slot_minutes: int, capacity: int, users: int, seed: int = 1) -> List[DaySlot]:
+    """Плотный день: слоты с 06:00 до 23:00 без разрывов, заполнены на 0-100%"""
+    rng = random.Random(seed)
+    start = datetime.combine(date.today(), time(6, 0))
+    slots = []
+    while start.time() < time(23, 0):
+        visitors = frozenset(rng.sample(range(1, users + 1), rng.randint(0, capacity)))
+        end = start + timedelta(minutes=slot_minutes)
+        slots.append(DaySlot(
+            id=len(slots) + 1, date=start.date(), start_time=start.time(), end_time=end.time(),
+            capacity=capacity, occupied=len(visitors), visitors=visitors,
+        ))
+        start = end
+    return slots
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def free_slots_before(slots: List[DaySlot], user_id: int, training_duration: int) -> List[DaySlot]:
+    # Прежний TimeslotService.get_free_slots: фильтр под пользователя и проход с конца дня по цепочкам
+    available = [slot for slot in slots if slot.is_available_for(user_id)]
+    training_slots, chain_end, next_start = [], None, None
+    for slot in reversed(available):
+        if slot.end_time != next_start:
+            chain_end = _minutes(slot.end_time)
+        next_start = slot.start_time
+        if chain_end - _minutes(slot.start_time) >= training_duration:
+            training_slots.append(slot)
+    training_slots.reverse()
+    return training_slots
+
+
+def select_chain_before(slots: List[DaySlot], start_time: time, end_time: time) -> List[DaySlot]:
+    # Прежний BookingService._select_chain: поиск начала и проверка end_time == start_time соседей
+    chain = []
+    for slot in slots:
+        if slot.start_time == start_time:
+            chain.append(slot)
+        elif chain:
+            if chain[-1].end_time != slot.start_time:
+                break
+            chain.append(slot)
+        if chain and chain[-1].end_time >= end_time:
+            return chain
+    return []
+
+
+def measure(func, repeat: int) -> float:
+    func()  # прогрев
+    started = timer.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (timer.perf_counter() - started) / repeat * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slot-minutes", type=int, default=15)
+    parser.add_argument("--capacity", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    slots = make_day(args.slot_minutes, args.capacity, args.users)
+    # Слоты, свободные для пользователя: так их возвращает запрос get_free_timeslots_by_date при бронировании
+    user_id = 1
+    free = [slot for slot in slots if slot.is_available_for(user_id)]
+    day = DayAvailability(slots)
+    print(f"слотов в дне: {len(slots)}, свободных для пользователя: {len(free)}")
+    build = measure(lambda: DayAvailability(slots), args.repeat)
+    print(f"построение DayAvailability (один раз на заполнение кэша): {build:.1f} мкс")
+    print(f"{'запрос':<28} {'до, мкс':>9} {'после, мкс':>11} {'ускорение':>10}")
+
+    for duration in (60, 120, 180):
+        assert free_slots_before(slots, user_id, duration) == day.training_starts(duration, user_id=user_id)
+        before = measure(lambda: free_slots_before(slots, user_id, duration), args.repeat)
+        # Маска пользователя считается при первом его запросе к дню - сбрасываем, чтобы замер её включал
+        after = measure(lambda: (day._user_masks.clear(), day.training_starts(duration, user_id=user_id)), args.repeat)
+        print(f"{f'свободные слоты, {duration} мин':<28} {before:>9.1f} {after:>11.1f} {before / after:>9.1f}x")
+
+    # Бронирование строит DayAvailability из свежих строк базы на каждый запрос, поэтому построение входит в замер:
+    # на нескольких слотах интервала оно дороже прохода по списку, но это микросекунды рядом с запросами к базе.
+    # Раньше запрос возвращал все свободные слоты дня, теперь только начинающиеся внутри запрошенного интервала
+    start_time = day.training_starts(90, user_id=user_id)[-1].start_time
+    end_time = (datetime.combine(date.today(), start_time) + timedelta(minutes=90)).time()
+    window = [slot for slot in free if start_time <= slot.start_time < end_time]
+    for candidates in (free, window):
+        assert BookingService._select_chain(candidates, str(start_time), start_time, end_time) == window
+    before = measure(lambda: select_chain_before(free, start_time, end_time), args.repeat)
+    after = measure(lambda: BookingService._select_chain(window, str(start_time), start_time, end_time), args.repeat)
+    print(f"{'цепочка брони, 90 мин':<28} {before:>9.1f} {after:>11.1f} {before / after:>9.1f}x")
+    after = measure(lambda: BookingService._select_chain(free, str(start_time), start_time, end_time), args.repeat)
+    print(f"{'  по всем слотам дня':<28} {before:>9.1f} {after:>11.1f} {before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации списочных ответов: стоимость на 1000 слотов (и 1000 броней)
+до и после перехода на json_response (один проход TypeAdapter сразу в байты).
+
+Запуск: python scripts/bench_serialization.py [--slots 1000] [--repeat 50]
+"""
+
+import argparse
+import asyncio
+import sys
+import time as timer
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+# Добавляем путь к src в sys.path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.models.schemas import AvailablePeriods, CompactSlots, TimeSlotInfoVisitors, UserBookingInfo, UserSlotInfo
+from src.services.availability import DaySlot
+from src.utilities.json_response import json_response
+
+
+def make_slots(count: int) -> List[DaySlot]:
+    start = datetime.combine(date.today(), time(0, 0))
+    slots = []
+    for i in range(count):
+        slot_start = start + timedelta(minutes=30 * i)
+        slots.append(DaySlot(
+            id=i + 1, date=slot_start.date(), start_time=slot_start.time(),
+            end_time=(slot_start + timedelta(minutes=30)).time(),
+            capacity=4, occupied=i % 4, visitors=frozenset(1000 + k for k in range(i % 4)),
+        ))
+    return slots
+
+
+def make_bookings(count: int, slots: List[DaySlot]):
+    """Объекты с атрибутами как у ORM-броней с загруженными time_slots"""
+    return [
+        SimpleNamespace(
+            id=i + 1, date=slot.date, start_time=slot.start_time, end_time=slot.end_time,
+            time_slots=[SimpleNamespace(id=slot.id, start_time=slot.start_time, end_time=slot.end_time, date=slot.date)],
+        )
+        for i, slot in zip(range(count), slots)
+    ]
+
+
+def slots_before(slots: List[DaySlot]) -> bytes:
+    # Прежний ответ: модели с visitors по одной, затем jsonable_encoder (эндпоинт без response_model)
+    # и json.dumps в JSONResponse
+    result = {"available_periods": [
+        TimeSlotInfoVisitors(
+            id=slot.id, start_time=slot.start_time, end_time=slot.end_time, date=slot.date,
+            visitors=[UserSlotInfo(telegram_id=telegram_id) for telegram_id in sorted(slot.visitors)],
+        )
+        for slot in slots
+    ]}
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+BOOKINGS_FIELD = create_model_field(name="Response_bookings", type_=List[UserBookingInfo], mode="serialization")
+
+
+def bookings_before(bookings) -> bytes:
+    # from_orm для каждой брони, повторная валидация по response_model и json.dumps в JSONResponse
+    result = [UserBookingInfo.model_validate(booking) for booking in bookings]
+    content = asyncio.run(serialize_response(field=BOOKINGS_FIELD, response_content=result))
+    return JSONResponse(content).body
+
+
+def compact_after(slots: List[DaySlot]) -> bytes:
+    return json_response(CompactSlots, {
+        "date": slots[0].date,
+        "slots": [(slot.start_minutes, slot.duration, slot.remaining) for slot in slots],
+    }).body
+
+
+def measure(func, payload, repeat: int) -> float:
+    func(payload)  # прогрев: построение валидаторов и кэшей
+    started = timer.perf_counter()
+    for _ in range(repeat):
+        func(payload)
+    return (timer.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    slots = make_slots(args.slots)
+    bookings = make_bookings(args.slots, slots)
+    # Ответ слотов изменил формат (без visitors, есть compact), поэтому сверяется только ответ броней
+    cases = [
+        ("slots", slots_before, lambda data: json_response(AvailablePeriods, {"available_periods": data}).body, slots),
+        ("compact", slots_before, compact_after, slots),
+        ("bookings", bookings_before, lambda data: json_response(List[UserBookingInfo], data).body, bookings),
+    ]
+    assert bookings_before(bookings).replace(b" ", b"") == json_response(List[UserBookingInfo], bookings).body
+    per = 1000 / args.slots
+    print(f"{'ответ':<10} {'до, мс/1000':>12} {'после, мс/1000':>15} {'ускорение':>10}")
+    for name, before, after, payload in cases:
+        before_ms = measure(before, payload, args.repeat) * per
+        after_ms = measure(after, payload, args.repeat) * per
+        print(f"{name:<10} {before_ms:>12.2f} {after_ms:>15.2f} {before_ms / after_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
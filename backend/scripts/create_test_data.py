@@ -13,74 +13,23 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
-from src.repository.db import engine
+from src.repository.db import async_session, init_engine
 from src.models.db import TimeSlot, User
+from src.repository.crud import ScheduleCRUDRepository
+from src.services.schedule import ScheduleService
 from sqlmodel import Session, select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import async_sessionmaker
 
-# Создаем асинхронную сессию
-async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Создаем движок для сессий async_session
+init_engine()
 
 async def create_test_timeslots():
-    """Создает тестовые таймслоты на ближайшие 7 дней"""
+    """Создает таймслоты на ближайшие 7 дней по шаблону расписания (как create_schedule.py)"""
     print("🎯 Создание тестовых таймслотов...")
-    
-    # Временные слоты для тренировок
-    time_slots = [
-        (time(9, 0), time(10, 0)),   # 9:00 - 10:00
-        (time(10, 0), time(11, 0)),  # 10:00 - 11:00
-        (time(11, 0), time(12, 0)),  # 11:00 - 12:00
-        (time(14, 0), time(15, 0)),  # 14:00 - 15:00
-        (time(15, 0), time(16, 0)),  # 15:00 - 16:00
-        (time(16, 0), time(17, 0)),  # 16:00 - 17:00
-        (time(17, 0), time(18, 0)),  # 17:00 - 18:00
-        (time(18, 0), time(19, 0)),  # 18:00 - 19:00
-        (time(19, 0), time(20, 0)),  # 19:00 - 20:00
-    ]
-    
-    # Названия дней недели
-    weekdays = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
-    
-    # Создаем таймслоты на ближайшие 7 дней
-    today = date.today()
-    created_count = 0
-    
+
     async with async_session() as session:
-        # Проверяем, есть ли уже таймслоты
-        result = await session.exec(select(TimeSlot))
-        existing_slots = result.all()
-        
-        if existing_slots:
-            print(f"⚠️  Найдено {len(existing_slots)} существующих таймслотов")
-            response = input("Создать дополнительные таймслоты? (y/n): ")
-            if response.lower() != 'y':
-                print("❌ Создание отменено")
-                return
-        
-        for day_offset in range(7):  # Следующие 7 дней
-            current_date = today + timedelta(days=day_offset)
-            weekday_name = weekdays[current_date.weekday()]
-            
-            # Пропускаем воскресенье (день отдыха)
-            if current_date.weekday() == 6:  # 6 = воскресенье
-                continue
-                
-            for start_time, end_time in time_slots:
-                # Создаем таймслот
-                timeslot = TimeSlot(
-                    date=current_date,
-                    start_time=start_time,
-                    end_time=end_time,
-                    weekday=weekday_name
-                )
-                
-                session.add(timeslot)
-                created_count += 1
-        
-        # Сохраняем изменения
-        await session.commit()
-        print(f"✅ Создано {created_count} таймслотов")
+        result = await ScheduleService(schedule_repo=ScheduleCRUDRepository(async_session=session)).generate(days=7)
+    print(f"✅ Создано {result.created} таймслотов, уже было {result.existing}")
 
 async def create_test_users():
     """Создает тестовых пользователей"""
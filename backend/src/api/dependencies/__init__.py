@@ -1,2 +1,4 @@
+from .admin import require_admin
+from .rate_limit import rate_limit
 from .repository import get_repository
-from .session import get_async_session
\ No newline at end of file
+from .session import get_async_session, get_primary_session
@@ -0,0 +1,21 @@
+import fastapi
+from fastapi import HTTPException, status
+
+from src.api.dependencies.repository import get_repository
+from src.repository.crud import UserCRUDRepository
+from src.repository.crud.user import UserInfo
+
+
+async def require_admin(
+        admin_telegram_id: int = fastapi.Query(..., description="ID администратора в Telegram"),
+        user_repo: UserCRUDRepository = fastapi.Depends(get_repository(repo_type=UserCRUDRepository)),
+) -> UserInfo:
+    """
+    Зависимость для маршрутов администратора: 401, если пользователя с admin_telegram_id нет, 403 - если он не администратор
+    """
+    admin = await user_repo.get_user_info(admin_telegram_id)
+    if not admin:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Пользователь не найден")
+    if not admin.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступно только администратору")
+    return admin
@@ -0,0 +1,105 @@
+import math
+import os
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from src.utilities.rate_limit import RateLimit, parse_rate_limit, rate_limiter
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# Брать IP клиента из X-Forwarded-For (за ngrok или другим прокси); без прокси заголовок подделывается
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+# Во сколько раз лимит на IP мягче лимита на пользователя (telegram_id из запроса не проверяется и может меняться).
+# По умолчанию выключено: за общим прокси или у бота все пользователи приходят с одного адреса
+RATE_LIMIT_IP_MULTIPLIER = int(os.getenv("RATE_LIMIT_IP_MULTIPLIER", "0"))
+# Адреса через запятую (прокси, бот), запросы с которых не списываются с корзины IP
+RATE_LIMIT_TRUSTED_IPS = frozenset(
+    ip.strip() for ip in os.getenv("RATE_LIMIT_TRUSTED_IPS", "").split(",") if ip.strip()
+)
+
+# Лимиты по умолчанию: "запросов/секунд". Переопределяются переменными RATE_LIMIT_<ИМЯ>, например RATE_LIMIT_SLOTS=40/10
+DEFAULT_RATE_LIMITS = {
+    "slots": "20/10",
+    "user_bookings": "20/10",
+    "booking_write": "10/60",
+    "auth": "10/60",
+}
+
+
+def get_rate_limit(name: str) -> Optional[RateLimit]:
+    if not RATE_LIMIT_ENABLED:
+        return None
+    return parse_rate_limit(os.getenv(f"RATE_LIMIT_{name.upper()}", DEFAULT_RATE_LIMITS.get(name, "0")))
+
+
+def get_ip_rate_limit(name: str) -> Optional[RateLimit]:
+    """
+    Лимит на IP для запросов с telegram_id: RATE_LIMIT_<ИМЯ>_IP или лимит маршрута, умноженный на
+    RATE_LIMIT_IP_MULTIPLIER. None, если ни то, ни другое не задано
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+    value = os.getenv(f"RATE_LIMIT_{name.upper()}_IP")
+    if value is not None:
+        return parse_rate_limit(value)
+    limit = get_rate_limit(name)
+    if limit is None or RATE_LIMIT_IP_MULTIPLIER <= 0:
+        return None
+    return RateLimit(requests=limit.requests * RATE_LIMIT_IP_MULTIPLIER, seconds=limit.seconds)
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def rate_limit_key(request: Request) -> str:
+    """
+    Ключ лимита: telegram_id из пути, параметров запроса или JSON-тела ({"telegram_id": ...} или
+    {"user": {"telegram_id": ...}}), иначе IP клиента. Тело к этому моменту уже прочитано FastAPI и закэшировано.
+    """
+    telegram_id = request.path_params.get("telegram_id") or request.query_params.get("telegram_id")
+    if telegram_id is None and request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            user = body.get("user")
+            telegram_id = user.get("telegram_id") if isinstance(user, dict) else body.get("telegram_id")
+    if telegram_id is not None:
+        return f"user:{telegram_id}"
+    return f"ip:{client_ip(request)}"
+
+
+def rate_limit(name: str):
+    """
+    Зависимость для маршрута: dependencies=[Depends(rate_limit("slots"))]. Выполняется до открытия сессии с базой;
+    при исчерпании лимита отвечает 429 с Retry-After.
+    Если задан лимит на IP, запрос с telegram_id списывает токен и из корзины пользователя, и из более мягкой
+    корзины его IP (имя "<имя>_ip"), так что подстановка разных telegram_id с одного адреса не обходит лимит.
+    Адреса из RATE_LIMIT_TRUSTED_IPS с корзины IP не списываются.
+    """
+    limit = get_rate_limit(name)
+    ip_limit = get_ip_rate_limit(name)
+
+    async def check_rate_limit(request: Request) -> None:
+        if limit is None:
+            return
+        key = await rate_limit_key(request)
+        retry_after = await rate_limiter.hit(name, key, limit)
+        if ip_limit is not None and key.startswith("user:"):
+            ip = client_ip(request)
+            if ip not in RATE_LIMIT_TRUSTED_IPS:
+                retry_after = max(retry_after, await rate_limiter.hit(f"{name}_ip", f"ip:{ip}", ip_limit))
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Слишком много запросов, повторите позже",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    return check_rate_limit
@@ -6,15 +6,22 @@ from sqlalchemy.ext.asyncio import (
     AsyncSession as SQLAlchemyAsyncSession,
 )
 
-from src.api.dependencies.session import get_async_session
+from src.api.dependencies.session import get_async_session, get_primary_session
 from src.repository.crud import BaseCRUDRepository
 
 
 def get_repository(
         repo_type: typing.Type[BaseCRUDRepository],
+        primary: bool = False,
 ) -> typing.Callable[[SQLAlchemyAsyncSession], BaseCRUDRepository]:
+    """
+    Репозиторий на сессии запроса (чтения GET-запросов идут на реплику).
+    primary=True - репозиторий на отдельной сессии основной базы, для чтений, которым нельзя отставать
+    """
+    session_dependency = get_primary_session if primary else get_async_session
+
     def _get_repo(
-            async_session: SQLAlchemyAsyncSession = fastapi.Depends(get_async_session),
+            async_session: SQLAlchemyAsyncSession = fastapi.Depends(session_dependency),
     ) -> BaseCRUDRepository:
         return repo_type(async_session=async_session)
 
@@ -1,14 +1,28 @@
-import os
-
-from sqlmodel import SQLModel
+from fastapi import Request
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from src.repository.db import engine
+
+from src.repository.db import async_session, route_reads_to_replica
+from src.repository.routing import user_write_key, written_recently
+
+# Методы, запросы которых ничего не меняют и могут читать с реплики
+READ_METHODS = {"GET", "HEAD"}
+
+
+async def get_async_session(request: Request) -> AsyncSession:
+    """
+    Сессия на запрос. GET-запросы читают с реплики (если она настроена), кроме запросов пользователя,
+    который только что что-то изменил: его чтения READ_YOUR_WRITES_SECONDS секунд идут на основную базу.
+    Запись в сессии в любом случае переключает её на основную базу.
+    """
+    async with async_session() as session:
+        if request.method in READ_METHODS:
+            telegram_id = request.path_params.get("telegram_id") or request.query_params.get("telegram_id")
+            if not (telegram_id and await written_recently(user_write_key(telegram_id))):
+                route_reads_to_replica(session)
+        yield session
 
 
-async def get_async_session() -> AsyncSession:
-    async_session = async_sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
+async def get_primary_session() -> AsyncSession:
+    """Сессия только на основной базе, для чтений, которым нельзя отставать"""
     async with async_session() as session:
         yield session
@@ -1,17 +1,33 @@
 from datetime import date
-from fastapi import APIRouter, Depends, Response, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 import logging
 
 from src.models.schemas import (
+    AdminBookingInfo,
+    BookingPage,
+    BookingStatsInfo,
     UserBookingInfo,
     BookingInfo,
     UserId,
 )
-from src.api.dependencies import get_repository
+from src.api.dependencies import get_repository, rate_limit, require_admin
 from src.repository.crud import BookingCRUDRepository, TimeslotCRUDRepository, UserCRUDRepository
+from src.services.availability import get_user_bookings_version
 from src.services.booking import BookingService
-from src.utilities.exceptions import UserNotFoundException, BookingNotFoundException, BookingRequestException
+from src.services.export import EXPORT_MEDIA_TYPES, export_bookings as export_bookings_stream
+from src.utilities.pagination import decode_booking_cursor, encode_booking_cursor
+from src.utilities.etag import etag_matches, make_etag, not_modified, set_etag
+from src.utilities.json_response import json_response
+from src.utilities.exceptions import (
+    UserNotFoundException,
+    BookingNotFoundException,
+    BookingRequestException,
+    BookingSaveFailedException,
+    RequestedSlotsBusyException,
+    UserUnauthorizedException,
+)
 from fastapi import Depends, HTTPException, status
 
 logger = logging.getLogger(__name__)
@@ -20,27 +36,130 @@ bookings_router = APIRouter()
 
 logger.info("Bookings router initialized")
 
-@bookings_router.get("/user/{telegram_id}", response_model=List[UserBookingInfo])
+@bookings_router.get(
+    "/user/{telegram_id}", response_model=List[UserBookingInfo], dependencies=[Depends(rate_limit("user_bookings"))]
+)
 async def get_user_bookings(
         telegram_id: int,
+        request: Request,
+        upcoming_only: bool = Query(True, description="Только брони начиная с сегодняшнего дня"),
+        limit: int = Query(100, ge=1, le=500, description="Максимальное количество броней"),
         booking_repo: BookingCRUDRepository = Depends(get_repository(repo_type=BookingCRUDRepository))
 ):
     """Get bookings for a specific user by telegram_id"""
-    logger.info(f"GET request to /api/bookings/user/{telegram_id}")
-    bookings = await booking_repo.get_bookings(telegram_id=telegram_id, booking_date=None)
-    return [UserBookingInfo.from_orm(booking) for booking in bookings]
+    today = date.today()
+    version = await get_user_bookings_version(telegram_id)
+    etag = make_etag("user-bookings", telegram_id, today, upcoming_only, limit, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    bookings = await booking_repo.get_bookings(
+        telegram_id=telegram_id, from_date=today if upcoming_only else None, limit=limit
+    )
+    result = json_response(List[UserBookingInfo], bookings)
+    set_etag(result, etag)
+    return result
+
+@bookings_router.get("/stats", response_model=BookingStatsInfo, dependencies=[Depends(require_admin)])
+async def get_bookings_stats(
+        days_ahead: int = Query(7, ge=1, le=60, description="Количество дней для статистики заполненности"),
+        booking_repo: BookingCRUDRepository = Depends(get_repository(repo_type=BookingCRUDRepository)),
+        timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository)),
+):
+    """Статистика для админки: количество броней и заполненность слотов по дням (доступно только администратору)"""
+    booking_service = BookingService(booking_repo=booking_repo, timeslot_repo=timeslot_repo)
+    return await booking_service.get_stats(days_ahead=days_ahead)
+
+
+@bookings_router.get("/all", response_model=List[AdminBookingInfo], dependencies=[Depends(require_admin)])
+async def get_all_bookings(
+        from_date: Optional[date] = Query(None, description="Начальная дата, по умолчанию сегодня"),
+        to_date: Optional[date] = Query(None, description="Конечная дата включительно"),
+        limit: int = Query(500, ge=1, le=5000, description="Максимальное количество броней"),
+        booking_repo: BookingCRUDRepository = Depends(get_repository(repo_type=BookingCRUDRepository)),
+):
+    """Брони всех пользователей с именами для админки (доступно только администратору)"""
+    rows = await booking_repo.get_bookings_with_users(
+        from_date=from_date or date.today(), to_date=to_date, limit=limit
+    )
+    return json_response(List[AdminBookingInfo], [
+        dict(
+            id=booking_id, date=booking_date, start_time=start_time, end_time=end_time, telegram_id=telegram_id,
+            user_name=" ".join(part for part in (first_name, second_name) if part),
+        )
+        for booking_id, booking_date, start_time, end_time, telegram_id, first_name, second_name in rows
+    ])
+
+
+@bookings_router.get("/export", dependencies=[Depends(require_admin)])
+async def export_bookings(
+        export_format: Literal["csv", "ndjson"] = Query("csv", alias="format", description="Формат выгрузки"),
+        from_date: Optional[date] = Query(None, description="Начальная дата включительно"),
+        to_date: Optional[date] = Query(None, description="Конечная дата включительно"),
+        telegram_id: Optional[int] = Query(None, description="ID пользователя Telegram"),
+        include_users: bool = Query(False, description="Добавить имя, телефон и возраст пользователя"),
+):
+    """
+    Потоковая выгрузка броней (доступно только администратору): строки читаются из базы и отдаются клиенту пачками
+    """
+    filename = f"bookings.{export_format}"
+    return StreamingResponse(
+        export_bookings_stream(
+            export_format, from_date=from_date, to_date=to_date, telegram_id=telegram_id, with_users=include_users
+        ),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
-@bookings_router.get("/", response_model=List[UserBookingInfo])
+@bookings_router.get("/", response_model=BookingPage)
 async def get_bookings(
         telegram_id: Optional[int] = Query(None, description="ID пользователя Telegram"),
         booking_date: Optional[date] = Query(None, description="Дата бронирования"),
+        from_date: Optional[date] = Query(None, description="Начальная дата включительно"),
+        to_date: Optional[date] = Query(None, description="Конечная дата включительно"),
+        upcoming_only: bool = Query(False, description="Только брони начиная с сегодняшнего дня"),
+        cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+        limit: int = Query(50, ge=1, le=500, description="Размер страницы"),
         booking_repo: BookingCRUDRepository = Depends(get_repository(repo_type=BookingCRUDRepository))
 ):
-    logger.info(f"GET request to /api/bookings with telegram_id={telegram_id}, booking_date={booking_date}")
-    bookings = await booking_repo.get_bookings(telegram_id=telegram_id, booking_date=booking_date)
-    return [UserBookingInfo.from_orm(booking) for booking in bookings]
+    """Брони постранично в порядке (date, start_time, id). Для следующей страницы передайте next_cursor"""
+    try:
+        after = decode_booking_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")
+    if upcoming_only:
+        from_date = max(from_date, date.today()) if from_date else date.today()
+
+    # Запрашиваем на одну запись больше, чтобы понять, есть ли следующая страница
+    bookings = await booking_repo.get_bookings(
+        telegram_id=telegram_id, booking_date=booking_date, from_date=from_date, to_date=to_date,
+        after=after, limit=limit + 1,
+    )
+    next_cursor = None
+    if len(bookings) > limit:
+        bookings = bookings[:limit]
+        last = bookings[-1]
+        next_cursor = encode_booking_cursor(last.date, last.start_time, last.id)
+    return json_response(BookingPage, {"items": bookings, "next_cursor": next_cursor})
 
-@bookings_router.delete("/{booking_id}")
+@bookings_router.delete("/day/{booking_date}")
+async def cancel_bookings_for_day(
+        booking_date: date,
+        telegram_id: int = Query(..., description="ID администратора в Telegram"),
+        booking_repo: BookingCRUDRepository = Depends(get_repository(repo_type=BookingCRUDRepository)),
+        timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository)),
+        user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository))
+):
+    """Отменяет все брони на дату (доступно только администратору)"""
+    booking_service = BookingService(booking_repo=booking_repo, user_repo=user_repo, timeslot_repo=timeslot_repo)
+    try:
+        return await booking_service.cancel_bookings_for_day(telegram_id, booking_date)
+    except UserNotFoundException:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Пользователь не найден")
+    except UserUnauthorizedException:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Отменять брони на день может только администратор")
+
+@bookings_router.delete("/{booking_id}", dependencies=[Depends(rate_limit("booking_write"))])
 async def delete_booking_by_id(
         booking_id: int,
         telegram_id: int = Query(..., description="ID пользователя Telegram"),
@@ -48,7 +167,6 @@ async def delete_booking_by_id(
         timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository)),
         user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository))
 ):
-    logger.info(f"DELETE request to /api/bookings/{booking_id} with telegram_id={telegram_id}")
     # Создаем сервис с зависимостью от репозитория
     booking_service = BookingService(booking_repo=booking_repo, user_repo=user_repo, timeslot_repo=timeslot_repo)
     try:
@@ -60,7 +178,7 @@ async def delete_booking_by_id(
         )
     return {"detail": "Booking deleted successfully"}
 
-@bookings_router.delete("/")
+@bookings_router.delete("/", dependencies=[Depends(rate_limit("booking_write"))])
 async def delete_booking(
         booking_id: int,
         telegram_id: int,
@@ -68,7 +186,6 @@ async def delete_booking(
         timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository)),
         user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository))
 ):
-    logger.info(f"DELETE request to /api/bookings with booking_id={booking_id}, telegram_id={telegram_id}")
     # Создаем сервис с зависимостью от репозитория
     booking_service = BookingService(booking_repo=booking_repo, user_repo=user_repo, timeslot_repo=timeslot_repo)
     try:
@@ -81,7 +198,7 @@ async def delete_booking(
     return {"detail": "Booking deleted successfully"}
 
 
-@bookings_router.post("/")
+@bookings_router.post("/", dependencies=[Depends(rate_limit("booking_write"))])
 async def create_booking(
         booking: BookingInfo,
         user: UserId,
@@ -89,7 +206,6 @@ async def create_booking(
         timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository)),
         user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository)),
 ):
-    logger.info(f"POST request to /api/bookings")
     booking_service = BookingService(booking_repo=booking_repo, timeslot_repo=timeslot_repo, user_repo=user_repo)
     try:
         new_booking = await booking_service.create_booking(
@@ -108,10 +224,61 @@ async def create_booking(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Ошибка при создании брони, {e.args[0]}",
         )
+    except (RequestedSlotsBusyException, BookingSaveFailedException):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Выбранное время только что заняли, выберите другой слот.",
+        )
     return {
         "status": "success",
         "message": "Слоты успешно забронированы.",
         "booking_id": new_booking.id
     }
 
+
+@bookings_router.patch("/{booking_id}", dependencies=[Depends(rate_limit("booking_write"))])
+async def reschedule_booking(
+        booking_id: int,
+        booking: BookingInfo,
+        user: UserId,
+        booking_repo: BookingCRUDRepository = Depends(get_repository(repo_type=BookingCRUDRepository)),
+        timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository)),
+        user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository)),
+):
+    """Перенос брони на другие дату и время одним запросом"""
+    booking_service = BookingService(booking_repo=booking_repo, timeslot_repo=timeslot_repo, user_repo=user_repo)
+    try:
+        moved_booking = await booking_service.reschedule_booking(
+            telegram_id=user.telegram_id,
+            booking_id=booking_id,
+            booking_date=booking.date,
+            start_time=booking.start_time,
+            end_time=booking.end_time
+        )
+    except UserNotFoundException:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Пользователь не аутентифицирован.",
+        )
+    except BookingNotFoundException:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Выбранная бронь не принадлежит пользователю, либо не существует",
+        )
+    except BookingRequestException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ошибка при переносе брони, {e.args[0]}",
+        )
+    except (RequestedSlotsBusyException, BookingSaveFailedException):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Выбранное время только что заняли, выберите другой слот.",
+        )
+    return {
+        "status": "success",
+        "message": "Бронь успешно перенесена.",
+        "booking_id": moved_booking.id
+    }
+
 logger.info("Bookings router endpoints registered")
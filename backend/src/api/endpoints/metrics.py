@@ -0,0 +1,41 @@
+from typing import List, Optional
+
+import fastapi
+
+from src.api.dependencies import get_repository
+from src.models.schemas import JobRunInfo
+from src.repository.crud import JobCRUDRepository
+from src.repository.db import pool_metrics, replica_pool_metrics
+from src.services.availability import day_loads
+from src.services.jobs import job_runner
+from src.utilities.cache import cache_backends
+from src.utilities.json_response import json_response
+from src.utilities.rate_limit import rate_limiter
+
+metrics_router = fastapi.APIRouter()
+
+
+@metrics_router.get("/")
+async def get_metrics():
+    """
+    Внутренние метрики: состояние пула соединений с базой, счётчики кэшей, фоновых задач и лимитов запросов этого процесса.
+    Доступно только администратору (admin_telegram_id)
+    """
+    return {
+        "db_pool": pool_metrics(),
+        "db_replica_pool": replica_pool_metrics(),
+        "caches": {backend.namespace: backend.stats() for backend in cache_backends},
+        "single_flight": {day_loads.name: day_loads.stats()},
+        "jobs": job_runner.stats(),
+        "rate_limits": rate_limiter.stats(),
+    }
+
+
+@metrics_router.get("/jobs", response_model=List[JobRunInfo])
+async def get_job_runs(
+        job: Optional[str] = fastapi.Query(None, description="Имя задачи"),
+        limit: int = fastapi.Query(50, ge=1, le=500),
+        job_repo: JobCRUDRepository = fastapi.Depends(get_repository(repo_type=JobCRUDRepository)),
+):
+    """Последние запуски фоновых задач на всех экземплярах: длительность, статус, итог или ошибка"""
+    return json_response(List[JobRunInfo], await job_repo.get_runs(job=job, limit=limit))
@@ -0,0 +1,109 @@
+import logging
+from datetime import date
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.api.dependencies import get_repository
+from src.models.schemas import (
+    ScheduleDayRequest,
+    ScheduleRequest,
+    ScheduleResultInfo,
+    ScheduleTemplateInfo,
+    WeeklyIntervalInfo,
+)
+from src.repository.crud import ScheduleCRUDRepository, UserCRUDRepository
+from src.services.schedule import DayInterval, ScheduleService
+from src.utilities.exceptions import ScheduleOutOfRangeException, UserNotFoundException, UserUnauthorizedException
+
+logger = logging.getLogger(__name__)
+
+schedule_router = APIRouter()
+
+
+async def get_admin_schedule_service(
+        telegram_id: int = Query(..., description="ID администратора в Telegram"),
+        schedule_repo: ScheduleCRUDRepository = Depends(get_repository(repo_type=ScheduleCRUDRepository, primary=True)),
+        user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository)),
+) -> ScheduleService:
+    """Сервис расписания для администратора: остальным пользователям изменять расписание нельзя"""
+    schedule_service = ScheduleService(schedule_repo=schedule_repo, user_repo=user_repo)
+    try:
+        await schedule_service.check_admin(telegram_id)
+    except UserNotFoundException:
+        raise HTTPException(status_code=401, detail="Пользователь не найден")
+    except UserUnauthorizedException:
+        raise HTTPException(status_code=403, detail="Изменять расписание может только администратор")
+    return schedule_service
+
+
+def _day_interval(interval) -> DayInterval:
+    return DayInterval(interval.start_time, interval.end_time, interval.slot_minutes, interval.capacity)
+
+
+@schedule_router.post("/generate", response_model=ScheduleResultInfo)
+async def generate_schedule(
+        schedule: ScheduleRequest,
+        schedule_service: ScheduleService = Depends(get_admin_schedule_service),
+):
+    """
+    Развернуть шаблон в слоты на период. Перестраиваются только дни, чей шаблон изменился с прошлого раза
+    """
+    try:
+        result = await schedule_service.generate(start_date=schedule.start_date, days=schedule.days, force=schedule.force)
+    except ScheduleOutOfRangeException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result.as_dict()
+
+
+@schedule_router.get("/template", response_model=ScheduleTemplateInfo)
+async def get_template(
+        from_date: date = Query(None, description="Замены и закрытия начиная с даты, по умолчанию с сегодняшней"),
+        schedule_service: ScheduleService = Depends(get_admin_schedule_service),
+):
+    """Недельное расписание, замены часов работы на даты и закрытые дни"""
+    return await schedule_service.get_template(from_date)
+
+
+@schedule_router.put("/template/weekly")
+async def set_weekly_template(
+        intervals: List[WeeklyIntervalInfo],
+        schedule_service: ScheduleService = Depends(get_admin_schedule_service),
+):
+    """
+    Заменить недельное расписание. День недели без интервалов - выходной.
+    Слоты перестраиваются при следующей развёртке и только в дни, где шаблон действительно изменился
+    """
+    await schedule_service.set_weekly([(interval.weekday, _day_interval(interval)) for interval in intervals])
+    return {"detail": "Weekly template updated"}
+
+
+@schedule_router.put("/template/days/{day}", response_model=ScheduleResultInfo)
+async def set_day_template(
+        day: date,
+        request: ScheduleDayRequest,
+        schedule_service: ScheduleService = Depends(get_admin_schedule_service),
+):
+    """Задать часы работы на дату или закрыть её; слоты этой даты перестраиваются сразу"""
+    if not request.closed and not request.intervals:
+        raise HTTPException(status_code=400, detail="Укажите интервалы работы или closed=true")
+    try:
+        result = await schedule_service.set_day(
+            day, [_day_interval(interval) for interval in request.intervals], closed=request.closed,
+            reason=request.reason,
+        )
+    except ScheduleOutOfRangeException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result.as_dict()
+
+
+@schedule_router.delete("/template/days/{day}", response_model=ScheduleResultInfo)
+async def reset_day_template(
+        day: date,
+        schedule_service: ScheduleService = Depends(get_admin_schedule_service),
+):
+    """Вернуть дате недельное расписание"""
+    try:
+        return (await schedule_service.reset_day(day)).as_dict()
+    except ScheduleOutOfRangeException as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,112 +1,129 @@
 import logging
-from datetime import datetime, date
-from typing import List, Optional
+from datetime import date, timedelta
+from typing import List, Literal, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
-from src.api.dependencies import get_repository
+from src.api.dependencies import get_repository, rate_limit, require_admin
 from src.repository.crud import TimeslotCRUDRepository, UserCRUDRepository
-from src.models.schemas import TimeSlotInfoVisitors
+from src.models.schemas import AvailablePeriods, CompactSlots, FREE_SLOT_FIELDS
 from src.models.db import TimeSlot
+from src.services.availability import day_loads, get_days_versions
+from src.utilities.cache import cache_backends
+from src.utilities.etag import etag_matches, make_etag, not_modified, set_etag
+from src.utilities.json_response import json_response
+from src.utilities.exceptions import BookingNotFoundException, UserNotFoundException
 
 timeslots_router = APIRouter()
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 
-@timeslots_router.get("/available-days")
+
+@timeslots_router.get("/cache-stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    """
+    Статистика кэшей доступности и пользователей (попадания, промахи, вытеснения)
+    и объединения одновременных загрузок дней (coalesced - сколько запросов получили чужой результат).
+    Доступно только администратору
+    """
+    return {
+        **{backend.namespace: backend.stats() for backend in cache_backends},
+        "single_flight": {day_loads.name: day_loads.stats()},
+    }
+
+@timeslots_router.get("/available-days", dependencies=[Depends(rate_limit("slots"))])
 async def get_available_days(
-    timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository))
+    request: Request,
+    response: Response,
+    days_ahead: int = Query(7, ge=1, le=60, description="Количество дней вперёд, начиная с сегодняшнего"),
+    telegram_id: Optional[int] = Query(None, description="ID пользователя Telegram"),
+    timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository)),
+    user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository)),
 ):
     """
     Получить доступные дни для бронирования
     """
+    today = date.today()
+    versions = await get_days_versions(today + timedelta(days=offset) for offset in range(days_ahead))
+    etag = make_etag("available-days", today, days_ahead, telegram_id, *versions)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     try:
-        logger.info("=== ЗАПРОС НА ПОЛУЧЕНИЕ ДОСТУПНЫХ ДНЕЙ ===")
-        logger.info(f"Время запроса: {datetime.now()}")
-        
-        # Получаем доступные дни
-        logger.info("Получение доступных дней из репозитория...")
-        
-        # Получаем таймслоты на ближайшие 7 дней
-        from datetime import timedelta
-        today = date.today()
-        available_days = []
-        
-        for i in range(7):
-            check_date = today + timedelta(days=i)
-            logger.info(f"Проверяем дату: {check_date}")
-            # Получаем все слоты для этой даты
-            slots = await timeslot_repo.get_timeslots_by_date(check_date)
-            logger.info(f"Найдено слотов для {check_date}: {len(slots) if slots else 0}")
-            if slots:
-                available_days.append(check_date.isoformat())
-        
-        logger.info(f"Найдено доступных дней: {len(available_days)}")
-        logger.info(f"Доступные дни: {available_days}")
-        
-        result = {"available_days": available_days}
-        logger.info(f"Возвращаем результат: {result}")
-        
-        return result
-        
+        from src.services import TimeslotService
+
+        timeslot_service = TimeslotService(user_repo=user_repo, timeslot_repo=timeslot_repo)
+        available_days = await timeslot_service.get_available_days(telegram_id=telegram_id, days_ahead=days_ahead)
+
+        logger.debug(f"Доступных дней: {len(available_days)}")
+        set_etag(response, etag)
+        return {"available_days": [day.isoformat() for day in available_days]}
+
+    except UserNotFoundException:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
     except Exception as e:
-        logger.error(f"ОШИБКА при получении доступных дней: {str(e)}")
-        logger.error(f"Тип ошибки: {type(e)}")
-        import traceback
-        logger.error(f"Трассировка: {traceback.format_exc()}")
+        logger.error(f"Ошибка при получении доступных дней: {e}", exc_info=e)
         raise HTTPException(status_code=500, detail=f"Ошибка при получении доступных дней: {str(e)}")
 
 
-@timeslots_router.get("/")
+@timeslots_router.get(
+    "/", response_model=Union[AvailablePeriods, CompactSlots], dependencies=[Depends(rate_limit("slots"))]
+)
 async def get_timeslots(
+    request: Request,
     selected_date: date = Query(..., description="Выбранная дата"),
     telegram_id: Optional[int] = Query(None, description="ID пользователя Telegram"),
+    view: Literal["full", "compact"] = Query(
+        "full", description="compact - слоты кортежами (начало в минутах от полуночи, длительность, свободных мест)"
+    ),
+    fields: Optional[str] = Query(None, description=f"Поля слота через запятую: {','.join(FREE_SLOT_FIELDS)}"),
+    exclude_booking_id: Optional[int] = Query(
+        None, description="ID переносимой брони пользователя: её слоты считаются свободными"
+    ),
     timeslot_repo: TimeslotCRUDRepository = Depends(get_repository(repo_type=TimeslotCRUDRepository)),
     user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository)),
 ):
     """
     Получить тайм-слоты для выбранной даты
     """
+    selected_fields = None
+    if fields:
+        selected_fields = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected_fields - set(FREE_SLOT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(sorted(unknown))}")
+
+    versions = await get_days_versions([selected_date])
+    etag = make_etag(
+        "slots", selected_date, telegram_id, view, sorted(selected_fields or ()), exclude_booking_id, *versions
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     try:
-        logger.info("=== ЗАПРОС НА ПОЛУЧЕНИЕ ТАЙМ-СЛОТОВ ===")
-        logger.info(f"Время запроса: {datetime.now()}")
-        logger.info(f"Выбранная дата: {selected_date}")
-        logger.info(f"Telegram ID: {telegram_id}")
-        
-        # Проверяем пользователя, если передан telegram_id
-        user = None
-        if telegram_id:
-            logger.info(f"Поиск пользователя с telegram_id: {telegram_id}")
-            try:
-                user = await user_repo.get_user_by_telegram_id(telegram_id)
-                if user:
-                    logger.info(f"Найден пользователь: {user.first_name} {user.second_name}")
-                else:
-                    logger.warning(f"Пользователь с telegram_id {telegram_id} не найден")
-            except Exception as user_error:
-                logger.error(f"Ошибка при поиске пользователя: {user_error}")
-        
-        # Получаем тайм-слоты
-        logger.info("Получение тайм-слотов из репозитория...")
         from src.services import TimeslotService
-        
+
         timeslot_service = TimeslotService(user_repo=user_repo, timeslot_repo=timeslot_repo)
-        free_slots = await timeslot_service.get_free_slots(telegram_id=telegram_id, selected_date=selected_date)
-        
-        logger.info(f"Найдено свободных слотов: {len(free_slots)}")
-        for slot in free_slots:
-            logger.info(f"Слот ID {slot.id}: {slot.start_time}-{slot.end_time}")
-        
-        result = {"available_periods": [TimeSlotInfoVisitors.from_orm(slot) for slot in free_slots]}
-        logger.info(f"Возвращаем результат с {len(result['available_periods'])} слотами")
-        
+        free_slots = await timeslot_service.get_free_slots(
+            telegram_id=telegram_id, selected_date=selected_date, exclude_booking_id=exclude_booking_id
+        )
+        logger.debug(f"Свободных слотов на {selected_date}: {len(free_slots)}")
+
+        if view == "compact":
+            result = json_response(CompactSlots, {
+                "date": selected_date,
+                "slots": [(slot.start_minutes, slot.duration, slot.remaining) for slot in free_slots],
+            })
+        else:
+            include = {"available_periods": {"__all__": selected_fields}} if selected_fields else None
+            result = json_response(AvailablePeriods, {"available_periods": free_slots}, include=include)
+        set_etag(result, etag)
         return result
-        
+
+    except BookingNotFoundException:
+        raise HTTPException(status_code=404, detail="Бронь не найдена")
     except Exception as e:
-        logger.error(f"ОШИБКА при получении тайм-слотов: {str(e)}")
-        logger.error(f"Тип ошибки: {type(e)}")
-        import traceback
-        logger.error(f"Трассировка: {traceback.format_exc()}")
+        logger.error(f"Ошибка при получении тайм-слотов: {e}", exc_info=e)
         raise HTTPException(status_code=500, detail=f"Ошибка при получении тайм-слотов: {str(e)}")
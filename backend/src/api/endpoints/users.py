@@ -2,7 +2,7 @@ from fastapi import Depends, HTTPException, status
 from src.models.db import User
 from fastapi import APIRouter
 from src.models.schemas import UserCreate, UserAuth
-from src.api.dependencies import get_repository
+from src.api.dependencies import get_repository, rate_limit
 from src.repository.crud import UserCRUDRepository
 from src.services.user import UserService
 from src.utilities.exceptions import UserNotFoundException, UserAlreadyAdminException
@@ -10,13 +10,13 @@ from src.utilities.exceptions import UserNotFoundException, UserAlreadyAdminExce
 users_router = APIRouter()
 
 
-@users_router.post("/authenticate", status_code=200)
+@users_router.post("/authenticate", status_code=200, dependencies=[Depends(rate_limit("auth"))])
 async def check_user_auth(user_data: UserAuth,
                           user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository))):
     """
     Проверяет, зарегистрирован ли пользователь в базе данных по telegram_id.
     """
-    user = await user_repo.get_user_by_telegram_id(telegram_id=user_data.telegram_id)
+    user = await user_repo.get_user_info(telegram_id=user_data.telegram_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -25,7 +25,7 @@ async def check_user_auth(user_data: UserAuth,
     return {"message": "Пользователь аутентифицирован", "user_name": user.first_name, "is_admin": user.is_admin}
 
 
-@users_router.post("/register")
+@users_router.post("/register", dependencies=[Depends(rate_limit("auth"))])
 async def register_user(user_data: UserCreate,
                         user_repo: UserCRUDRepository = Depends(get_repository(repo_type=UserCRUDRepository))):
     user = await user_repo.get_user_by_telegram_id(telegram_id=user_data.telegram_id)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 import logging
 
 from src.api.endpoints.users import users_router
 from src.api.endpoints.timeslots import timeslots_router
 from src.api.endpoints.bookings import bookings_router
+from src.api.endpoints.metrics import metrics_router
+from src.api.endpoints.schedule import schedule_router
+from src.api.dependencies import require_admin
 
 logger = logging.getLogger(__name__)
 
@@ -33,5 +36,21 @@ main_router.include_router(
     tags=["bookings"]
 )
 
+logger.info("Registering schedule router...")
+main_router.include_router(
+    schedule_router,
+    prefix="/schedule",
+    tags=["schedule"]
+)
+
+logger.info("Registering metrics router...")
+main_router.include_router(
+    metrics_router,
+    prefix="/internal/metrics",
+    tags=["internal"],
+    # Внутреннее состояние пулов, кэшей и задач - только администратору
+    dependencies=[Depends(require_admin)]
+)
+
 print("🔍 DEBUG: All routers registered successfully")
 logger.info("All routers registered successfully")
@@ -1,5 +1,6 @@
 import logging
 import os
+import random
 import time
 from contextlib import asynccontextmanager
 
@@ -10,19 +11,32 @@ from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from src.api.routers import main_router
+from src.repository.db import dispose_engine, init_engine
+from src.services.jobs import JOBS_ENABLED, job_runner
+from src.utilities.cache import start_caches, stop_caches
+from src.utilities.rate_limit import rate_limiter
+from src.utilities.log_config import ACCESS_LOG_SAMPLE_RATE, ACCESS_LOG_SLOW_MS, setup_logging
 from src.utilities.exceptions import UserNotFoundException, BookingNotFoundException, BookingRequestException
 
 # Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("access")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    init_engine()
+    # Слушатели инвалидаций общего кэша (для CACHE_BACKEND=redis)
+    await start_caches()
+    # Расписание на горизонт вперёд, итоги дней и очистка; выполняет один экземпляр под advisory-блокировкой
+    if JOBS_ENABLED:
+        await job_runner.start()
     logger.info("Приложение запущено")
     yield
+    await job_runner.stop()
+    await stop_caches()
+    await rate_limiter.stop()
+    await dispose_engine()
 
 app = FastAPI(
     title="Schedule Bot API",
@@ -46,38 +60,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
-# Middleware для логирования всех запросов
+# Access-лог: одна строка на запрос, успешные быстрые запросы сэмплируются
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    
-    # Логируем входящий запрос
-    logger.info("="*50)
-    logger.info(f"ВХОДЯЩИЙ ЗАПРОС: {request.method} {request.url}")
-    logger.info(f"Headers: {dict(request.headers)}")
-    logger.info(f"Query params: {dict(request.query_params)}")
-    logger.info(f"Client: {request.client}")
-    
-    # Логируем User-Agent для определения источника
-    user_agent = request.headers.get("user-agent", "")
-    if "TelegramBot" in user_agent or "Telegram" in user_agent:
-        logger.info("🤖 ЗАПРОС ОТ TELEGRAM")
-    else:
-        logger.info("🌐 ЗАПРОС ОТ БРАУЗЕРА")
-    
-    # Обрабатываем запрос
-    response = await call_next(request)
-    
-    # Логируем ответ
-    process_time = time.time() - start_time
-    logger.info(f"ОТВЕТ: {response.status_code}")
-    logger.info(f"Время обработки: {process_time:.4f}s")
-    logger.info("="*50)
-    
+    start_time = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        log_request(request, 500, start_time)
+        raise
+    # Тело (например, StreamingResponse выгрузки) отдаётся уже после выхода из middleware,
+    # поэтому длительность записывается, когда отправлен последний фрагмент
+    response.body_iterator = log_after_body(response.body_iterator, request, response.status_code, start_time)
     return response
 
+
+async def log_after_body(body_iterator, request: Request, status_code: int, start_time: float):
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        log_request(request, status_code, start_time)
+
+
+def log_request(request: Request, status_code: int, start_time: float) -> None:
+    duration_ms = (time.perf_counter() - start_time) * 1000
+    if (status_code >= 400 or duration_ms >= ACCESS_LOG_SLOW_MS
+            or random.random() < ACCESS_LOG_SAMPLE_RATE):
+        fields = {
+            "method": request.method,
+            "path": request.url.path,
+            "query": request.url.query,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "client": request.client.host if request.client else None,
+            "user_agent": request.headers.get("user-agent", ""),
+        }
+        if access_logger.isEnabledFor(logging.DEBUG):
+            fields["headers"] = dict(request.headers)
+        access_logger.info("request", extra=fields)
+
 # Обработчики исключений
 @app.exception_handler(UserNotFoundException)
 async def user_not_found_exception_handler(request: Request, exc: UserNotFoundException):
@@ -116,14 +141,13 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     logger.error(f"HTTP exception: {exc.status_code} - {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"message": exc.detail}
+        content={"message": exc.detail},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {exc}")
-    import traceback
-    logger.error(f"Traceback: {traceback.format_exc()}")
+    logger.error(f"Unhandled exception: {exc}", exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={"message": "Internal server error"}
@@ -138,8 +162,8 @@ async def options_handler(request: Request):
     
     if origin in origins:
         response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, If-None-Match"
         response.headers["Access-Control-Allow-Credentials"] = "true"
     
     return response
@@ -160,4 +184,4 @@ if __name__ == "__main__":
     
     port = int(os.getenv("PORT", 8000))
     logger.info(f"Запуск сервера на порту {port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(app, host="0.0.0.0", port=port, log_config=None, access_log=False)
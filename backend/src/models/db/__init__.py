@@ -2,3 +2,5 @@ from .user import User
 from .timeslot import TimeSlot
 from .user_timeslot_link import UserTimeSlotLink
 from .booking import Booking
+from .schedule import ScheduleClosure, ScheduleDayState, ScheduleInterval
+from .job import DailyStats, JobRun
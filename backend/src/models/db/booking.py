@@ -1,15 +1,25 @@
+import datetime as dt
+
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
-from datetime import time, date
+from datetime import time
 from .booking_timeslot_link import BookingTimeSlotLink  # Это можно импортировать без цикла
 
 
 class Booking(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
+    __table_args__ = (
+        Index("ix_booking_user_id_date", "user_id", "date", "start_time"),
+        # Порядок keyset-пагинации (date, start_time, id)
+        Index("ix_booking_date_start_time_id", "date", "start_time", "id"),
+    )
+
+    # Первичный ключ (id, date), как у секционированной таблицы в Postgres, см. TimeSlot
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": True})
     user_id: int = Field(foreign_key="user.id")  # Связь с пользователем
     start_time: time
     end_time: time
-    date: date
+    date: dt.date = Field(primary_key=True)  # поле называется как тип, поэтому тип берётся через модуль
 
     time_slots: List["TimeSlot"] = Relationship(  # Аннотация строкой, но link_model передаём объектом
         back_populates="bookings", link_model=BookingTimeSlotLink
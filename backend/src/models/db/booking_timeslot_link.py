@@ -1,7 +1,19 @@
-from sqlmodel import SQLModel, Field, Relationship
-from typing import Optional, List
+import datetime as dt
+
+from sqlalchemy import ForeignKeyConstraint, Index
+from sqlmodel import SQLModel, Field
 
 
 class BookingTimeSlotLink(SQLModel, table=True):
-    booking_id: int = Field(foreign_key="booking.id", primary_key=True)
-    time_slot_id: int = Field(foreign_key="timeslot.id", primary_key=True)
\ No newline at end of file
+    __table_args__ = (
+        # Внешние ключи включают дату: первичные ключи секционированных таблиц - (id, date)
+        ForeignKeyConstraint(["booking_id", "date"], ["booking.id", "booking.date"]),
+        ForeignKeyConstraint(["time_slot_id", "date"], ["timeslot.id", "timeslot.date"]),
+        # Первичный ключ (booking_id, time_slot_id, date) не покрывает поиск по слоту
+        Index("ix_bookingtimeslotlink_time_slot_id_booking_id", "time_slot_id", "booking_id"),
+    )
+
+    booking_id: int = Field(primary_key=True)
+    time_slot_id: int = Field(primary_key=True)
+    # Дата слота (и брони) - ключ помесячного секционирования в Postgres, см. миграцию 9e6b3c1d5f27
+    date: dt.date = Field(primary_key=True)
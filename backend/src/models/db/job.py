@@ -0,0 +1,30 @@
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+
+class JobRun(SQLModel, table=True):
+    """Запуск фоновой задачи: кто и когда её выполнил, сколько это заняло и чем закончилось"""
+    __table_args__ = (
+        Index("ix_jobrun_job_started_at", "job", "started_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job: str = Field(max_length=50)
+    instance: str = Field(max_length=100)  # хост и pid процесса, выполнившего задачу
+    started_at: dt.datetime
+    duration_ms: float
+    status: str = Field(max_length=20)  # success или failed
+    details: Optional[str] = Field(default=None, max_length=500)  # итог задачи или текст ошибки
+
+
+class DailyStats(SQLModel, table=True):
+    """Итоги прошедшего дня: сохраняются до того, как свободные слоты этого дня удаляются при очистке"""
+    date: dt.date = Field(primary_key=True)
+    slots: int
+    capacity: int
+    occupied: int
+    bookings: int
+    rolled_up_at: dt.datetime
@@ -0,0 +1,44 @@
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import CheckConstraint, Index
+from sqlmodel import SQLModel, Field
+
+from .timeslot import TIMESLOT_CAPACITY
+
+
+class ScheduleInterval(SQLModel, table=True):
+    """
+    Интервал работы зала в шаблоне расписания. Интервал с weekday (0 - понедельник) действует каждую неделю,
+    интервал с date - только в этот день и заменяет собой все недельные интервалы этого дня.
+    """
+    __table_args__ = (
+        CheckConstraint("(weekday IS NULL) <> (date IS NULL)", name="ck_scheduleinterval_weekday_or_date"),
+        CheckConstraint("start_time < end_time", name="ck_scheduleinterval_time_order"),
+        Index("ix_scheduleinterval_weekday", "weekday"),
+        Index("ix_scheduleinterval_date", "date"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    weekday: Optional[int] = Field(default=None, ge=0, le=6)
+    date: Optional[dt.date] = None  # поле называется как тип, поэтому тип берётся через модуль
+    start_time: dt.time
+    end_time: dt.time
+    slot_minutes: int = Field(default=30)
+    capacity: int = Field(default=TIMESLOT_CAPACITY)
+
+
+class ScheduleClosure(SQLModel, table=True):
+    """День, когда зал закрыт (праздник и т.п.): слоты на эту дату не создаются"""
+    date: dt.date = Field(primary_key=True)
+    reason: Optional[str] = Field(default=None, max_length=200)
+
+
+class ScheduleDayState(SQLModel, table=True):
+    """
+    Отпечаток действующего шаблона, по которому последний раз были созданы слоты дня.
+    Развёртка шаблона пропускает дни, отпечаток которых не изменился.
+    """
+    date: dt.date = Field(primary_key=True)
+    fingerprint: str = Field(max_length=40)
+    expanded_at: dt.datetime = Field(default_factory=dt.datetime.utcnow)
@@ -1,16 +1,35 @@
+import datetime as dt
+
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
-from datetime import date, time
+from datetime import time
 from typing import List, Optional
 from .booking_timeslot_link import BookingTimeSlotLink  # Можно импортировать без цикла
 from .user_timeslot_link import UserTimeSlotLink  # Это тоже можно импортировать без цикла
 
+TIMESLOT_CAPACITY = 4  # Максимальное количество посетителей в одном таймслоте
+
 
 class TimeSlot(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
+    __table_args__ = (
+        # Слоты дня по порядку; INCLUDE позволяет считать доступность только по индексу.
+        # Уникальность (date, start_time) - арбитр для INSERT ... ON CONFLICT при генерации расписания
+        Index(
+            "uq_timeslot_date_start_time", "date", "start_time",
+            unique=True,
+            postgresql_include=["end_time", "capacity", "occupied"],
+        ),
+    )
+
+    # Первичный ключ (id, date), как у секционированной по месяцам таблицы в Postgres (миграция 9e6b3c1d5f27):
+    # ключ секционирования обязан входить в первичный ключ. id по-прежнему уникален и берётся из последовательности
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": True})
     start_time: time
     end_time: time
-    date: date
-    weekday: str = Field(max_length=20)  # Добавляем поле weekday
+    date: dt.date = Field(primary_key=True)  # поле называется как тип, поэтому тип берётся через модуль
+    weekday: str = Field(max_length=20)  # День недели по-английски, см. src.services.schedule.WEEKDAYS
+    capacity: int = Field(default=TIMESLOT_CAPACITY, sa_column_kwargs={"server_default": str(TIMESLOT_CAPACITY)})  # Максимальное количество посетителей
+    occupied: int = Field(default=0, sa_column_kwargs={"server_default": "0"})  # Количество записанных посетителей, обновляется вместе с бронированиями
 
     bookings: List["Booking"] = Relationship(  # Аннотация строкой, но link_model передаём объектом
         back_populates="time_slots", link_model=BookingTimeSlotLink
@@ -22,5 +41,5 @@ class TimeSlot(SQLModel, table=True):
 
     @property
     def is_available(self) -> bool:
-        """Проверяет, есть ли свободные места в таймслоте (менее 4 посетителей)."""
-        return len(self.visitors) < 4
+        """Проверяет, есть ли свободные места в таймслоте."""
+        return self.occupied < self.capacity
@@ -1,6 +1,18 @@
+import datetime as dt
+
+from sqlalchemy import ForeignKeyConstraint, Index
 from sqlmodel import SQLModel, Field
 
 
 class UserTimeSlotLink(SQLModel, table=True):
+    __table_args__ = (
+        # Внешний ключ включает дату: первичный ключ секционированной таблицы слотов - (id, date)
+        ForeignKeyConstraint(["time_slot_id", "date"], ["timeslot.id", "timeslot.date"]),
+        # Первичный ключ (user_id, time_slot_id, date) не покрывает поиск посетителей слота
+        Index("ix_usertimeslotlink_time_slot_id_user_id", "time_slot_id", "user_id"),
+    )
+
     user_id: int = Field(foreign_key="user.id", primary_key=True)
-    time_slot_id: int = Field(foreign_key="timeslot.id", primary_key=True)
+    time_slot_id: int = Field(primary_key=True)
+    # Дата слота - ключ помесячного секционирования в Postgres, см. миграцию 9e6b3c1d5f27
+    date: dt.date = Field(primary_key=True)
@@ -1,3 +1,5 @@
 from .timeslot import *
 from .user import *
 from .booking import *
+from .schedule import *
+from .job import *
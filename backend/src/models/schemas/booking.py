@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import time, date
-from typing import List
+from typing import List, Optional
 from .timeslot import TimeSlotInfo
 
 
@@ -11,9 +11,12 @@ class UserBookingInfo(BaseModel):
     end_time: time
     time_slots: List[TimeSlotInfo]
 
-    class Config:
-        orm_mode = True
-        from_attributes=True
+    model_config = ConfigDict(from_attributes=True)
+
+class BookingPage(BaseModel):
+    items: List[UserBookingInfo]
+    next_cursor: Optional[str] = None
+
 
 class BookingInfo(BaseModel):
     # booking_id: int
@@ -21,7 +24,30 @@ class BookingInfo(BaseModel):
     start_time: str
     end_time: str
 
-    class Config:
-        orm_mode = True
-        from_attributes=True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AdminBookingInfo(BaseModel):
+    id: int
+    date: date
+    start_time: time
+    end_time: time
+    telegram_id: Optional[int]
+    user_name: str
+
+
+class DayOccupancyInfo(BaseModel):
+    date: date
+    slots: int
+    capacity: int
+    occupied: int
+    bookings: int
+    utilization: float  # процент занятых мест
+
 
+class BookingStatsInfo(BaseModel):
+    total: int
+    today: int
+    upcoming: int
+    utilization: float
+    days: List[DayOccupancyInfo]
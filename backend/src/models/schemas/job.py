@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class JobRunInfo(BaseModel):
+    id: int
+    job: str
+    instance: str
+    started_at: datetime
+    duration_ms: float
+    status: str
+    details: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
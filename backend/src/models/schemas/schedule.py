@@ -0,0 +1,63 @@
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from datetime import time, date
+from typing import List, Optional
+
+
+class ScheduleIntervalInfo(BaseModel):
+    start_time: time
+    end_time: time
+    slot_minutes: int = Field(30, ge=5, le=240)
+    capacity: int = Field(4, ge=1, le=100)
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.start_time >= self.end_time:
+            raise ValueError("start_time должен быть раньше end_time")
+        return self
+
+
+class WeeklyIntervalInfo(ScheduleIntervalInfo):
+    weekday: int = Field(..., ge=0, le=6)  # 0 - понедельник
+
+
+class DateIntervalInfo(ScheduleIntervalInfo):
+    date: date
+
+
+class ScheduleClosureInfo(BaseModel):
+    date: date
+    reason: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ScheduleTemplateInfo(BaseModel):
+    weekly: List[WeeklyIntervalInfo]
+    overrides: List[DateIntervalInfo]
+    closures: List[ScheduleClosureInfo]
+
+
+class ScheduleDayRequest(BaseModel):
+    """Часы работы на конкретную дату вместо недельных, либо закрытие даты"""
+    closed: bool = False
+    reason: Optional[str] = Field(None, max_length=200)
+    intervals: List[ScheduleIntervalInfo] = []
+
+
+class ScheduleRequest(BaseModel):
+    start_date: Optional[date] = None  # по умолчанию сегодня
+    days: int = Field(7, ge=1, le=366)
+    force: bool = False  # перестроить все дни, а не только изменившиеся
+
+
+class ScheduleResultInfo(BaseModel):
+    days: int
+    changed_days: int
+    candidates: int
+    created: int
+    updated: int
+    removed: int
+    kept: int
+    existing: int
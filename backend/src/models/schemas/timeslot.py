@@ -1,14 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import time, date
-from typing import List
+from typing import List, Tuple
 
 
 class UserSlotInfo(BaseModel):
     telegram_id: int
 
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class OccupiedSlotInfo(BaseModel):
@@ -30,9 +28,7 @@ class TimeSlotInfo(BaseModel):
     end_time: time
     date: date
 
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TimeSlotInfoVisitors(BaseModel):
@@ -42,9 +38,32 @@ class TimeSlotInfoVisitors(BaseModel):
     date: date
     visitors: List[UserSlotInfo]
 
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class FreeSlotInfo(BaseModel):
+    id: int
+    start_time: time
+    end_time: time
+    date: date
+    remaining: int  # свободных мест
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Поля, которые можно запросить через fields=
+FREE_SLOT_FIELDS = tuple(FreeSlotInfo.model_fields)
+
+
+class AvailablePeriods(BaseModel):
+    available_periods: List[FreeSlotInfo]
+
+
+class CompactSlots(BaseModel):
+    """Компактный вид: слот - кортеж (начало в минутах от полуночи, длительность в минутах, свободных мест)"""
+    date: date
+    fields: Tuple[str, str, str] = ("start", "duration", "remaining")
+    slots: List[Tuple[int, int, int]]
 
 # class UserSlotInfoFull(BaseModel):
 #     telegram_id: int
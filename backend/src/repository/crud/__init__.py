@@ -2,3 +2,7 @@ from .base import BaseCRUDRepository
 from .booking import BookingCRUDRepository
 from .user import UserCRUDRepository
 from .timeslot import TimeslotCRUDRepository
+from .schedule import ScheduleCRUDRepository
+from .job import JobCRUDRepository
+from .stats import StatsCRUDRepository
+from .partition import PartitionCRUDRepository
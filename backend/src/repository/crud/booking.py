@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import delete, func, tuple_, update
 from sqlalchemy.future import select
 from src.models.db import User, TimeSlot, Booking, UserTimeSlotLink
 from src.models.db.booking_timeslot_link import BookingTimeSlotLink
@@ -10,7 +11,8 @@ from sqlmodel import select
 from .base import BaseCRUDRepository
 from src.utilities.exceptions import UserNotFoundException, BookingNotFoundException, TooSmallBookingDurationException, \
     NotEnoughSlotsException, BookingSaveFailedException, RequestedSlotsBusyException
-from typing import List
+from collections import Counter
+from typing import AsyncIterator, Dict, Iterable, List, Sequence, Tuple
 
 
 class BookingCRUDRepository(BaseCRUDRepository):
@@ -18,16 +20,141 @@ class BookingCRUDRepository(BaseCRUDRepository):
             self,
             telegram_id: Optional[int] = None,
             booking_date: Optional[date] = None,
+            from_date: Optional[date] = None,
+            to_date: Optional[date] = None,
+            after: Optional[Tuple[date, time, int]] = None,
+            limit: Optional[int] = None,
     ) -> List[Booking]:
+        """
+        Брони в порядке (date, start_time, id). after - ключ последней записи предыдущей страницы
+        (keyset-пагинация: следующая страница читается по индексу, а не через OFFSET).
+        """
         query = select(Booking).options(selectinload(Booking.time_slots))
         if telegram_id is not None:
             subquery = select(User.id).where(User.telegram_id == telegram_id)
-            query = query.where(Booking.user_id == subquery)
+            query = query.where(Booking.user_id == subquery.scalar_subquery())
         if booking_date is not None:
             query = query.where(Booking.date == booking_date)
+        if from_date is not None:
+            query = query.where(Booking.date >= from_date)
+        if to_date is not None:
+            query = query.where(Booking.date <= to_date)
+        if after is not None:
+            query = query.where(tuple_(Booking.date, Booking.start_time, Booking.id) > tuple_(*after))
+        query = query.order_by(Booking.date, Booking.start_time, Booking.id)
+        if limit is not None:
+            query = query.limit(limit)
         result = await self.session.execute(query)
         return result.scalars().all()
 
+    async def get_booking_totals(self, today: date) -> Tuple[int, int, int]:
+        """Возвращает (всего броней, на сегодня, предстоящих) одним агрегирующим запросом"""
+        query = select(
+            func.count(Booking.id),
+            func.count(Booking.id).filter(Booking.date == today),
+            func.count(Booking.id).filter(Booking.date >= today),
+        )
+        total, today_count, upcoming = (await self.session.execute(query)).one()
+        return total, today_count, upcoming
+
+    async def count_bookings_by_date(self, start_date: date, end_date: date) -> Dict[date, int]:
+        query = (
+            select(Booking.date, func.count(Booking.id))
+            .where(Booking.date >= start_date, Booking.date <= end_date)
+            .group_by(Booking.date)
+        )
+        result = await self.session.execute(query)
+        return dict(result.all())
+
+    async def get_bookings_with_users(
+            self, from_date: date, to_date: Optional[date] = None, limit: int = 500
+    ) -> List[Tuple]:
+        """
+        Брони начиная с from_date вместе с именем пользователя одним запросом с JOIN, без гидрации ORM-объектов:
+        строки (id, date, start_time, end_time, telegram_id, first_name, second_name).
+        """
+        query = (
+            select(
+                Booking.id, Booking.date, Booking.start_time, Booking.end_time,
+                User.telegram_id, User.first_name, User.second_name,
+            )
+            .join(User, User.id == Booking.user_id)
+            .where(Booking.date >= from_date)
+        )
+        if to_date is not None:
+            query = query.where(Booking.date <= to_date)
+        query = query.order_by(Booking.date, Booking.start_time, Booking.id).limit(limit)
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def stream_bookings(
+            self,
+            from_date: Optional[date] = None,
+            to_date: Optional[date] = None,
+            telegram_id: Optional[int] = None,
+            with_users: bool = False,
+            batch_size: int = 1000,
+    ) -> AsyncIterator:
+        """
+        Построчно отдаёт брони в порядке (date, start_time, id) через серверный курсор:
+        из базы строки читаются пачками по batch_size, весь результат в память не загружается.
+        Строки: (id, date, start_time, end_time, telegram_id[, first_name, second_name, phone_number, age]).
+        """
+        columns = [Booking.id, Booking.date, Booking.start_time, Booking.end_time, User.telegram_id]
+        if with_users:
+            columns += [User.first_name, User.second_name, User.phone_number, User.age]
+        query = select(*columns).join(User, User.id == Booking.user_id)
+        if from_date is not None:
+            query = query.where(Booking.date >= from_date)
+        if to_date is not None:
+            query = query.where(Booking.date <= to_date)
+        if telegram_id is not None:
+            query = query.where(User.telegram_id == telegram_id)
+        query = query.order_by(Booking.date, Booking.start_time, Booking.id).execution_options(yield_per=batch_size)
+        result = await self.session.stream(query)
+        async for row in result:
+            yield row
+
+    async def get_user_booking(self, booking_id: int, user_id: int) -> Optional[Booking]:
+        query = select(Booking).where(Booking.id == booking_id, Booking.user_id == user_id)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def get_booking_slot_ids(self, booking_id: int, booking_date: date) -> List[int]:
+        query = select(BookingTimeSlotLink.time_slot_id).where(
+            BookingTimeSlotLink.booking_id == booking_id, BookingTimeSlotLink.date == booking_date
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def replace_booking_slots(
+            self, booking: Booking, released_ids: List[int], added_ids: List[int], slot_date: date
+    ) -> None:
+        """
+        Меняет набор слотов брони в текущей транзакции: удаляет связи только с освобождёнными слотами
+        и добавляет только новые (slot_date - дата новых слотов, booking.date - ещё прежняя дата брони).
+        Счётчики occupied меняет вызывающий код.
+        """
+        if released_ids:
+            await self.session.execute(
+                delete(BookingTimeSlotLink).where(
+                    BookingTimeSlotLink.booking_id == booking.id,
+                    BookingTimeSlotLink.time_slot_id.in_(released_ids),
+                    BookingTimeSlotLink.date == booking.date,
+                )
+            )
+            await self.session.execute(
+                delete(UserTimeSlotLink).where(
+                    UserTimeSlotLink.user_id == booking.user_id,
+                    UserTimeSlotLink.time_slot_id.in_(released_ids),
+                    UserTimeSlotLink.date == booking.date,
+                )
+            )
+        self.session.add_all(
+            [BookingTimeSlotLink(booking_id=booking.id, time_slot_id=slot_id, date=slot_date) for slot_id in added_ids]
+            + [UserTimeSlotLink(user_id=booking.user_id, time_slot_id=slot_id, date=slot_date) for slot_id in added_ids]
+        )
+
     async def add_booking(self, booking: Booking) -> None:
         self.session.add(booking)
         await self.session.flush()  # Обеспечивает заполнение booking.id
@@ -39,30 +166,75 @@ class BookingCRUDRepository(BaseCRUDRepository):
             await self.session.rollback()
             raise BookingSaveFailedException(f"Error while saving booking: {str(e)}")
 
-    async def delete_booking(self, booking: Booking) -> None:
-        # Сначала удаляем все связи с таймслотами
-        booking_links_stmt = select(BookingTimeSlotLink).where(BookingTimeSlotLink.booking_id == booking.id)
-        booking_links_result = await self.session.execute(booking_links_stmt)
-        booking_links = booking_links_result.scalars().all()
-        
-        # Удаляем связи booking-timeslot
-        for link in booking_links:
-            await self.session.delete(link)
-        
-        # Удаляем связи user-timeslot для этого бронирования
-        user_links_stmt = select(UserTimeSlotLink).where(
-            UserTimeSlotLink.user_id == booking.user_id,
-            UserTimeSlotLink.time_slot_id.in_([link.time_slot_id for link in booking_links])
-        )
-        user_links_result = await self.session.execute(user_links_stmt)
-        user_links = user_links_result.scalars().all()
-        
-        for link in user_links:
-            await self.session.delete(link)
-        
-        # Теперь удаляем само бронирование
-        await self.session.delete(booking)
+    async def delete_booking(self, booking: Booking) -> List[int]:
+        """Удаляет бронь вместе со связями и освобождает места, возвращает id освобождённых слотов"""
+        _, freed_slot_ids = await self.delete_bookings([booking.id], [booking.date])
         await self.session.commit()
+        return freed_slot_ids
+
+    async def delete_bookings(
+            self, booking_ids: Sequence[int], booking_dates: Iterable[date]
+    ) -> Tuple[List[Tuple], List[int]]:
+        """
+        Удаляет брони пачкой в текущей транзакции фиксированным числом запросов, независимо от количества броней:
+        DELETE ... RETURNING для связей и самих броней, затем UPDATE счётчиков occupied.
+        booking_dates - даты этих броней: каждый запрос в Postgres читает только секции нужных месяцев.
+        Возвращает удалённые брони (id, user_id, date) и id освобождённых слотов
+        (слот повторяется столько раз, сколько мест в нём освободилось).
+        """
+        if not booking_ids:
+            return [], []
+        dates = sorted(set(booking_dates))
+        booking_links = (await self.session.execute(
+            delete(BookingTimeSlotLink)
+            .where(BookingTimeSlotLink.booking_id.in_(booking_ids), BookingTimeSlotLink.date.in_(dates))
+            .returning(BookingTimeSlotLink.booking_id, BookingTimeSlotLink.time_slot_id)
+        )).all()
+        deleted = (await self.session.execute(
+            delete(Booking)
+            .where(Booking.id.in_(booking_ids), Booking.date.in_(dates))
+            .returning(Booking.id, Booking.user_id, Booking.date)
+        )).all()
+
+        # Места пользователя в слотах брони
+        user_by_booking = {booking_id: user_id for booking_id, user_id, _ in deleted}
+        user_slots = {(user_by_booking[booking_id], slot_id) for booking_id, slot_id in booking_links}
+        freed_slot_ids = []
+        if user_slots:
+            freed_slot_ids = list((await self.session.execute(
+                delete(UserTimeSlotLink)
+                .where(
+                    tuple_(UserTimeSlotLink.user_id, UserTimeSlotLink.time_slot_id).in_(list(user_slots)),
+                    UserTimeSlotLink.date.in_(dates),
+                )
+                .returning(UserTimeSlotLink.time_slot_id)
+            )).scalars().all())
+
+        # Освобождаем места в той же транзакции: по одному UPDATE на каждое значение "сколько мест освободилось".
+        # Строки слотов блокируются заранее в порядке id, как при бронировании, чтобы не было взаимных блокировок
+        freed_per_slot = Counter(freed_slot_ids)
+        if freed_per_slot:
+            await self.session.execute(
+                select(TimeSlot.id)
+                .where(TimeSlot.id.in_(sorted(freed_per_slot)), TimeSlot.date.in_(dates))
+                .order_by(TimeSlot.id)
+                .with_for_update()
+            )
+        for freed in set(freed_per_slot.values()):
+            await self.session.execute(
+                update(TimeSlot)
+                .where(
+                    TimeSlot.id.in_([slot_id for slot_id, count in freed_per_slot.items() if count == freed]),
+                    TimeSlot.date.in_(dates),
+                )
+                .values(occupied=TimeSlot.occupied - freed)
+                .execution_options(synchronize_session=False)
+            )
+        return deleted, freed_slot_ids
+
+    async def get_booking_ids_by_date(self, booking_date: date) -> List[int]:
+        result = await self.session.execute(select(Booking.id).where(Booking.date == booking_date))
+        return list(result.scalars().all())
 
     async def get_available_timeslots(
             self, booking_date: date, start_time: time, end_time: time, telegram_id: int
@@ -72,6 +244,7 @@ class BookingCRUDRepository(BaseCRUDRepository):
             .where(
                 TimeSlot.date == booking_date,
                 TimeSlot.start_time >= start_time,
+                TimeSlot.occupied < TimeSlot.capacity,
                 ~TimeSlot.visitors.any(User.telegram_id == telegram_id),
             )
             .order_by(TimeSlot.start_time)
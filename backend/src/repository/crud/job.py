@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, func
+from sqlmodel import select
+
+from src.models.db import JobRun
+from .base import BaseCRUDRepository
+
+
+class JobCRUDRepository(BaseCRUDRepository):
+    async def add_run(self, run: JobRun) -> None:
+        self.session.add(run)
+        await self.session.commit()
+
+    async def get_last_success(self, job: str) -> Optional[datetime]:
+        """Начало последнего успешного запуска задачи на любом экземпляре"""
+        result = await self.session.execute(
+            select(func.max(JobRun.started_at)).where(JobRun.job == job, JobRun.status == "success")
+        )
+        return result.scalar_one_or_none()
+
+    async def get_runs(self, job: Optional[str] = None, limit: int = 50) -> List[JobRun]:
+        query = select(JobRun).order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit)
+        if job is not None:
+            query = query.where(JobRun.job == job)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def delete_runs_before(self, moment: datetime) -> int:
+        result = await self.session.execute(delete(JobRun).where(JobRun.started_at < moment))
+        await self.session.commit()
+        return result.rowcount
@@ -0,0 +1,123 @@
+import re
+from datetime import date
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from .base import BaseCRUDRepository
+
+# Таблицы, секционированные по месяцам в Postgres (миграция 9e6b3c1d5f27): сначала те, на которые ссылаются
+PARTITIONED_TABLES = ("timeslot", "booking", "usertimeslotlink", "bookingtimeslotlink")
+# Схема, куда переносятся отсоединённые секции прошлых месяцев
+ARCHIVE_SCHEMA = "archive"
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+class PartitionCRUDRepository(BaseCRUDRepository):
+    """
+    Обслуживание помесячных секций: создание секций на будущие месяцы и перенос старых в архивную схему.
+    Запросы с условием по date (все горячие запросы) читают только секции нужных месяцев.
+    """
+
+    async def is_partitioned(self) -> bool:
+        """Секционирована ли база: на sqlite и в базе из SQLModel.metadata.create_all (тесты) таблицы обычные"""
+        if self.session.bind.dialect.name != "postgresql":
+            return False
+        # relkind имеет тип "char", asyncpg отдаёт его байтами - сравнение выполняется в самом запросе
+        result = await self.session.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('public.timeslot')")
+        )
+        return bool(result.scalar_one_or_none())
+
+    async def get_partitions(self, table: str) -> Dict[date, str]:
+        """Секции таблицы в схеме public: первый день месяца -> имя секции"""
+        result = await self.session.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = CAST(:table AS regclass)"
+            ),
+            {"table": f"public.{table}"},
+        )
+        partitions = {}
+        for name in result.scalars():
+            match = re.fullmatch(rf"{table}_p(\d{{4}})_(\d{{2}})", name)
+            if match:
+                partitions[date(int(match[1]), int(match[2]), 1)] = name
+        return partitions
+
+    async def get_missing_months(self, first_day: date, last_day: date) -> List[date]:
+        """
+        Месяцы диапазона без секций: вставка слотов в них упала бы с "no partition of relation found".
+        Для несекционированной базы список пуст
+        """
+        if not await self.is_partitioned():
+            return []
+        existing = await self.get_partitions(PARTITIONED_TABLES[0])
+        missing = []
+        month = month_start(first_day)
+        while month <= last_day:
+            if month not in existing:
+                missing.append(month)
+            month = add_months(month, 1)
+        return missing
+
+    async def create_partitions(self, first_month: date, last_month: date) -> List[str]:
+        """Создаёт недостающие секции всех таблиц с first_month по last_month включительно"""
+        created = []
+        for table in PARTITIONED_TABLES:
+            existing = await self.get_partitions(table)
+            month = first_month
+            while month <= last_month:
+                if month not in existing:
+                    name = partition_name(table, month)
+                    await self.session.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                    ))
+                    created.append(name)
+                month = add_months(month, 1)
+        await self.session.commit()
+        return created
+
+    async def archive_partitions(self, before_month: date) -> List[str]:
+        """
+        Отсоединяет секции месяцев раньше before_month и переносит их в схему archive одной транзакцией.
+        Сначала отсоединяются секции таблиц связей, и у них удаляются внешние ключи на живые таблицы -
+        иначе слоты и брони архивного месяца нельзя было бы отсоединить. Архивные таблицы остаются
+        доступны для отчётов как archive.<таблица>_pГГГГ_ММ.
+        DETACH ненадолго берёт эксклюзивную блокировку родительской таблицы, поэтому задача запускается редко.
+        """
+        await self.session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{ARCHIVE_SCHEMA}"'))
+        archived = []
+        for table in reversed(PARTITIONED_TABLES):
+            for month, name in sorted((await self.get_partitions(table)).items()):
+                if month >= before_month:
+                    continue
+                await self.session.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+                foreign_keys = await self.session.execute(
+                    text(
+                        "SELECT conname FROM pg_constraint "
+                        "WHERE conrelid = CAST(:name AS regclass) AND contype = 'f' "
+                        "AND confrelid IN (CAST('public.timeslot' AS regclass), CAST('public.booking' AS regclass))"
+                    ),
+                    {"name": f"public.{name}"},
+                )
+                for constraint in foreign_keys.scalars().all():
+                    await self.session.execute(text(f'ALTER TABLE "{name}" DROP CONSTRAINT "{constraint}"'))
+                await self.session.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{ARCHIVE_SCHEMA}"'))
+                archived.append(name)
+        await self.session.commit()
+        return archived
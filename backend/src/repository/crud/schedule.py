@@ -0,0 +1,169 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+
+from src.models.db import ScheduleClosure, ScheduleDayState, ScheduleInterval, TimeSlot, UserTimeSlotLink
+from src.models.db.booking_timeslot_link import BookingTimeSlotLink
+from .base import BaseCRUDRepository
+from .timeslot import slot_has_links
+
+
+class ScheduleCRUDRepository(BaseCRUDRepository):
+    async def get_template(self, start_date: date, end_date: date) -> Tuple[
+        List[ScheduleInterval], List[ScheduleInterval], Set[date]
+    ]:
+        """Недельные интервалы, интервалы-замены на даты диапазона и закрытые дни диапазона"""
+        intervals = (await self.session.execute(
+            select(ScheduleInterval)
+            .where(
+                ScheduleInterval.weekday.is_not(None)
+                | ScheduleInterval.date.between(start_date, end_date)
+            )
+            .order_by(ScheduleInterval.start_time)
+        )).scalars().all()
+        closures = (await self.session.execute(
+            select(ScheduleClosure.date).where(ScheduleClosure.date.between(start_date, end_date))
+        )).scalars().all()
+        weekly = [interval for interval in intervals if interval.weekday is not None]
+        overrides = [interval for interval in intervals if interval.date is not None]
+        return weekly, overrides, set(closures)
+
+    async def get_closures(self, from_date: date) -> List[ScheduleClosure]:
+        result = await self.session.execute(
+            select(ScheduleClosure).where(ScheduleClosure.date >= from_date).order_by(ScheduleClosure.date)
+        )
+        return result.scalars().all()
+
+    async def get_override_intervals(self, from_date: date) -> List[ScheduleInterval]:
+        result = await self.session.execute(
+            select(ScheduleInterval)
+            .where(ScheduleInterval.date >= from_date)
+            .order_by(ScheduleInterval.date, ScheduleInterval.start_time)
+        )
+        return result.scalars().all()
+
+    async def replace_weekly_intervals(self, intervals: Sequence[ScheduleInterval]) -> None:
+        await self.session.execute(delete(ScheduleInterval).where(ScheduleInterval.weekday.is_not(None)))
+        self.session.add_all(intervals)
+        await self.session.commit()
+
+    async def set_day(self, day: date, intervals: Sequence[ScheduleInterval], closed: bool, reason: str = None) -> None:
+        """Задаёт для даты свои интервалы или закрывает её, заменяя прежние настройки этой даты"""
+        await self._clear_day(day)
+        if closed:
+            self.session.add(ScheduleClosure(date=day, reason=reason))
+        else:
+            self.session.add_all(intervals)
+        await self.session.commit()
+
+    async def reset_day(self, day: date) -> None:
+        """Возвращает дате недельное расписание"""
+        await self._clear_day(day)
+        await self.session.commit()
+
+    async def _clear_day(self, day: date) -> None:
+        await self.session.execute(delete(ScheduleInterval).where(ScheduleInterval.date == day))
+        await self.session.execute(delete(ScheduleClosure).where(ScheduleClosure.date == day))
+
+    async def delete_day_states_before(self, before: date) -> int:
+        result = await self.session.execute(delete(ScheduleDayState).where(ScheduleDayState.date < before))
+        await self.session.commit()
+        return result.rowcount
+
+    async def get_day_fingerprints(self, start_date: date, end_date: date) -> Dict[date, str]:
+        result = await self.session.execute(
+            select(ScheduleDayState.date, ScheduleDayState.fingerprint)
+            .where(ScheduleDayState.date.between(start_date, end_date))
+        )
+        return dict(result.all())
+
+    async def get_day_slots(self, days: Sequence[date]) -> Dict[date, List[Tuple]]:
+        """
+        Слоты дней: (id, date, start_time, end_time, capacity, occupied, есть ли записи).
+        Записи проверяются по таблицам связей, а не только по occupied
+        """
+        if not days:
+            return {}
+        has_links = slot_has_links(UserTimeSlotLink) | slot_has_links(BookingTimeSlotLink)
+        result = await self.session.execute(
+            select(
+                TimeSlot.id, TimeSlot.date, TimeSlot.start_time, TimeSlot.end_time,
+                TimeSlot.capacity, TimeSlot.occupied, has_links,
+            )
+            .where(TimeSlot.date.in_(list(days)))
+            .order_by(TimeSlot.date, TimeSlot.start_time)
+        )
+        slots = defaultdict(list)
+        for row in result.all():
+            slots[row[1]].append(tuple(row))
+        return slots
+
+    async def apply_day_changes(
+            self,
+            new_rows: Sequence[Dict[str, Any]],
+            updates: Iterable[Tuple[int, Dict[str, Any]]],
+            delete_ids: Sequence[int],
+            fingerprints: Dict[date, str],
+            batch_size: int = 1000,
+    ) -> Tuple[int, int]:
+        """
+        Применяет развёртку шаблона одной транзакцией: добавляет слоты (ON CONFLICT DO NOTHING), меняет
+        конец и вместимость существующих, удаляет слоты без записей и сохраняет отпечатки дней.
+        Возвращает количество добавленных и удалённых слотов: слот, в который успели записаться, не удаляется.
+        """
+        dialect = postgresql if self.session.bind.dialect.name == "postgresql" else sqlite
+        created = 0
+        for offset in range(0, len(new_rows), batch_size):
+            result = await self.session.execute(
+                dialect.insert(TimeSlot)
+                .values(list(new_rows[offset:offset + batch_size]))
+                .on_conflict_do_nothing(index_elements=[TimeSlot.date, TimeSlot.start_time])
+                .returning(TimeSlot.id)
+            )
+            created += len(result.all())
+
+        # Одинаковые изменения (обычно новая вместимость) применяются одним UPDATE
+        grouped = defaultdict(list)
+        for slot_id, values in updates:
+            grouped[tuple(sorted(values.items()))].append(slot_id)
+        for values, slot_ids in grouped.items():
+            values = dict(values)
+            if "capacity" in values:
+                # Вместимость не опускается ниже уже занятых мест
+                values["capacity"] = func.greatest(TimeSlot.occupied, values["capacity"]) \
+                    if dialect is postgresql else func.max(TimeSlot.occupied, values["capacity"])
+            await self.session.execute(
+                update(TimeSlot).where(TimeSlot.id.in_(slot_ids)).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+
+        removed = 0
+        if delete_ids:
+            result = await self.session.execute(
+                delete(TimeSlot)
+                .where(
+                    TimeSlot.id.in_(list(delete_ids)),
+                    TimeSlot.occupied == 0,
+                    ~slot_has_links(UserTimeSlotLink),
+                    ~slot_has_links(BookingTimeSlotLink),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            removed = result.rowcount
+
+        if fingerprints:
+            expanded_at = datetime.utcnow()
+            statement = dialect.insert(ScheduleDayState).values([
+                dict(date=day, fingerprint=fingerprint, expanded_at=expanded_at)
+                for day, fingerprint in fingerprints.items()
+            ])
+            await self.session.execute(statement.on_conflict_do_update(
+                index_elements=[ScheduleDayState.date],
+                set_=dict(fingerprint=statement.excluded.fingerprint, expanded_at=statement.excluded.expanded_at),
+            ))
+        await self.session.commit()
+        return created, removed
@@ -0,0 +1,33 @@
+from datetime import date, datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+
+from src.models.db import DailyStats
+from .base import BaseCRUDRepository
+
+
+class StatsCRUDRepository(BaseCRUDRepository):
+    async def get_last_rolled_up_date(self) -> Optional[date]:
+        result = await self.session.execute(select(func.max(DailyStats.date)))
+        return result.scalar_one_or_none()
+
+    async def save_daily_stats(self, rows: Sequence[Tuple[date, int, int, int, int]]) -> None:
+        """Сохраняет итоги дней (date, слотов, вместимость, занято, броней); итоги уже сохранённых дней заменяются"""
+        if not rows:
+            return
+        dialect = postgresql if self.session.bind.dialect.name == "postgresql" else sqlite
+        rolled_up_at = datetime.utcnow()
+        statement = dialect.insert(DailyStats).values([
+            dict(date=day, slots=slots, capacity=capacity, occupied=occupied, bookings=bookings,
+                 rolled_up_at=rolled_up_at)
+            for day, slots, capacity, occupied, bookings in rows
+        ])
+        await self.session.execute(statement.on_conflict_do_update(
+            index_elements=[DailyStats.date],
+            set_={column: statement.excluded[column]
+                  for column in ("slots", "capacity", "occupied", "bookings", "rolled_up_at")},
+        ))
+        await self.session.commit()
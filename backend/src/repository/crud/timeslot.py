@@ -1,12 +1,24 @@
+from sqlalchemy import Interval, case, delete, func, literal_column, type_coerce, update
 from sqlalchemy.future import select
-from src.models.db import TimeSlot
-from datetime import date, time
+from src.models.db import Booking, TimeSlot, UserTimeSlotLink
+from src.models.db.booking_timeslot_link import BookingTimeSlotLink
+from datetime import date, time, timedelta
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
-from typing import Optional
+from typing import Iterable, List, Optional, Sequence, Tuple
+from src.repository.routing import day_write_key, reads_from_replica, use_primary, written_recently
 from .base import BaseCRUDRepository
 
 
+def slot_has_links(link_model):
+    """Есть ли у слота TimeSlot связи в link_model; условие по дате отсекает секции других месяцев"""
+    return (
+        select(link_model.time_slot_id)
+        .where(link_model.time_slot_id == TimeSlot.id, link_model.date == TimeSlot.date)
+        .exists()
+    )
+
+
 class TimeslotCRUDRepository(BaseCRUDRepository):
     async def get_timeslots_by_date(self, selected_date: date, start_time: Optional[time] = None):
         query = (
@@ -30,3 +42,255 @@ class TimeslotCRUDRepository(BaseCRUDRepository):
         )
         result = await self.session.execute(query)
         return result.scalars().all()
+
+    async def get_timeslots_by_ids(self, slot_ids: Sequence[int], slot_date: date) -> List[TimeSlot]:
+        """Слоты по id; условие по дате слотов оставляет в Postgres одну секцию"""
+        if not slot_ids:
+            return []
+        query = (
+            select(TimeSlot)
+            .where(TimeSlot.id.in_(slot_ids), TimeSlot.date == slot_date)
+            .order_by(TimeSlot.start_time)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_slot_states(self, start_date: date, end_date: date):
+        """
+        Получает состояние слотов в диапазоне дат двумя лёгкими запросами без гидрации ORM-объектов:
+        строки (id, date, start_time, end_time, capacity, occupied) и пары (time_slot_id, user_id) посетителей.
+        Результат кладётся в общий кэш, поэтому дни с недавними записями читаются с основной базы, а не с реплики.
+        """
+        if reads_from_replica(self.session):
+            days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+            if await written_recently(*[day_write_key(day) for day in days]):
+                use_primary(self.session)
+        slots_query = (
+            select(
+                TimeSlot.id, TimeSlot.date, TimeSlot.start_time, TimeSlot.end_time,
+                TimeSlot.capacity, TimeSlot.occupied,
+            )
+            .where(TimeSlot.date >= start_date, TimeSlot.date <= end_date)
+            .order_by(TimeSlot.date, TimeSlot.start_time)
+        )
+        # Дата хранится и в связи, поэтому JOIN не нужен, а в Postgres читаются только секции нужных месяцев
+        visitors_query = (
+            select(UserTimeSlotLink.time_slot_id, UserTimeSlotLink.user_id)
+            .where(UserTimeSlotLink.date >= start_date, UserTimeSlotLink.date <= end_date)
+        )
+        slots = (await self.session.execute(slots_query)).all()
+        visitors = (await self.session.execute(visitors_query)).all()
+        return slots, visitors
+
+    async def get_user_booking_slot_ids(self, booking_id: int, user_id: int) -> List[int]:
+        """id слотов брони пользователя; пустой список, если брони нет или она чужая"""
+        query = (
+            select(BookingTimeSlotLink.time_slot_id)
+            .join(Booking, (Booking.id == BookingTimeSlotLink.booking_id) & (Booking.date == BookingTimeSlotLink.date))
+            .where(BookingTimeSlotLink.booking_id == booking_id, Booking.user_id == user_id)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def get_free_timeslots_by_date(
+            self, selected_date: date, user_id: Optional[int] = None, start_time: Optional[time] = None,
+            end_time: Optional[time] = None,
+    ) -> List[TimeSlot]:
+        """
+        Получает таймслоты на дату, в которых есть свободные места.
+        Если передан user_id, исключает слоты, в которые пользователь уже записан.
+        start_time и end_time ограничивают слоты теми, что начинаются в [start_time, end_time).
+        """
+        query = select(TimeSlot).where(TimeSlot.date == selected_date, TimeSlot.occupied < TimeSlot.capacity)
+        if user_id is not None:
+            query = query.where(~self._user_booked_clause(user_id))
+        if start_time:
+            query = query.where(TimeSlot.start_time >= start_time)
+        if end_time:
+            query = query.where(TimeSlot.start_time < end_time)
+        query = query.order_by(TimeSlot.start_time)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_training_start_slots(
+            self, selected_date: date, user_id: int, training_duration: int, start_time: Optional[time] = None
+    ) -> List[TimeSlot]:
+        """
+        Находит одним запросом слоты, с которых можно начать тренировку длительностью training_duration минут.
+        Свободные для пользователя слоты дня разбиваются на непрерывные цепочки (LAG по start_time),
+        слот подходит, если от его начала до конца цепочки не меньше training_duration.
+        """
+        free = (
+            select(
+                TimeSlot.id,
+                TimeSlot.start_time,
+                TimeSlot.end_time,
+                func.lag(TimeSlot.end_time).over(order_by=TimeSlot.start_time).label("prev_end"),
+            )
+            .where(
+                TimeSlot.date == selected_date,
+                TimeSlot.occupied < TimeSlot.capacity,
+                ~self._user_booked_clause(user_id),
+            )
+            .cte("free")
+        )
+        chain_start = case((free.c.prev_end == free.c.start_time, literal_column("0")), else_=literal_column("1"))
+        chains = select(
+            free.c.id,
+            free.c.start_time,
+            free.c.end_time,
+            func.sum(chain_start).over(order_by=free.c.start_time).label("chain"),
+        ).cte("chains")
+        chain_ends = select(
+            chains.c.id,
+            chains.c.start_time,
+            func.max(chains.c.end_time).over(partition_by=chains.c.chain).label("chain_end"),
+        ).cte("chain_ends")
+        start_ids = select(chain_ends.c.id).where(
+            type_coerce(chain_ends.c.chain_end - chain_ends.c.start_time, Interval) >= timedelta(minutes=training_duration)
+        )
+        if start_time:
+            start_ids = start_ids.where(chain_ends.c.start_time >= start_time)
+
+        query = (
+            select(TimeSlot)
+            .where(TimeSlot.id.in_(start_ids))
+            .order_by(TimeSlot.start_time)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_available_dates(
+            self, start_date: date, end_date: date, user_id: Optional[int] = None
+    ) -> List[date]:
+        """
+        Возвращает даты из диапазона [start_date, end_date], в которых есть хотя бы один
+        таймслот со свободными местами. Считается одним запросом, без загрузки ORM-объектов.
+        Если передан user_id, слоты, в которые пользователь уже записан, не учитываются.
+        """
+        query = select(TimeSlot.date).where(
+            TimeSlot.date >= start_date,
+            TimeSlot.date <= end_date,
+            TimeSlot.occupied < TimeSlot.capacity,
+        )
+        if user_id is not None:
+            query = query.where(~self._user_booked_clause(user_id))
+        query = query.distinct().order_by(TimeSlot.date)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_daily_occupancy(self, start_date: date, end_date: date) -> List[Tuple[date, int, int, int]]:
+        """Возвращает по дням (date, количество слотов, суммарная вместимость, занято мест) через GROUP BY"""
+        query = (
+            select(TimeSlot.date, func.count(TimeSlot.id), func.sum(TimeSlot.capacity), func.sum(TimeSlot.occupied))
+            .where(TimeSlot.date >= start_date, TimeSlot.date <= end_date)
+            .group_by(TimeSlot.date)
+            .order_by(TimeSlot.date)
+        )
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
+
+    async def get_first_slot_date(self) -> Optional[date]:
+        result = await self.session.execute(select(func.min(TimeSlot.date)))
+        return result.scalar_one_or_none()
+
+    async def delete_free_slots_before(self, before: date) -> int:
+        """Удаляет прошедшие слоты, в которые никто не записан; слоты с записями остаются для истории броней"""
+        result = await self.session.execute(
+            delete(TimeSlot)
+            .where(
+                TimeSlot.date < before,
+                TimeSlot.occupied == 0,
+                ~slot_has_links(UserTimeSlotLink),
+                ~slot_has_links(BookingTimeSlotLink),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    async def lock_slots(self, slot_ids: Sequence[int], slot_dates: Iterable[date]) -> None:
+        """
+        Блокирует строки слотов до конца транзакции в порядке id. Транзакции, меняющие счётчики нескольких слотов,
+        берут блокировки в одном порядке и не попадают во взаимную блокировку (например, встречные переносы A->B и B->A).
+        Повторная блокировка уже заблокированных строк в той же транзакции ничего не стоит.
+        slot_dates - даты слотов: по ним Postgres читает только секции нужных месяцев.
+        """
+        if not slot_ids:
+            return
+        await self.session.execute(
+            select(TimeSlot.id)
+            .where(TimeSlot.id.in_(sorted(set(slot_ids))), TimeSlot.date.in_(sorted(set(slot_dates))))
+            .order_by(TimeSlot.id)
+            .with_for_update()
+        )
+
+    async def change_occupancy(self, slot_ids: Sequence[int], delta: int, slot_date: date) -> None:
+        """Изменяет счётчик занятых мест у слотов даты slot_date в рамках текущей транзакции"""
+        if not slot_ids:
+            return
+        await self.session.execute(
+            update(TimeSlot)
+            .where(TimeSlot.id.in_(slot_ids), TimeSlot.date == slot_date)
+            .values(occupied=TimeSlot.occupied + delta)
+        )
+
+    async def reserve_slots(self, slot_ids: Sequence[int], slot_date: date) -> List[int]:
+        """
+        Занимает по одному месту в каждом слоте одним условным UPDATE и возвращает id слотов,
+        в которых место нашлось. Строки остаются заблокированными до конца транзакции, а конкурирующий
+        UPDATE после ожидания перепроверяет условие occupied < capacity, поэтому вместимость не превышается.
+        Если вернулись не все id, вызывающий код должен откатить транзакцию.
+        Строки блокируются заранее в порядке id: порядок, в котором их блокирует сам UPDATE, не определён.
+        Все слоты брони - одной даты slot_date.
+        """
+        if not slot_ids:
+            return []
+        await self.lock_slots(slot_ids, [slot_date])
+        result = await self.session.execute(
+            update(TimeSlot)
+            .where(TimeSlot.id.in_(slot_ids), TimeSlot.date == slot_date, TimeSlot.occupied < TimeSlot.capacity)
+            .values(occupied=TimeSlot.occupied + 1)
+            .returning(TimeSlot.id)
+        )
+        return list(result.scalars().all())
+
+    async def get_occupancy_drift(self) -> List[Tuple[int, int, int]]:
+        """Возвращает (id, occupied, фактическое количество посетителей) для слотов с рассинхронизированным счётчиком"""
+        actual = self._actual_occupancy()
+        query = select(TimeSlot.id, TimeSlot.occupied, actual).where(TimeSlot.occupied != actual).order_by(TimeSlot.id)
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
+
+    async def repair_occupancy_drift(self) -> int:
+        """Пересчитывает счётчик занятых мест по таблице связей, возвращает количество исправленных слотов"""
+        actual = self._actual_occupancy()
+        result = await self.session.execute(
+            update(TimeSlot)
+            .where(TimeSlot.occupied != actual)
+            .values(occupied=actual)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def _user_booked_clause(user_id: int):
+        return (
+            select(UserTimeSlotLink.time_slot_id)
+            .where(
+                UserTimeSlotLink.time_slot_id == TimeSlot.id,
+                UserTimeSlotLink.date == TimeSlot.date,
+                UserTimeSlotLink.user_id == user_id,
+            )
+            .exists()
+        )
+
+    @staticmethod
+    def _actual_occupancy():
+        return (
+            select(func.count())
+            .select_from(UserTimeSlotLink)
+            .where(UserTimeSlotLink.time_slot_id == TimeSlot.id, UserTimeSlotLink.date == TimeSlot.date)
+            .scalar_subquery()
+        )
@@ -1,16 +1,83 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
 from sqlalchemy.future import select
 from src.models.db import User
 from sqlmodel import select
 from .base import BaseCRUDRepository
+from src.repository.routing import mark_written, user_write_key
+from src.utilities.cache import create_cache
 from src.utilities.exceptions import UserNotFoundException
 
 
+@dataclass(frozen=True)
+class UserInfo:
+    """Неизменяемый снимок пользователя для кэша: используется в путях только на чтение"""
+    id: int
+    telegram_id: int
+    first_name: Optional[str]
+    second_name: Optional[str]
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserInfo":
+        return cls(
+            id=user.id, telegram_id=user.telegram_id, first_name=user.first_name,
+            second_name=user.second_name, is_admin=bool(user.is_admin),
+        )
+
+
+def encode_user(info: UserInfo) -> bytes:
+    payload = [info.id, info.telegram_id, info.first_name, info.second_name, info.is_admin]
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def decode_user(raw: bytes) -> UserInfo:
+    return UserInfo(*json.loads(raw))
+
+
+# Кэш пользователей: telegram_id -> UserInfo. Отсутствующие пользователи не кэшируются
+user_cache = create_cache(
+    namespace="user",
+    encode=encode_user,
+    decode=decode_user,
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "300")),
+)
+
+
 class UserCRUDRepository(BaseCRUDRepository):
     async def get_user_by_telegram_id(self, telegram_id: int) -> User:
         result = await self.session.execute(select(User).where(User.telegram_id == telegram_id))
         user = result.scalar_one_or_none()
         return user
 
+    async def get_user_info(self, telegram_id: int) -> Optional[UserInfo]:
+        """Пользователь из кэша, при промахе читается из базы. Для изменений использовать get_user_by_telegram_id"""
+        key = str(telegram_id)
+        info = await user_cache.get(key)
+        if info is not None:
+            return info
+        async with user_cache.fill_lock(key):
+            info = await user_cache.get(key)
+            if info is None:
+                generation = await user_cache.load_generation()
+                user = await self.get_user_by_telegram_id(telegram_id)
+                if user is None:
+                    return None
+                info = UserInfo.from_user(user)
+                await user_cache.set(key, info, generation=generation)
+        return info
+
+    async def get_telegram_ids(self, user_ids: Iterable[int]) -> List[int]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        result = await self.session.execute(select(User.telegram_id).where(User.id.in_(user_ids)))
+        return list(result.scalars().all())
+
     async def create_user(self, telegram_id: int, phone_number: str, first_name: str, second_name: str, age: int):
         new_user = User(
             telegram_id=telegram_id,
@@ -21,11 +88,14 @@ class UserCRUDRepository(BaseCRUDRepository):
         )
         self.session.add(new_user)
         await self.session.commit()
+        await mark_written(user_write_key(telegram_id))
         return new_user
 
     async def update_user(self, user: User):
         self.session.add(user)
         await self.session.commit()
         await self.session.refresh(user)
+        await mark_written(user_write_key(user.telegram_id))
+        await user_cache.invalidate(str(user.telegram_id))
         return user
 
@@ -0,0 +1,66 @@
+"""unique timeslot date start_time
+
+Revision ID: 0b5d2e7a8c31
+Revises: f41b7c2d9a10
+Create Date: 2026-10-18 22:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b5d2e7a8c31'
+down_revision: Union[str, None] = 'f41b7c2d9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+WEEKDAYS_RU = {
+    'Понедельник': 'Monday',
+    'Вторник': 'Tuesday',
+    'Среда': 'Wednesday',
+    'Четверг': 'Thursday',
+    'Пятница': 'Friday',
+    'Суббота': 'Saturday',
+    'Воскресенье': 'Sunday',
+}
+INCLUDE = ['end_time', 'capacity', 'occupied']
+
+
+def upgrade() -> None:
+    # Корневой create_schedule.py писал дни недели по-русски, генерация расписания теперь пишет по-английски
+    for russian, english in WEEKDAYS_RU.items():
+        op.execute(sa.text("UPDATE timeslot SET weekday = :english WHERE weekday = :russian")
+                   .bindparams(english=english, russian=russian))
+
+    # Дубликаты (date, start_time), в которые никто не записан, удаляются: остаётся слот с меньшим id.
+    # Если записи есть в нескольких дубликатах, построение уникального индекса упадёт - их нужно свести вручную
+    op.execute("""
+        DELETE FROM timeslot t
+        USING timeslot keep
+        WHERE keep.date = t.date AND keep.start_time = t.start_time AND keep.id < t.id
+          AND t.occupied = 0
+          AND NOT EXISTS (SELECT 1 FROM usertimeslotlink l WHERE l.time_slot_id = t.id)
+          AND NOT EXISTS (SELECT 1 FROM bookingtimeslotlink l WHERE l.time_slot_id = t.id)
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_timeslot_date_start_time', 'timeslot', ['date', 'start_time'],
+            unique=True, postgresql_include=INCLUDE, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index('ix_timeslot_date_start_time', table_name='timeslot',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_timeslot_date_start_time', 'timeslot', ['date', 'start_time'],
+            postgresql_include=INCLUDE, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index('uq_timeslot_date_start_time', table_name='timeslot',
+                      postgresql_concurrently=True, if_exists=True)
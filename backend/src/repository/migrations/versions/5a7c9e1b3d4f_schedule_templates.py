@@ -0,0 +1,58 @@
+"""schedule templates
+
+Revision ID: 5a7c9e1b3d4f
+Revises: 0b5d2e7a8c31
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7c9e1b3d4f'
+down_revision: Union[str, None] = '0b5d2e7a8c31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scheduleinterval',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('weekday', sa.Integer(), nullable=True),
+        sa.Column('date', sa.Date(), nullable=True),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('slot_minutes', sa.Integer(), nullable=False),
+        sa.Column('capacity', sa.Integer(), nullable=False),
+        sa.CheckConstraint('(weekday IS NULL) <> (date IS NULL)', name='ck_scheduleinterval_weekday_or_date'),
+        sa.CheckConstraint('start_time < end_time', name='ck_scheduleinterval_time_order'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_scheduleinterval_weekday', 'scheduleinterval', ['weekday'])
+    op.create_index('ix_scheduleinterval_date', 'scheduleinterval', ['date'])
+    op.create_table(
+        'scheduleclosure',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('reason', sqlmodel.sql.sqltypes.AutoString(length=200), nullable=True),
+        sa.PrimaryKeyConstraint('date'),
+    )
+    op.create_table(
+        'scheduledaystate',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('fingerprint', sqlmodel.sql.sqltypes.AutoString(length=40), nullable=False),
+        sa.Column('expanded_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('date'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scheduledaystate')
+    op.drop_table('scheduleclosure')
+    op.drop_index('ix_scheduleinterval_date', table_name='scheduleinterval')
+    op.drop_index('ix_scheduleinterval_weekday', table_name='scheduleinterval')
+    op.drop_table('scheduleinterval')
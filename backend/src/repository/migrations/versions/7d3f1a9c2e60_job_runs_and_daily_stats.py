@@ -0,0 +1,50 @@
+"""job runs and daily stats
+
+Revision ID: 7d3f1a9c2e60
+Revises: 5a7c9e1b3d4f
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f1a9c2e60'
+down_revision: Union[str, None] = '5a7c9e1b3d4f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'jobrun',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job', sqlmodel.sql.sqltypes.AutoString(length=50), nullable=False),
+        sa.Column('instance', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('duration_ms', sa.Float(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column('details', sqlmodel.sql.sqltypes.AutoString(length=500), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_jobrun_job_started_at', 'jobrun', ['job', 'started_at'])
+    op.create_table(
+        'dailystats',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('slots', sa.Integer(), nullable=False),
+        sa.Column('capacity', sa.Integer(), nullable=False),
+        sa.Column('occupied', sa.Integer(), nullable=False),
+        sa.Column('bookings', sa.Integer(), nullable=False),
+        sa.Column('rolled_up_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('date'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dailystats')
+    op.drop_index('ix_jobrun_job_started_at', table_name='jobrun')
+    op.drop_table('jobrun')
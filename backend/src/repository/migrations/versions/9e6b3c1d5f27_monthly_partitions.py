@@ -0,0 +1,198 @@
+"""monthly partitions for timeslot, booking and link tables
+
+Revision ID: 9e6b3c1d5f27
+Revises: 7d3f1a9c2e60
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e6b3c1d5f27'
+down_revision: Union[str, None] = '7d3f1a9c2e60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Секции создаются на столько месяцев вперёд; дальше их добавляет фоновая задача partitions
+MONTHS_AHEAD = 12
+
+# Секционированные таблицы. Первичные ключи и внешние ключи на секционированные таблицы обязаны включать
+# ключ секционирования, поэтому в связях появилась дата слота
+PARTITIONED = {
+    'timeslot': """
+        CREATE TABLE timeslot (
+            id integer NOT NULL DEFAULT nextval('timeslot_id_seq'),
+            start_time time NOT NULL,
+            end_time time NOT NULL,
+            date date NOT NULL,
+            weekday varchar(20) NOT NULL,
+            capacity integer NOT NULL DEFAULT 4,
+            occupied integer NOT NULL DEFAULT 0,
+            CONSTRAINT timeslot_pkey PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """,
+    'booking': """
+        CREATE TABLE booking (
+            id integer NOT NULL DEFAULT nextval('booking_id_seq'),
+            user_id integer NOT NULL REFERENCES "user" (id),
+            start_time time NOT NULL,
+            end_time time NOT NULL,
+            date date NOT NULL,
+            CONSTRAINT booking_pkey PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """,
+    'usertimeslotlink': """
+        CREATE TABLE usertimeslotlink (
+            user_id integer NOT NULL REFERENCES "user" (id),
+            time_slot_id integer NOT NULL,
+            date date NOT NULL,
+            CONSTRAINT usertimeslotlink_pkey PRIMARY KEY (user_id, time_slot_id, date),
+            FOREIGN KEY (time_slot_id, date) REFERENCES timeslot (id, date)
+        ) PARTITION BY RANGE (date)
+    """,
+    'bookingtimeslotlink': """
+        CREATE TABLE bookingtimeslotlink (
+            booking_id integer NOT NULL,
+            time_slot_id integer NOT NULL,
+            date date NOT NULL,
+            CONSTRAINT bookingtimeslotlink_pkey PRIMARY KEY (booking_id, time_slot_id, date),
+            FOREIGN KEY (booking_id, date) REFERENCES booking (id, date),
+            FOREIGN KEY (time_slot_id, date) REFERENCES timeslot (id, date)
+        ) PARTITION BY RANGE (date)
+    """,
+}
+COLUMNS = {
+    'timeslot': 'id, start_time, end_time, date, weekday, capacity, occupied',
+    'booking': 'id, user_id, start_time, end_time, date',
+    'usertimeslotlink': 'user_id, time_slot_id, date',
+    'bookingtimeslotlink': 'booking_id, time_slot_id, date',
+}
+SEQUENCES = {'timeslot': 'timeslot_id_seq', 'booking': 'booking_id_seq'}
+# (имя, таблица, колонки, уникальный, INCLUDE) - индексы на родительских таблицах создаются и в каждой секции
+INDEXES = [
+    ('uq_timeslot_date_start_time', 'timeslot', ['date', 'start_time'], True, ['end_time', 'capacity', 'occupied']),
+    ('ix_booking_user_id_date', 'booking', ['user_id', 'date', 'start_time'], False, None),
+    ('ix_booking_date_start_time_id', 'booking', ['date', 'start_time', 'id'], False, None),
+    ('ix_usertimeslotlink_time_slot_id_user_id', 'usertimeslotlink', ['time_slot_id', 'user_id'], False, None),
+    ('ix_bookingtimeslotlink_time_slot_id_booking_id', 'bookingtimeslotlink', ['time_slot_id', 'booking_id'],
+     False, None),
+]
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def drop_indexes() -> None:
+    for name, table, _, _, _ in INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
+
+
+def create_indexes() -> None:
+    for name, table, columns, unique, include in INDEXES:
+        op.create_index(name, table, columns, unique=unique, postgresql_include=include or [])
+
+
+def upgrade() -> None:
+    # Таблицы переписываются целиком под эксклюзивными блокировками: миграцию нужно запускать
+    # в окно обслуживания, когда бот и API остановлены
+    conn = op.get_bind()
+
+    # Дата слота в таблицах связей - ключ их секционирования
+    for link in ('usertimeslotlink', 'bookingtimeslotlink'):
+        op.add_column(link, sa.Column('date', sa.Date(), nullable=True))
+        op.execute(f"UPDATE {link} SET date = timeslot.date FROM timeslot WHERE timeslot.id = {link}.time_slot_id")
+        op.alter_column(link, 'date', nullable=False)
+
+    today = date.today()
+    first_day, last_day = conn.execute(sa.text(
+        "SELECT least((SELECT min(date) FROM timeslot), (SELECT min(date) FROM booking)), "
+        "greatest((SELECT max(date) FROM timeslot), (SELECT max(date) FROM booking))"
+    )).one()
+    first_month = (first_day or today).replace(day=1)
+    last_month = max((last_day or today).replace(day=1), add_months(today.replace(day=1), MONTHS_AHEAD))
+
+    # Старые таблицы переименовываются, имена их первичных ключей и индексов освобождаются для новых
+    drop_indexes()
+    for table in PARTITIONED:
+        op.rename_table(table, f'{table}_unpartitioned')
+        op.execute(f'ALTER TABLE {table}_unpartitioned RENAME CONSTRAINT {table}_pkey TO {table}_unpartitioned_pkey')
+
+    for table, ddl in PARTITIONED.items():
+        op.execute(ddl)
+        month = first_month
+        while month <= last_month:
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+            month = add_months(month, 1)
+        op.execute(f"INSERT INTO {table} ({COLUMNS[table]}) SELECT {COLUMNS[table]} FROM {table}_unpartitioned")
+
+    # Последовательности id переходят к новым таблицам, поэтому нумерация продолжается без setval
+    for table, sequence in SEQUENCES.items():
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    for table in reversed(list(PARTITIONED)):
+        op.drop_table(f'{table}_unpartitioned')
+
+    create_indexes()
+    op.execute('CREATE SCHEMA IF NOT EXISTS archive')
+
+
+def downgrade() -> None:
+    # Возвращает обычные таблицы; секции, уже перенесённые в схему archive, остаются там
+    drop_indexes()
+    for table in PARTITIONED:
+        op.rename_table(table, f'{table}_partitioned')
+        op.execute(f'ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey')
+
+    op.execute("""
+        CREATE TABLE timeslot (
+            id integer NOT NULL DEFAULT nextval('timeslot_id_seq') PRIMARY KEY,
+            start_time time NOT NULL,
+            end_time time NOT NULL,
+            date date NOT NULL,
+            weekday varchar(20) NOT NULL,
+            capacity integer NOT NULL DEFAULT 4,
+            occupied integer NOT NULL DEFAULT 0
+        )
+    """)
+    op.execute("""
+        CREATE TABLE booking (
+            id integer NOT NULL DEFAULT nextval('booking_id_seq') PRIMARY KEY,
+            user_id integer NOT NULL REFERENCES "user" (id),
+            start_time time NOT NULL,
+            end_time time NOT NULL,
+            date date NOT NULL
+        )
+    """)
+    op.execute("""
+        CREATE TABLE usertimeslotlink (
+            user_id integer NOT NULL REFERENCES "user" (id),
+            time_slot_id integer NOT NULL REFERENCES timeslot (id),
+            PRIMARY KEY (user_id, time_slot_id)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE bookingtimeslotlink (
+            booking_id integer NOT NULL REFERENCES booking (id),
+            time_slot_id integer NOT NULL REFERENCES timeslot (id),
+            PRIMARY KEY (booking_id, time_slot_id)
+        )
+    """)
+    for table in PARTITIONED:
+        # Дата в связях больше не нужна
+        columns = COLUMNS[table].removesuffix(', date') if table.endswith('link') else COLUMNS[table]
+        op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_partitioned")
+    for table, sequence in SEQUENCES.items():
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    for table in reversed(list(PARTITIONED)):
+        op.execute(f'DROP TABLE {table}_partitioned CASCADE')
+
+    create_indexes()
@@ -0,0 +1,78 @@
+"""initial schema
+
+Revision ID: ab9679a439a3
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ab9679a439a3'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.Integer(), nullable=True),
+        sa.Column('first_name', sqlmodel.sql.sqltypes.AutoString(length=50), nullable=True),
+        sa.Column('second_name', sqlmodel.sql.sqltypes.AutoString(length=50), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('phone_number', sqlmodel.sql.sqltypes.AutoString(length=13), nullable=True),
+        sa.Column('is_admin', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_user_telegram_id'), 'user', ['telegram_id'], unique=True)
+    op.create_table(
+        'timeslot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('weekday', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'booking',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'usertimeslotlink',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('time_slot_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['time_slot_id'], ['timeslot.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'time_slot_id'),
+    )
+    op.create_table(
+        'bookingtimeslotlink',
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('time_slot_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['booking_id'], ['booking.id']),
+        sa.ForeignKeyConstraint(['time_slot_id'], ['timeslot.id']),
+        sa.PrimaryKeyConstraint('booking_id', 'time_slot_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('bookingtimeslotlink')
+    op.drop_table('usertimeslotlink')
+    op.drop_table('booking')
+    op.drop_table('timeslot')
+    op.drop_index(op.f('ix_user_telegram_id'), table_name='user')
+    op.drop_table('user')
@@ -0,0 +1,38 @@
+"""timeslot occupancy counter
+
+Revision ID: c8e2de69cdec
+Revises: ab9679a439a3
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e2de69cdec'
+down_revision: Union[str, None] = 'ab9679a439a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('timeslot', sa.Column('capacity', sa.Integer(), server_default='4', nullable=False))
+    op.add_column('timeslot', sa.Column('occupied', sa.Integer(), server_default='0', nullable=False))
+    # Заполняем счётчик по уже существующим записям
+    op.execute(
+        """
+        UPDATE timeslot
+        SET occupied = (
+            SELECT count(*) FROM usertimeslotlink WHERE usertimeslotlink.time_slot_id = timeslot.id
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('timeslot', 'occupied')
+    op.drop_column('timeslot', 'capacity')
@@ -0,0 +1,47 @@
+"""hot query indexes
+
+Revision ID: f41b7c2d9a10
+Revises: c8e2de69cdec
+Create Date: 2026-10-18 20:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f41b7c2d9a10'
+down_revision: Union[str, None] = 'c8e2de69cdec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя, таблица, колонки, INCLUDE)
+INDEXES = [
+    ('ix_timeslot_date_start_time', 'timeslot', ['date', 'start_time'], ['end_time', 'capacity', 'occupied']),
+    ('ix_booking_user_id_date', 'booking', ['user_id', 'date', 'start_time'], None),
+    ('ix_booking_date_start_time_id', 'booking', ['date', 'start_time', 'id'], None),
+    ('ix_usertimeslotlink_time_slot_id_user_id', 'usertimeslotlink', ['time_slot_id', 'user_id'], None),
+    ('ix_bookingtimeslotlink_time_slot_id_booking_id', 'bookingtimeslotlink', ['time_slot_id', 'booking_id'], None),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись в таблицы, но не может выполняться внутри транзакции.
+    # Если построение прервётся, останется невалидный индекс - его нужно удалить и повторить миграцию
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_include=include or [],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,73 @@
+import os
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from src.utilities.cache import create_cache
+
+# Ключ session.info с движком для чтений (реплика)
+READ_BIND = "read_bind"
+# Сколько секунд после записи связанные с ней чтения идут на основную базу. Должно быть больше отставания реплики
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+
+class RoutingSession(Session):
+    """
+    Синхронная часть AsyncSession с маршрутизацией запросов. Пока в session.info[READ_BIND] задан движок реплики,
+    SELECT (кроме SELECT ... FOR UPDATE) выполняются на нём. Первая запись (flush, INSERT/UPDATE/DELETE,
+    блокирующий SELECT или произвольный SQL) переключает сессию на основную базу до конца её жизни,
+    чтобы сессия видела собственные изменения.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        read_bind = self.info.get(READ_BIND)
+        if read_bind is not None:
+            if not self._flushing and isinstance(clause, Select) and clause._for_update_arg is None:
+                return read_bind
+            self.info.pop(READ_BIND)
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def route_reads(session: AsyncSession, read_engine: AsyncEngine) -> None:
+    session.info[READ_BIND] = read_engine.sync_engine
+
+
+def use_primary(session: AsyncSession) -> None:
+    """Дальнейшие чтения сессии идут на основную базу"""
+    session.info.pop(READ_BIND, None)
+
+
+def reads_from_replica(session: AsyncSession) -> bool:
+    return READ_BIND in session.info
+
+
+# Недавние записи: ключ -> True на READ_YOUR_WRITES_SECONDS. С несколькими воркерами нужен CACHE_BACKEND=redis,
+# иначе запись, сделанная через один воркер, не видна другим
+recent_writes = create_cache(
+    namespace="recent-writes",
+    encode=lambda value: b"1",
+    decode=lambda raw: True,
+    maxsize=int(os.getenv("RECENT_WRITES_CACHE_SIZE", "10000")),
+    ttl=READ_YOUR_WRITES_SECONDS,
+)
+
+
+def user_write_key(telegram_id) -> str:
+    return f"user:{telegram_id}"
+
+
+def day_write_key(day) -> str:
+    return f"day:{day.isoformat()}"
+
+
+async def mark_written(*keys: str) -> None:
+    for key in keys:
+        await recent_writes.set(key, True)
+
+
+async def written_recently(*keys: str) -> bool:
+    for key in keys:
+        if await recent_writes.get(key) is not None:
+            return True
+    return False
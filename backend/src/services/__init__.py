@@ -1,3 +1,4 @@
 from .booking import BookingService
+from .schedule import ScheduleService
 from .timeslot import TimeslotService
 from .user import UserService
@@ -0,0 +1,253 @@
+import json
+import math
+import os
+from array import array
+from dataclasses import dataclass, replace
+from datetime import date, time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from src.repository.routing import day_write_key, mark_written, user_write_key
+from src.utilities.cache import create_cache
+from src.utilities.single_flight import SingleFlight
+
+
+@dataclass(frozen=True)
+class DaySlot:
+    """Состояние таймслота внутри дня: всё, что нужно для расчёта доступности без ORM-объектов."""
+    id: int
+    date: date
+    start_time: time
+    end_time: time
+    capacity: int
+    occupied: int
+    visitors: FrozenSet[int]  # id (User.id) записанных пользователей, берутся из связей без загрузки User
+
+    @property
+    def is_available(self) -> bool:
+        return self.occupied < self.capacity
+
+    @property
+    def remaining(self) -> int:
+        return self.capacity - self.occupied
+
+    @property
+    def start_minutes(self) -> int:
+        return _minutes(self.start_time)
+
+    @property
+    def duration(self) -> int:
+        return _minutes(self.end_time) - _minutes(self.start_time)
+
+    def is_available_for(self, user_id: int) -> bool:
+        return self.is_available and user_id not in self.visitors
+
+    @classmethod
+    def from_timeslot(cls, slot, visitors: FrozenSet[int] = frozenset()) -> "DaySlot":
+        """Строит состояние из ORM-объекта TimeSlot. Посетители не загружаются, если не переданы явно"""
+        return cls(
+            id=slot.id, date=slot.date, start_time=slot.start_time, end_time=slot.end_time,
+            capacity=slot.capacity, occupied=slot.occupied, visitors=visitors,
+        )
+
+
+class DayAvailability:
+    """
+    Битовое представление дня для поиска цепочек подряд идущих слотов.
+    День делится на ячейки по step минут (НОД начал и длительностей слотов, обычно 30), бит i маски - ячейка i
+    от начала первого слота. Слот занимает биты своих ячеек; free - ячейки слотов со свободными местами,
+    для каждого пользователя - ячейки слотов, куда он уже записан. Окно из n свободных ячеек подряд
+    ищется сдвигами и AND за O(log n) операций над целым числом вместо прохода по списку слотов.
+    """
+
+    def __init__(self, slots: Sequence[DaySlot], all_free: bool = False):
+        """slots - слоты дня по возрастанию start_time; all_free - считать свободными все слоты (уже отфильтрованные)"""
+        self.slots = tuple(slots)
+        self.all_free = all_free
+        starts = [_minutes(slot.start_time) for slot in self.slots]
+        ends = [_minutes(slot.end_time) or 24 * 60 for slot in self.slots]
+        self.origin = min(starts, default=0)
+        durations = [end - start for start, end in zip(starts, ends)]
+        self.step = math.gcd(*[start - self.origin for start in starts], *durations) or 1
+        # Свободных мест в слоте по его позиции
+        if all_free:
+            self.remaining = array("B", [1]) * len(self.slots)
+        else:
+            self.remaining = array("B", [min(max(slot.remaining, 0), 255) for slot in self.slots])
+        self.free = 0
+        self.starts = 0
+        self._slot_masks: List[int] = []
+        self._start_positions: Dict[int, int] = {}
+        self._user_masks: Dict[int, int] = {}
+        for position, (start, duration) in enumerate(zip(starts, durations)):
+            first_cell = (start - self.origin) // self.step
+            mask = ((1 << (duration // self.step)) - 1) << first_cell
+            self._slot_masks.append(mask)
+            self.starts |= 1 << first_cell
+            self._start_positions[first_cell] = position
+            if self.remaining[position]:
+                self.free |= mask
+
+    def _cell(self, value: time) -> int:
+        """Номер ячейки, с которой начинается время value (время внутри ячейки округляется вверх)"""
+        return -(-(_minutes(value) - self.origin) // self.step)
+
+    def user_mask(self, user_id: int) -> int:
+        """Ячейки слотов, куда пользователь уже записан; считается при первом запросе пользователя"""
+        mask = self._user_masks.get(user_id)
+        if mask is None:
+            mask = 0
+            if not self.all_free:
+                for slot, slot_mask in zip(self.slots, self._slot_masks):
+                    if user_id in slot.visitors:
+                        mask |= slot_mask
+            self._user_masks[user_id] = mask
+        return mask
+
+    def release(self, user_id: int, slot_ids: Iterable[int]) -> "DayAvailability":
+        """
+        Копия дня, в которой пользователь освободил свои места в слотах slot_ids (например, переносимой брони).
+        Закэшированный объект не меняется
+        """
+        slot_ids = set(slot_ids)
+        return DayAvailability([
+            replace(slot, occupied=slot.occupied - 1, visitors=slot.visitors - {user_id})
+            if slot.id in slot_ids and user_id in slot.visitors else slot
+            for slot in self.slots
+        ])
+
+    def free_for(self, user_id: Optional[int] = None) -> int:
+        """Маска ячеек со свободными местами, куда пользователь ещё не записан"""
+        return self.free & ~self.user_mask(user_id) if user_id is not None else self.free
+
+    def windows(self, mask: int, minutes: int) -> int:
+        """Биты ячеек, с которых в mask подряд идут свободные ячейки общей длительностью не меньше minutes"""
+        cells = max(1, -(-minutes // self.step))
+        covered = 1
+        while covered < cells:
+            shift = min(covered, cells - covered)
+            mask &= mask >> shift
+            covered += shift
+        return mask
+
+    def training_starts(self, training_duration: int, user_id: Optional[int] = None,
+                        start_time: Optional[time] = None) -> List[DaySlot]:
+        """Слоты, с которых можно начать тренировку длительностью training_duration минут"""
+        starts = self.windows(self.free_for(user_id), training_duration) & self.starts
+        if start_time is not None and self.slots:
+            starts &= ~((1 << max(self._cell(start_time), 0)) - 1)
+        return [self.slots[self._start_positions[cell]] for cell in _bits(starts)]
+
+    def has_free(self, user_id: Optional[int] = None) -> bool:
+        return self.free_for(user_id) != 0
+
+    def starts_at(self, start_time: time) -> bool:
+        """Начинается ли в start_time какой-нибудь слот дня"""
+        offset = _minutes(start_time) - self.origin
+        return offset % self.step == 0 and offset // self.step in self._start_positions
+
+    def find_chain(self, start_time: time, end_time: time, user_id: Optional[int] = None) -> Optional[List[DaySlot]]:
+        """Непрерывная цепочка свободных слотов от start_time до слота, покрывающего end_time, или None"""
+        if not self.starts_at(start_time):
+            return None
+        first_cell = self._cell(start_time)
+        duration = _minutes(end_time) - _minutes(start_time)
+        if not self.windows(self.free_for(user_id), duration) >> first_cell & 1:
+            return None
+        cells = max(1, -(-duration // self.step))
+        chain = self.starts & (((1 << cells) - 1) << first_cell)
+        return [self.slots[self._start_positions[cell]] for cell in _bits(chain)]
+
+
+def _bits(mask: int):
+    """Номера установленных битов по возрастанию"""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def encode_day(day_slots: Tuple[DaySlot, ...]) -> bytes:
+    """
+    Компактная сериализация состояния дня для общего кэша:
+    [ordinal даты, [[id, начало в минутах, конец в минутах, capacity, occupied, [user_id...]], ...]]
+    """
+    if not day_slots:
+        return b"[]"
+    payload = [
+        day_slots[0].date.toordinal(),
+        [
+            [slot.id, _minutes(slot.start_time), _minutes(slot.end_time), slot.capacity, slot.occupied,
+             sorted(slot.visitors)]
+            for slot in day_slots
+        ],
+    ]
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def decode_day(raw: bytes) -> Tuple[DaySlot, ...]:
+    payload = json.loads(raw)
+    if not payload:
+        return ()
+    ordinal, rows = payload
+    slot_date = date.fromordinal(ordinal)
+    return tuple(
+        DaySlot(
+            id=slot_id, date=slot_date, start_time=_time(start), end_time=_time(end),
+            capacity=capacity, occupied=occupied, visitors=frozenset(visitors),
+        )
+        for slot_id, start, end, capacity, occupied, visitors in rows
+    )
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _time(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+# Кэш состояния дней: ISO-дата -> DayAvailability со слотами, отсортированными по start_time
+day_availability_cache = create_cache(
+    namespace="day",
+    encode=lambda day: encode_day(day.slots),
+    decode=lambda raw: DayAvailability(decode_day(raw)),
+    maxsize=int(os.getenv("AVAILABILITY_CACHE_SIZE", "64")),
+    ttl=float(os.getenv("AVAILABILITY_CACHE_TTL", "30")),
+)
+
+# Загрузки состояния дней из базы: одинаковые одновременные промахи кэша выполняют один запрос
+day_loads = SingleFlight("day-availability")
+
+
+async def invalidate_days(days: Iterable[date]) -> None:
+    """
+    Сбрасывает кэш доступности для дней, в которых изменились записи или расписание,
+    и увеличивает их версии, из которых строятся ETag ответов. Ближайшие секунды эти дни
+    загружаются в кэш с основной базы, а не с реплики, которая могла ещё не получить изменения.
+    """
+    days = sorted(set(days))
+    keys = [day.isoformat() for day in days]
+    if keys:
+        await mark_written(*[day_write_key(day) for day in days])
+        await day_availability_cache.invalidate(*keys)
+        await day_availability_cache.bump_versions(*keys)
+
+
+async def get_days_versions(days: Iterable[date]) -> List[str]:
+    return await day_availability_cache.get_versions(*[day.isoformat() for day in days])
+
+
+def _user_bookings_key(telegram_id: int) -> str:
+    return f"bookings:{telegram_id}"
+
+
+async def bump_user_bookings_version(telegram_id: int) -> None:
+    """Увеличивает версию списка бронирований пользователя; его чтения ненадолго переходят на основную базу"""
+    await mark_written(user_write_key(telegram_id))
+    await day_availability_cache.bump_versions(_user_bookings_key(telegram_id))
+
+
+async def get_user_bookings_version(telegram_id: int) -> str:
+    versions = await day_availability_cache.get_versions(_user_bookings_key(telegram_id))
+    return versions[0]
@@ -6,11 +6,27 @@ from src.repository.crud import BookingCRUDRepository, UserCRUDRepository, Times
 from src.utilities.exceptions import (
     BookingNotFoundException,
     BookingRequestException,
-    UserNotFoundException
+    RequestedSlotsBusyException,
+    UserNotFoundException,
+    UserUnauthorizedException,
 )
-from datetime import date, time, datetime
+import json
+import os
+from datetime import date, time, datetime, timedelta
+from typing import Any, Dict
+from src.utilities.cache import create_cache
+from .availability import DayAvailability, bump_user_bookings_version, invalidate_days
 from .timeslot import TimeslotService
 
+# Статистика для админки: вкладку обновляют постоянно, поэтому агрегаты кэшируются на несколько секунд
+stats_cache = create_cache(
+    namespace="stats",
+    encode=lambda stats: json.dumps(stats).encode(),
+    decode=json.loads,
+    maxsize=8,
+    ttl=float(os.getenv("STATS_CACHE_TTL", "10")),
+)
+
 
 class BookingService:
     def __init__(self, booking_repo: BookingCRUDRepository, timeslot_repo: TimeslotCRUDRepository,
@@ -31,78 +47,176 @@ class BookingService:
         start_time_obj = datetime.strptime(start_time, "%H:%M:%S").time()
         end_time_obj = datetime.strptime(end_time, "%H:%M:%S").time()
         
-        # Получаем все доступные слоты для данной даты (без фильтрации по времени)
-        all_slots = await self.timeslot_repo.get_timeslots_by_date(selected_date=booking_date_obj)
-        
-        # Фильтруем слоты, доступные для пользователя
-        available_slots = []
-        for slot in all_slots:
-            if user not in slot.visitors and len(slot.visitors) < 4:
-                available_slots.append(slot)
-        
-        # Сортируем по времени начала
-        available_slots.sort(key=lambda x: x.start_time)
-        
-        # Находим последовательность слотов, начинающуюся с нужного времени
-        booking_slots = []
-        start_found = False
-        
-        for slot in available_slots:
-            if slot.start_time == start_time_obj:
-                start_found = True
-                booking_slots.append(slot)
-            elif start_found and booking_slots:
-                # Проверяем, что слот идет сразу после предыдущего
-                last_slot = booking_slots[-1]
-                if last_slot.end_time == slot.start_time:
-                    booking_slots.append(slot)
-                    
-                    # Проверяем, достигли ли мы нужного времени окончания
-                    if slot.end_time >= end_time_obj:
-                        break
-                else:
-                    # Пробел в слотах - останавливаемся
-                    break
-        
-        if not start_found:
-            raise BookingRequestException(f"No available slot found starting at {start_time}")
-        
-        # Проверяем, что у нас есть достаточно времени
-        if not booking_slots:
-            raise BookingRequestException("No consecutive slots available for the requested time")
-        
-        # Проверяем, что последний слот покрывает нужное время окончания
-        last_slot = booking_slots[-1]
-        if last_slot.end_time < end_time_obj:
-            raise BookingRequestException("Requested consecutive slots are not available.")
-        booking = Booking(
-            user_id=user.id,
-            start_time=start_time_obj,
-            end_time=end_time_obj,
-            date=booking_date_obj,
+        # Слоты запрошенного интервала со свободными местами, в которые пользователь ещё не записан
+        available_slots = await self.timeslot_repo.get_free_timeslots_by_date(
+            selected_date=booking_date_obj, user_id=user.id, start_time=start_time_obj, end_time=end_time_obj
         )
-        await self.booking_repo.add_booking(booking)
-        booking_links = [
-            BookingTimeSlotLink(booking_id=booking.id, time_slot_id=slot.id) for slot in booking_slots
-        ]
-        user_slot_links = [
-            UserTimeSlotLink(user_id=user.id, time_slot_id=slot.id) for slot in booking_slots
-        ]
-        self.booking_repo.session.add_all(booking_links + user_slot_links)
+        
+        booking_slots = self._select_chain(available_slots, start_time, start_time_obj, end_time_obj)
+        slot_ids = [slot.id for slot in booking_slots]
+        try:
+            # Места занимаются атомарно: если хотя бы один слот цепочки успели заполнить, откатываем всё
+            reserved_ids = await self.timeslot_repo.reserve_slots(slot_ids, booking_date_obj)
+            if len(reserved_ids) != len(slot_ids):
+                raise RequestedSlotsBusyException("Requested slots have just been taken.")
+
+            booking = Booking(
+                user_id=user.id,
+                start_time=start_time_obj,
+                end_time=end_time_obj,
+                date=booking_date_obj,
+            )
+            await self.booking_repo.add_booking(booking)
+            booking_links = [
+                BookingTimeSlotLink(booking_id=booking.id, time_slot_id=slot_id, date=booking_date_obj) for slot_id in slot_ids
+            ]
+            user_slot_links = [
+                UserTimeSlotLink(user_id=user.id, time_slot_id=slot_id, date=booking_date_obj) for slot_id in slot_ids
+            ]
+            self.booking_repo.session.add_all(booking_links + user_slot_links)
+        except Exception:
+            await self.booking_repo.session.rollback()
+            raise
         await self.booking_repo.commit()
+        await invalidate_days([booking_date_obj])
+        await bump_user_bookings_version(telegram_id)
         return booking
 
     async def delete_booking(self, telegram_id: int, booking_id: int) -> Booking:
         user = await self.user_repo.get_user_by_telegram_id(telegram_id)
         if not user:
             raise UserNotFoundException
-        stmt = select(Booking).where(
-            Booking.id == booking_id,
-            Booking.user_id == user.id,
-        )
-        result = await self.booking_repo.session.execute(stmt)
-        booking_obj = result.scalar_one_or_none()
+        booking_obj = await self.booking_repo.get_user_booking(booking_id, user.id)
         if not booking_obj:
             raise BookingNotFoundException("Booking not found or does not belong to the user.")
         await self.booking_repo.delete_booking(booking_obj)
+        await invalidate_days([booking_obj.date])
+        await bump_user_bookings_version(telegram_id)
         return booking_obj
+
+    async def cancel_bookings_for_day(self, admin_telegram_id: int, booking_date: date) -> Dict[str, int]:
+        """
+        Отменяет все брони на дату (например, зал закрыт) одной транзакцией с фиксированным числом запросов.
+        Доступно только администратору. Возвращает количество отменённых броней и освобождённых мест.
+        """
+        admin = await self.user_repo.get_user_info(admin_telegram_id)
+        if not admin:
+            raise UserNotFoundException
+        if not admin.is_admin:
+            raise UserUnauthorizedException
+
+        booking_ids = await self.booking_repo.get_booking_ids_by_date(booking_date)
+        deleted, freed_slot_ids = await self.booking_repo.delete_bookings(booking_ids, [booking_date])
+        await self.booking_repo.session.commit()
+
+        await invalidate_days([booking_date])
+        user_ids = {user_id for _, user_id, _ in deleted}
+        for telegram_id in await self.user_repo.get_telegram_ids(user_ids):
+            await bump_user_bookings_version(telegram_id)
+        return {"cancelled": len(deleted), "freed_slots": len(freed_slot_ids)}
+
+    async def reschedule_booking(
+            self, telegram_id: int, booking_id: int, booking_date: str, start_time: str, end_time: str
+    ) -> Booking:
+        """
+        Переносит бронь на новые дату и время в одной транзакции. Слоты, общие для старого и нового
+        времени, не трогаются: места занимаются только в новых слотах и освобождаются только в ушедших.
+        """
+        user = await self.user_repo.get_user_by_telegram_id(telegram_id)
+        if not user:
+            raise UserNotFoundException
+        booking = await self.booking_repo.get_user_booking(booking_id=booking_id, user_id=user.id)
+        if not booking:
+            raise BookingNotFoundException("Booking not found or does not belong to the user.")
+
+        booking_date_obj = datetime.strptime(booking_date, "%Y-%m-%d").date()
+        start_time_obj = datetime.strptime(start_time, "%H:%M:%S").time()
+        end_time_obj = datetime.strptime(end_time, "%H:%M:%S").time()
+        old_date = booking.date
+
+        # Свои слоты пользователь уже занимает, поэтому в новой цепочке они считаются свободными
+        old_slot_ids = await self.booking_repo.get_booking_slot_ids(booking.id, old_date)
+        own_slots = await self.timeslot_repo.get_timeslots_by_ids(old_slot_ids, old_date)
+        free_slots = await self.timeslot_repo.get_free_timeslots_by_date(
+            selected_date=booking_date_obj, user_id=user.id, start_time=start_time_obj, end_time=end_time_obj
+        )
+        candidates = sorted(
+            list(free_slots) + [slot for slot in own_slots if slot.date == booking_date_obj],
+            key=lambda slot: slot.start_time,
+        )
+        booking_slots = self._select_chain(candidates, start_time, start_time_obj, end_time_obj)
+
+        new_slot_ids = [slot.id for slot in booking_slots]
+        added_ids = [slot_id for slot_id in new_slot_ids if slot_id not in old_slot_ids]
+        released_ids = [slot_id for slot_id in old_slot_ids if slot_id not in new_slot_ids]
+        try:
+            # Все затронутые слоты блокируются одним запросом в порядке id до изменения счётчиков:
+            # иначе встречные переносы (A->B и B->A) блокируют строки в разном порядке и ждут друг друга
+            await self.timeslot_repo.lock_slots(added_ids + released_ids, {old_date, booking_date_obj})
+            reserved_ids = await self.timeslot_repo.reserve_slots(added_ids, booking_date_obj)
+            if len(reserved_ids) != len(added_ids):
+                raise RequestedSlotsBusyException("Requested slots have just been taken.")
+            await self.timeslot_repo.change_occupancy(released_ids, -1, old_date)
+            await self.booking_repo.replace_booking_slots(
+                booking=booking, released_ids=released_ids, added_ids=added_ids, slot_date=booking_date_obj
+            )
+            booking.date = booking_date_obj
+            booking.start_time = start_time_obj
+            booking.end_time = end_time_obj
+        except Exception:
+            await self.booking_repo.session.rollback()
+            raise
+        await self.booking_repo.commit()
+        await invalidate_days({old_date, booking_date_obj})
+        await bump_user_bookings_version(telegram_id)
+        return booking
+
+    async def get_stats(self, days_ahead: int = 7) -> Dict[str, Any]:
+        """
+        Сводка для админки: количество броней (всего, сегодня, предстоящих) и заполненность слотов
+        по дням на days_ahead дней вперёд. Всё считается агрегирующими запросами без загрузки строк.
+        """
+        today = date.today()
+        cache_key = f"{today.isoformat()}:{days_ahead}"
+        stats = await stats_cache.get(cache_key)
+        if stats is not None:
+            return stats
+
+        end_date = today + timedelta(days=days_ahead - 1)
+        total, today_count, upcoming = await self.booking_repo.get_booking_totals(today)
+        bookings_by_date = await self.booking_repo.count_bookings_by_date(today, end_date)
+        days = []
+        for day, slots, capacity, occupied in await self.timeslot_repo.get_daily_occupancy(today, end_date):
+            days.append({
+                "date": day.isoformat(),
+                "slots": slots,
+                "capacity": capacity or 0,
+                "occupied": occupied or 0,
+                "bookings": bookings_by_date.get(day, 0),
+                "utilization": _percent(occupied, capacity),
+            })
+        stats = {
+            "total": total,
+            "today": today_count,
+            "upcoming": upcoming,
+            "utilization": _percent(sum(day["occupied"] for day in days), sum(day["capacity"] for day in days)),
+            "days": days,
+        }
+        await stats_cache.set(cache_key, stats)
+        return stats
+
+    @staticmethod
+    def _select_chain(slots, start_time: str, start_time_obj: time, end_time_obj: time) -> list:
+        """Из свободных для пользователя слотов выбирает непрерывную цепочку от start_time_obj до end_time_obj"""
+        # Все переданные слоты пригодны, поэтому от них нужны только время и позиция
+        day = DayAvailability(slots, all_free=True)
+        booking_slots = day.find_chain(start_time_obj, end_time_obj)
+        if booking_slots is None:
+            if not day.starts_at(start_time_obj):
+                raise BookingRequestException(f"No available slot found starting at {start_time}")
+            raise BookingRequestException("Requested consecutive slots are not available.")
+        return booking_slots
+
+
+def _percent(part, whole) -> float:
+    return round(100 * part / whole, 1) if whole else 0.0
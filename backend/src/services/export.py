@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import AsyncIterator, Optional
+
+from src.repository.crud import BookingCRUDRepository
+from src.repository.db import async_session
+
+BOOKING_COLUMNS = ["id", "date", "start_time", "end_time", "telegram_id"]
+USER_COLUMNS = ["first_name", "second_name", "phone_number", "age"]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+async def export_bookings(
+        export_format: str,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        telegram_id: Optional[int] = None,
+        with_users: bool = False,
+        chunk_rows: int = 500,
+) -> AsyncIterator[str]:
+    """
+    Генерирует выгрузку броней в CSV или NDJSON кусками по chunk_rows строк.
+    Сессия открывается внутри генератора: сессия запроса закрывается раньше, чем StreamingResponse
+    дочитает ответ, поэтому использовать её здесь нельзя.
+    """
+    columns = BOOKING_COLUMNS + (USER_COLUMNS if with_users else [])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(columns)
+
+    async with async_session() as session:
+        booking_repo = BookingCRUDRepository(async_session=session)
+        rows_in_buffer = 0
+        async for row in booking_repo.stream_bookings(
+                from_date=from_date, to_date=to_date, telegram_id=telegram_id, with_users=with_users
+        ):
+            values = [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+            if export_format == "csv":
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+                buffer.write("\n")
+            rows_in_buffer += 1
+            if rows_in_buffer >= chunk_rows:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                rows_in_buffer = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.models.db import JobRun
+from src.repository import db
+from src.repository.crud.partition import add_months, month_start
+from src.repository.crud import (
+    BookingCRUDRepository,
+    JobCRUDRepository,
+    PartitionCRUDRepository,
+    ScheduleCRUDRepository,
+    StatsCRUDRepository,
+    TimeslotCRUDRepository,
+)
+from .schedule import ScheduleService
+
+logger = logging.getLogger(__name__)
+
+# Фоновые задачи запускаются в lifespan приложения; в тестах и вспомогательных процессах их можно выключить
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "1") == "1"
+# На сколько дней вперёд всегда должны существовать слоты
+SCHEDULE_HORIZON_DAYS = int(os.getenv("SCHEDULE_HORIZON_DAYS", "30"))
+# Сколько дней хранятся прошедшие свободные слоты (итоги дня к этому времени уже в dailystats)
+SLOT_RETENTION_DAYS = int(os.getenv("SLOT_RETENTION_DAYS", "7"))
+JOB_RUN_RETENTION_DAYS = int(os.getenv("JOB_RUN_RETENTION_DAYS", "30"))
+# Секции таблиц создаются на столько месяцев вперёд (покрывает развёртку расписания на год)
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "12"))
+# Секции месяцев старше этого числа месяцев переносятся в схему archive; 0 - не архивировать
+PARTITION_ARCHIVE_AFTER_MONTHS = int(os.getenv("PARTITION_ARCHIVE_AFTER_MONTHS", "12"))
+# Максимальная случайная задержка первого запуска, чтобы экземпляры не стартовали задачи одновременно
+JOB_START_JITTER = float(os.getenv("JOB_START_JITTER", "5"))
+
+INSTANCE = f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def extend_schedule_horizon(session: AsyncSession) -> Dict[str, int]:
+    """Разворачивает шаблон расписания на SCHEDULE_HORIZON_DAYS дней вперёд; неизменившиеся дни пропускаются"""
+    result = await ScheduleService(schedule_repo=ScheduleCRUDRepository(async_session=session)).generate(
+        days=SCHEDULE_HORIZON_DAYS,
+    )
+    return result.as_dict()
+
+
+async def roll_up_daily_stats(session: AsyncSession) -> Dict[str, Any]:
+    """
+    Сохраняет итоги прошедших дней в dailystats: с последнего сохранённого дня (он пересчитывается)
+    или с самого раннего слота до вчерашнего дня
+    """
+    stats_repo = StatsCRUDRepository(async_session=session)
+    timeslot_repo = TimeslotCRUDRepository(async_session=session)
+    start_date = await stats_repo.get_last_rolled_up_date() or await timeslot_repo.get_first_slot_date()
+    end_date = date.today() - timedelta(days=1)
+    if start_date is None or start_date > end_date:
+        return {"days": 0}
+    bookings = await BookingCRUDRepository(async_session=session).count_bookings_by_date(start_date, end_date)
+    rows = [
+        (day, slots, capacity or 0, occupied or 0, bookings.get(day, 0))
+        for day, slots, capacity, occupied in await timeslot_repo.get_daily_occupancy(start_date, end_date)
+    ]
+    await stats_repo.save_daily_stats(rows)
+    return {"days": len(rows), "from": start_date.isoformat()}
+
+
+async def clean_up_past_data(session: AsyncSession) -> Dict[str, int]:
+    """
+    Удаляет прошедшие свободные слоты старше SLOT_RETENTION_DAYS дней, но только за дни, итоги которых
+    уже сохранены и больше не пересчитываются, а также отпечатки прошедших дней расписания
+    и старые записи о запусках задач
+    """
+    before = date.today() - timedelta(days=SLOT_RETENTION_DAYS)
+    last_rolled_up = await StatsCRUDRepository(async_session=session).get_last_rolled_up_date()
+    slots = 0
+    if last_rolled_up is not None:
+        slots = await TimeslotCRUDRepository(async_session=session).delete_free_slots_before(
+            min(before, last_rolled_up),
+        )
+    day_states = await ScheduleCRUDRepository(async_session=session).delete_day_states_before(date.today())
+    job_runs = await JobCRUDRepository(async_session=session).delete_runs_before(
+        datetime.utcnow() - timedelta(days=JOB_RUN_RETENTION_DAYS),
+    )
+    return {"slots": slots, "day_states": day_states, "job_runs": job_runs}
+
+
+async def maintain_partitions(session: AsyncSession) -> Dict[str, Any]:
+    """Создаёт секции на PARTITION_MONTHS_AHEAD месяцев вперёд и переносит старые секции в архив"""
+    partition_repo = PartitionCRUDRepository(async_session=session)
+    if not await partition_repo.is_partitioned():
+        return {"partitioned": False}
+    current = month_start(date.today())
+    created = await partition_repo.create_partitions(current, add_months(current, PARTITION_MONTHS_AHEAD))
+    archived = []
+    if PARTITION_ARCHIVE_AFTER_MONTHS > 0:
+        archived = await partition_repo.archive_partitions(add_months(current, -PARTITION_ARCHIVE_AFTER_MONTHS))
+    return {"created": created, "archived": archived}
+
+
+@dataclass
+class Job:
+    name: str
+    interval: float  # секунды между успешными запусками (по всем экземплярам)
+    func: Callable[[AsyncSession], Awaitable[Any]]
+    # Счётчики этого процесса
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0  # задачу в этот раз выполнял другой экземпляр или она ещё не должна запускаться
+    last_started_at: Optional[datetime] = None
+    last_status: Optional[str] = None
+    last_duration_ms: Optional[float] = None
+    last_details: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_status": self.last_status,
+            "last_duration_ms": self.last_duration_ms,
+            "last_details": self.last_details,
+        }
+
+
+class JobRunner:
+    """
+    Запускает задачи по расписанию в фоне event loop. Каждый запуск выполняется под advisory-блокировкой
+    Postgres с именем задачи: из нескольких воркеров и экземпляров задачу выполняет тот, кто взял блокировку,
+    и только если с последнего успешного запуска (по таблице jobrun) прошло не меньше interval.
+    """
+
+    def __init__(self, jobs: List[Job], session_factory: Optional[async_sessionmaker] = None):
+        self.jobs = {job.name: job for job in jobs}
+        self.session_factory = session_factory
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def _sessions(self) -> async_sessionmaker:
+        return self.session_factory or db.async_session
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._loop(job), name=f"job:{job.name}") for job in self.jobs.values()]
+        logger.info(f"Фоновые задачи запущены: {', '.join(self.jobs)}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self, job: Job) -> None:
+        await asyncio.sleep(random.uniform(0, JOB_START_JITTER))
+        while True:
+            try:
+                await self.run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Сюда попадают только ошибки блокировки и записи о запуске (например, база недоступна)
+                logger.warning(f"Фоновая задача {job.name} не запущена: {e}")
+            # Экземпляр, пропустивший запуск, проверяет снова через интервал - к этому времени задача станет должной
+            await asyncio.sleep(job.interval)
+
+    async def run_job(self, job: Job, force: bool = False) -> Optional[str]:
+        """Выполняет задачу, если эта копия стала лидером и задача должна запускаться; возвращает статус или None"""
+        sessions = self._sessions
+        async with db.advisory_lock(sessions.kw["bind"], f"schedule-bot:job:{job.name}") as acquired:
+            if not acquired:
+                job.skipped += 1
+                return None
+            if not force:
+                async with sessions() as session:
+                    last_success = await JobCRUDRepository(async_session=session).get_last_success(job.name)
+                # Небольшой запас, чтобы запуск по собственному таймеру не пропускался из-за разницы в миллисекундах
+                if last_success and datetime.utcnow() - last_success < timedelta(seconds=job.interval * 0.9):
+                    job.skipped += 1
+                    return None
+
+            started_at = datetime.utcnow()
+            started = time.perf_counter()
+            status = "success"
+            try:
+                async with sessions() as session:
+                    details = await job.func(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                status, details = "failed", f"{type(e).__name__}: {e}"
+                logger.error(f"Фоновая задача {job.name} завершилась с ошибкой: {e}", exc_info=e)
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+
+            job.runs += 1
+            job.failures += status == "failed"
+            job.last_started_at, job.last_status, job.last_duration_ms = started_at, status, duration_ms
+            if details is not None and not isinstance(details, str):
+                details = json.dumps(details, default=str)
+            job.last_details = details[:500] if details is not None else None
+            logger.info("job", extra={"job": job.name, "status": status, "duration_ms": duration_ms})
+
+            async with sessions() as session:
+                await JobCRUDRepository(async_session=session).add_run(JobRun(
+                    job=job.name, instance=INSTANCE, started_at=started_at, duration_ms=duration_ms,
+                    status=status, details=job.last_details,
+                ))
+            return status
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": bool(self._tasks),
+            "instance": INSTANCE,
+            "jobs": {name: job.stats() for name, job in self.jobs.items()},
+        }
+
+
+job_runner = JobRunner([
+    Job("schedule_horizon", float(os.getenv("JOB_SCHEDULE_HORIZON_INTERVAL", "3600")), extend_schedule_horizon),
+    Job("daily_stats_rollup", float(os.getenv("JOB_DAILY_STATS_INTERVAL", "3600")), roll_up_daily_stats),
+    Job("cleanup", float(os.getenv("JOB_CLEANUP_INTERVAL", "21600")), clean_up_past_data),
+    Job("partitions", float(os.getenv("JOB_PARTITIONS_INTERVAL", "86400")), maintain_partitions),
+])
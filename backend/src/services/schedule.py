@@ -0,0 +1,211 @@
+import hashlib
+import os
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.models.db import ScheduleInterval
+from src.models.db.timeslot import TIMESLOT_CAPACITY
+from src.repository.crud import PartitionCRUDRepository, ScheduleCRUDRepository, UserCRUDRepository
+from src.utilities.exceptions import ScheduleOutOfRangeException, UserNotFoundException, UserUnauthorizedException
+from .availability import invalidate_days
+
+# Названия дней недели в timeslot.weekday (по date.weekday())
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Недельное расписание по умолчанию, пока в шаблоне не задано ни одного недельного интервала
+SCHEDULE_DAY_START = time.fromisoformat(os.getenv("SCHEDULE_DAY_START", "08:00"))
+SCHEDULE_DAY_END = time.fromisoformat(os.getenv("SCHEDULE_DAY_END", "18:00"))
+SCHEDULE_SLOT_MINUTES = int(os.getenv("SCHEDULE_SLOT_MINUTES", "30"))
+
+
+@dataclass(frozen=True)
+class DayInterval:
+    """Интервал работы внутри дня, нарезаемый на слоты по slot_minutes минут"""
+    start_time: time
+    end_time: time
+    slot_minutes: int = SCHEDULE_SLOT_MINUTES
+    capacity: int = TIMESLOT_CAPACITY
+
+    @classmethod
+    def from_model(cls, interval: ScheduleInterval) -> "DayInterval":
+        return cls(interval.start_time, interval.end_time, interval.slot_minutes, interval.capacity)
+
+
+DEFAULT_DAY = (DayInterval(SCHEDULE_DAY_START, SCHEDULE_DAY_END),)
+
+
+@dataclass
+class ScheduleResult:
+    days: int
+    changed_days: int = 0  # дни, действующий шаблон которых изменился с прошлой развёртки
+    candidates: int = 0  # слотов по шаблону в изменившихся днях
+    created: int = 0
+    updated: int = 0  # слоты, у которых поменялись конец или вместимость
+    removed: int = 0  # слоты, которых больше нет в шаблоне
+    kept: int = 0  # слоты вне шаблона, оставленные из-за записей
+
+    @property
+    def existing(self) -> int:
+        return self.candidates - self.created
+
+    def as_dict(self) -> Dict[str, int]:
+        return {**asdict(self), "existing": self.existing}
+
+
+def build_day_slots(day: date, intervals: Iterable[DayInterval]) -> List[Dict[str, Any]]:
+    """
+    Строки таймслотов дня: каждый интервал [start_time, end_time) нарезается на слоты по slot_minutes минут,
+    неполный слот в конце интервала не создаётся. При пересечении интервалов остаётся первый слот с тем же началом.
+    """
+    rows = {}
+    for interval in intervals:
+        slot_start = datetime.combine(day, interval.start_time)
+        end = datetime.combine(day, interval.end_time)
+        step = timedelta(minutes=interval.slot_minutes)
+        while slot_start + step <= end:
+            rows.setdefault(slot_start.time(), dict(
+                date=day, start_time=slot_start.time(), end_time=(slot_start + step).time(),
+                weekday=WEEKDAYS[day.weekday()], capacity=interval.capacity, occupied=0,
+            ))
+            slot_start += step
+    return [rows[start] for start in sorted(rows)]
+
+
+def day_fingerprint(intervals: Sequence[DayInterval]) -> str:
+    """Отпечаток действующего шаблона дня; у закрытого дня интервалов нет"""
+    payload = ";".join(
+        f"{interval.start_time}-{interval.end_time}/{interval.slot_minutes}x{interval.capacity}"
+        for interval in intervals
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class ScheduleService:
+    def __init__(self, schedule_repo: ScheduleCRUDRepository, user_repo: UserCRUDRepository = None):
+        self.schedule_repo = schedule_repo
+        self.user_repo = user_repo
+
+    async def check_admin(self, telegram_id: int) -> None:
+        user = await self.user_repo.get_user_info(telegram_id)
+        if not user:
+            raise UserNotFoundException
+        if not user.is_admin:
+            raise UserUnauthorizedException
+
+    async def check_partitions(self, start_date: date, end_date: date) -> None:
+        """
+        Слоты можно создавать только в месяцах, для которых в Postgres есть секции: задача partitions держит их
+        на PARTITION_MONTHS_AHEAD месяцев вперёд, секции прошлых месяцев уходят в архив
+        """
+        partition_repo = PartitionCRUDRepository(async_session=self.schedule_repo.session)
+        missing = await partition_repo.get_missing_months(start_date, end_date)
+        if missing:
+            months = ", ".join(f"{month:%Y-%m}" for month in missing)
+            raise ScheduleOutOfRangeException(f"Нет секций таблиц для месяцев {months}: расписание на них недоступно")
+
+    async def get_effective_days(self, start_date: date, end_date: date) -> Dict[date, Tuple[DayInterval, ...]]:
+        """
+        Действующий шаблон каждого дня диапазона: закрытый день - без интервалов,
+        день с заменой - её интервалы, остальные - недельные интервалы своего дня недели.
+        """
+        weekly, overrides, closures = await self.schedule_repo.get_template(start_date, end_date)
+        weekly_by_day = defaultdict(list)
+        for interval in weekly:
+            weekly_by_day[interval.weekday].append(DayInterval.from_model(interval))
+        overrides_by_date = defaultdict(list)
+        for interval in overrides:
+            overrides_by_date[interval.date].append(DayInterval.from_model(interval))
+
+        days = {}
+        current = start_date
+        while current <= end_date:
+            if current in closures:
+                days[current] = ()
+            elif current in overrides_by_date:
+                days[current] = tuple(overrides_by_date[current])
+            elif weekly:
+                days[current] = tuple(weekly_by_day[current.weekday()])
+            else:
+                days[current] = DEFAULT_DAY
+            current += timedelta(days=1)
+        return days
+
+    async def generate(self, start_date: Optional[date] = None, days: int = 7, force: bool = False) -> ScheduleResult:
+        """
+        Разворачивает шаблон в таймслоты на days дней начиная с start_date (по умолчанию сегодня).
+        Обрабатываются только дни, чей действующий шаблон изменился с прошлой развёртки (или все при force):
+        недостающие слоты добавляются INSERT ... ON CONFLICT DO NOTHING, лишние без записей удаляются.
+        """
+        start_date = start_date or date.today()
+        end_date = start_date + timedelta(days=days - 1)
+        await self.check_partitions(start_date, end_date)
+        effective = await self.get_effective_days(start_date, end_date)
+        fingerprints = {day: day_fingerprint(intervals) for day, intervals in effective.items()}
+        applied = await self.schedule_repo.get_day_fingerprints(start_date, end_date)
+        changed = [day for day in effective if force or applied.get(day) != fingerprints[day]]
+
+        result = ScheduleResult(days=days, changed_days=len(changed))
+        if not changed:
+            return result
+
+        existing_slots = await self.schedule_repo.get_day_slots(changed)
+        new_rows, updates, delete_ids = [], [], []
+        for day in changed:
+            desired = {row["start_time"]: row for row in build_day_slots(day, effective[day])}
+            result.candidates += len(desired)
+            for slot_id, _, start_time, end_time, capacity, occupied, has_links in existing_slots.get(day, ()):
+                row = desired.pop(start_time, None)
+                if row is None:
+                    if has_links or occupied:
+                        result.kept += 1
+                    else:
+                        delete_ids.append(slot_id)
+                    continue
+                changes = {key: row[key] for key, value in (("end_time", end_time), ("capacity", capacity))
+                           if row[key] != value}
+                if changes:
+                    updates.append((slot_id, changes))
+            new_rows.extend(desired.values())
+
+        result.created, result.removed = await self.schedule_repo.apply_day_changes(
+            new_rows, updates, delete_ids, {day: fingerprints[day] for day in changed},
+        )
+        result.updated = len(updates)
+        # Слоты, которые успели занять между чтением и удалением, остаются
+        result.kept += len(delete_ids) - result.removed
+        # Кэш этого процесса сбрасывается сразу; воркеры API узнают об этом через Redis (CACHE_BACKEND=redis) или по TTL
+        await invalidate_days(changed)
+        return result
+
+    async def get_template(self, from_date: Optional[date] = None) -> Dict[str, Any]:
+        from_date = from_date or date.today()
+        weekly, _, _ = await self.schedule_repo.get_template(from_date, from_date)
+        return {
+            "weekly": weekly,
+            "overrides": await self.schedule_repo.get_override_intervals(from_date),
+            "closures": await self.schedule_repo.get_closures(from_date),
+        }
+
+    async def set_weekly(self, intervals: Sequence[Tuple[int, DayInterval]]) -> None:
+        """Заменяет недельное расписание. Слоты меняются при следующей развёртке, только в затронутые дни недели"""
+        await self.schedule_repo.replace_weekly_intervals([
+            ScheduleInterval(weekday=weekday, **asdict(interval)) for weekday, interval in intervals
+        ])
+
+    async def set_day(
+            self, day: date, intervals: Sequence[DayInterval] = (), closed: bool = False, reason: Optional[str] = None
+    ) -> ScheduleResult:
+        """Задаёт дате свои часы работы или закрывает её и сразу перестраивает слоты только этого дня"""
+        await self.check_partitions(day, day)
+        await self.schedule_repo.set_day(
+            day, [ScheduleInterval(date=day, **asdict(interval)) for interval in intervals], closed=closed, reason=reason,
+        )
+        return await self.generate(start_date=day, days=1)
+
+    async def reset_day(self, day: date) -> ScheduleResult:
+        """Возвращает дате недельное расписание и перестраивает её слоты"""
+        await self.check_partitions(day, day)
+        await self.schedule_repo.reset_day(day)
+        return await self.generate(start_date=day, days=1)
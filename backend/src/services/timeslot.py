@@ -1,70 +1,133 @@
 import logging
+import os
+from collections import defaultdict
 
 from src.repository.crud.timeslot import TimeslotCRUDRepository
 from src.repository.crud.user import UserCRUDRepository
 from datetime import date, time, timedelta
-from typing import Optional, List
-from src.utilities.exceptions import UserNotFoundException
+from typing import Dict, Optional, List, Tuple
+from src.utilities.exceptions import BookingNotFoundException, UserNotFoundException
+from .availability import DayAvailability, DaySlot, day_availability_cache, day_loads
+
+
+# Считать доступность SQL-запросами напрямую в базе (True) или в Python поверх кэша состояния дней (False)
+FREE_SLOTS_IN_SQL = os.getenv("FREE_SLOTS_IN_SQL", "0") == "1"
 
 
 class TimeslotService:
-    def __init__(self, timeslot_repo: TimeslotCRUDRepository, user_repo: UserCRUDRepository = None):
+    def __init__(self, timeslot_repo: TimeslotCRUDRepository, user_repo: UserCRUDRepository = None,
+                 use_sql: bool = FREE_SLOTS_IN_SQL):
         self.user_repo = user_repo
         self.timeslot_repo = timeslot_repo
+        self.use_sql = use_sql
 
     async def get_free_slots(self, telegram_id: Optional[int] = None, selected_date: date = date.today(),
-                             start_time: time = None):
-        user = await self.user_repo.get_user_by_telegram_id(telegram_id=telegram_id)
+                             start_time: time = None, training_duration: int = 60,
+                             exclude_booking_id: Optional[int] = None) -> List[DaySlot]:
+        """
+        Возвращает слоты, с которых пользователь может начать тренировку длительностью training_duration минут:
+        от начала слота и далее идут подряд свободные слоты, в которые пользователь ещё не записан.
+        exclude_booking_id - бронь, которую пользователь переносит: её слоты считаются свободными для него.
+        """
+        user = await self.user_repo.get_user_info(telegram_id=telegram_id)
         if not user:
             raise UserNotFoundException
-        
-        # Получаем все слоты на выбранную дату
-        slots = await self.timeslot_repo.get_timeslots_by_date(selected_date=selected_date, start_time=start_time)
-        # Фильтруем слоты, доступные для пользователя
-        available_slots = []
-        for slot in slots:
-            if user not in slot.visitors and len(slot.visitors) < 4:
-                available_slots.append(slot)
-        # Сортируем по времени начала
-        available_slots.sort(key=lambda x: x.start_time)
-        
-        # Фильтруем только те слоты, которые подходят для 90-минутных тренировок
-        training_slots = []
-        
-        for i in range(len(available_slots) - 1):
-            current_slot = available_slots[i]
-            next_slot = available_slots[i + 1]
-            
-            # Проверяем, что текущий слот и следующий идут подряд
-            if current_slot.end_time == next_slot.start_time:
-                # Рассчитываем общую длительность двух слотов
-                from datetime import datetime, timedelta
-                start_time_obj = datetime.combine(selected_date, current_slot.start_time)
-                end_time_obj = datetime.combine(selected_date, next_slot.end_time)
-                duration_minutes = (end_time_obj - start_time_obj).total_seconds() / 60
-                
-                # Если есть минимум 90 минут, добавляем слот
-                if duration_minutes >= 60:
-                    training_slots.append(current_slot)
-        return training_slots
+        own_slot_ids = []
+        if exclude_booking_id is not None:
+            own_slot_ids = await self.timeslot_repo.get_user_booking_slot_ids(exclude_booking_id, user.id)
+            if not own_slot_ids:
+                raise BookingNotFoundException("Booking not found or does not belong to the user.")
+
+        # Свои слоты переносимой брони учитываются только в расчёте поверх состояния дня
+        if self.use_sql and not own_slot_ids:
+            slots = await self.timeslot_repo.get_training_start_slots(
+                selected_date=selected_date, user_id=user.id,
+                training_duration=training_duration, start_time=start_time,
+            )
+            return [DaySlot.from_timeslot(slot) for slot in slots]
+
+        # Фильтрация под пользователя битовыми операциями над закэшированным состоянием дня
+        day = await self.get_day_availability(selected_date)
+        if own_slot_ids:
+            day = day.release(user.id, own_slot_ids)
+        return day.training_starts(training_duration, user_id=user.id, start_time=start_time)
+
+    async def get_day_slots(self, selected_date: date) -> Tuple[DaySlot, ...]:
+        """Состояние слотов дня из кэша, при промахе загружается из базы"""
+        return (await self.get_day_availability(selected_date)).slots
+
+    async def get_day_availability(self, selected_date: date) -> DayAvailability:
+        days = await self.get_days_availability(selected_date, selected_date)
+        return days[selected_date]
+
+    async def get_days_availability(self, start_date: date, end_date: date) -> Dict[date, DayAvailability]:
+        """
+        Состояние слотов для каждого дня диапазона. Отсутствующие в кэше дни загружаются
+        из базы одним запросом на весь диапазон промахов.
+        """
+        days = await self._get_cached_days(start_date, end_date)
+        missing = [day for day, day_slots in days.items() if day_slots is None]
+        if not missing:
+            return days
+
+        # Одновременные запросы того же диапазона в этом процессе получают результат одной загрузки, даже если
+        # он не попал в кэш. Поколение кэша в ключе: запрос после инвалидации не присоединится к более ранней загрузке
+        key = (day_availability_cache.generation, missing[0], missing[-1])
+        days.update(await day_loads.do(key, lambda: self._fill_days(missing[0], missing[-1])))
+        return days
+
+    async def _fill_days(self, start_date: date, end_date: date) -> Dict[date, DayAvailability]:
+        # Блокировка по ключам дней, под которыми хранятся значения: воркеры с общим кэшем (redis) ждут,
+        # пока один из них загрузит эти дни, и берут значения из кэша
+        keys = [day.isoformat() for day in self._date_range(start_date, end_date)]
+        async with day_availability_cache.fill_lock(*keys):
+            days = await self._get_cached_days(start_date, end_date)
+            missing = [day for day, day_slots in days.items() if day_slots is None]
+            if missing:
+                days.update(await self._load_days(missing))
+        return days
+
+    async def _get_cached_days(self, start_date: date, end_date: date) -> Dict[date, Optional[DayAvailability]]:
+        return {day: await day_availability_cache.get(day.isoformat()) for day in self._date_range(start_date, end_date)}
+
+    @staticmethod
+    def _date_range(start_date: date, end_date: date) -> List[date]:
+        return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+    async def _load_days(self, missing: List[date]) -> Dict[date, DayAvailability]:
+        generation = await day_availability_cache.load_generation()
+        slot_rows, visitor_rows = await self.timeslot_repo.get_slot_states(start_date=missing[0], end_date=missing[-1])
+        visitors = defaultdict(set)
+        for time_slot_id, user_id in visitor_rows:
+            visitors[time_slot_id].add(user_id)
+        loaded = {day: [] for day in missing}
+        for slot_id, slot_date, slot_start, slot_end, capacity, occupied in slot_rows:
+            if slot_date in loaded:
+                loaded[slot_date].append(DaySlot(
+                    id=slot_id, date=slot_date, start_time=slot_start, end_time=slot_end,
+                    capacity=capacity, occupied=occupied, visitors=frozenset(visitors[slot_id]),
+                ))
+        days = {}
+        for day, day_slots in loaded.items():
+            days[day] = DayAvailability(day_slots)
+            await day_availability_cache.set(day.isoformat(), days[day], generation=generation)
+        return days
 
     async def get_available_days(self, telegram_id: Optional[int] = None, days_ahead: int = 7) -> List[date]:
-        """Получает список доступных дней для записи"""
-        user = await self.user_repo.get_user_by_telegram_id(telegram_id=telegram_id)
-        if not user:
-            raise UserNotFoundException
-        
-        # Получаем таймслоты на ближайшие дни
+        """Получает список доступных дней для записи на ближайшие days_ahead дней"""
+        user_id = None
+        if telegram_id is not None:
+            user = await self.user_repo.get_user_info(telegram_id=telegram_id)
+            if not user:
+                raise UserNotFoundException
+            user_id = user.id
+
         today = date.today()
-        end_date = today + timedelta(days=days_ahead)
-        
-        # Получаем все таймслоты в диапазоне дат
-        all_slots = await self.timeslot_repo.get_timeslots_by_date_range(start_date=today, end_date=end_date)
-        
-        # Группируем по датам и находим дни с доступными таймслотами
-        available_days = set()
-        for slot in all_slots:
-            if user not in slot.visitors and len(slot.visitors) < 4:
-                available_days.add(slot.date)
-        
-        return sorted(list(available_days))
+        end_date = today + timedelta(days=days_ahead - 1)
+
+        if self.use_sql:
+            # Один запрос на весь диапазон вместо запроса на каждый день
+            return await self.timeslot_repo.get_available_dates(start_date=today, end_date=end_date, user_id=user_id)
+
+        days = await self.get_days_availability(start_date=today, end_date=end_date)
+        return [day for day, availability in sorted(days.items()) if availability.has_free(user_id)]
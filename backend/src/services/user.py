@@ -15,5 +15,5 @@ class UserService:
         elif user.is_admin:
             raise UserAlreadyAdminException
         user.is_admin = True
-        user = self.user_repo.update_user(user=user)
+        user = await self.user_repo.update_user(user=user)
         return user
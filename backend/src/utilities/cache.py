@@ -0,0 +1,395 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Простой in-process кэш с ограничением по времени жизни записей (TTL) и по размеру (LRU).
+    Не потокобезопасен, рассчитан на использование внутри одного event loop.
+
+    Чтобы значение, прочитанное из базы до инвалидации, не попало в кэш после неё,
+    загрузка выполняется так: generation = cache.generation, затем чтение из базы,
+    затем cache.set(key, value, generation=generation). Любая инвалидация увеличивает
+    generation, и запоздавшая запись отбрасывается.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        if generation is not None and generation != self.generation:
+            # Пока значение загружалось, кэш был инвалидирован - значение может быть устаревшим
+            return
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self.generation += 1
+        self.invalidations += 1
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class MemoryCacheBackend:
+    """
+    Кэш в памяти процесса поверх TTLCache. Используется по умолчанию (один воркер) и в тестах.
+    Защита от одновременной загрузки одного и того же ключа - asyncio.Lock на ключ.
+    """
+    name = "memory"
+
+    def __init__(self, namespace: str, maxsize: int = 128, ttl: float = 30.0):
+        self.namespace = namespace
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._locks: Dict[str, list] = {}  # ключ -> [asyncio.Lock, количество ожидающих]
+        # Счётчики версий для ETag. Эпоха отличает версии разных запусков процесса
+        self._epoch = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+
+    @property
+    def generation(self) -> int:
+        return self.local.generation
+
+    async def load_generation(self) -> Any:
+        """Поколение кэша перед чтением из базы: передаётся в set(generation=...), чтобы отбросить устаревшее значение"""
+        return self.local.generation
+
+    async def get(self, key: str) -> Any:
+        return self.local.get(key)
+
+    async def set(self, key: str, value: Any, generation: Optional[Any] = None) -> None:
+        self.local.set(key, value, generation=generation)
+
+    async def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            self.local.invalidate(key)
+
+    async def clear(self) -> None:
+        self.local.clear()
+        # Новая эпоха меняет все версии, а с ними и ETag
+        self._epoch = uuid.uuid4().hex[:8]
+
+    @asynccontextmanager
+    async def fill_lock(self, *keys: str):
+        """
+        Пока блокировка удерживается, остальные запросы тех же ключей ждут и затем читают готовые значения.
+        Ключи - те же, под которыми хранятся значения; блокировки берутся по порядку, поэтому запросы
+        с пересекающимися наборами ключей не ждут друг друга по кругу.
+        """
+        async with AsyncExitStack() as stack:
+            for key in sorted(set(keys)):
+                await stack.enter_async_context(self._local_lock(key))
+            yield
+
+    @asynccontextmanager
+    async def _local_lock(self, key: str):
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    async def get_versions(self, *keys: str) -> List[str]:
+        """
+        Локальные счётчики не видят изменений из других процессов (скрипты, второй воркер), поэтому версия
+        включает номер окна длиной TTL кэша: ETag меняется не реже, чем обновляются закэшированные данные.
+        """
+        window = int(time.time() // self.local.ttl) if self.local.ttl > 0 else time.monotonic_ns()
+        return [f"{self._epoch}.{window}.{self._versions.get(key, 0)}" for key in keys]
+
+    async def bump_versions(self, *keys: str) -> None:
+        for key in keys:
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "namespace": self.namespace, **self.local.stats()}
+
+
+class RedisCacheBackend(MemoryCacheBackend):
+    """
+    Общий для всех воркеров кэш в Redis с локальным in-process слоем.
+    Значения сериализуются переданным кодеком, инвалидации рассылаются через pub/sub,
+    чтобы остальные воркеры сбросили свою локальную копию. Загрузку холодного ключа
+    выполняет только тот, кто взял короткую блокировку SET NX, остальные ждут значение.
+    Поколение общее для всех воркеров (счётчик в Redis): значение, загруженное до инвалидации
+    в любом воркере, не записывается.
+    """
+    name = "redis"
+
+    _RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+    # Запись только если общее поколение не изменилось с начала загрузки
+    _SET_IF_GENERATION = """
+    if (redis.call('get', KEYS[2]) or '0') ~= ARGV[3] then
+        return 0
+    end
+    redis.call('set', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+    """
+
+    def __init__(self, namespace: str, encode: Callable[[Any], bytes], decode: Callable[[bytes], Any],
+                 redis_url: str, maxsize: int = 128, ttl: float = 30.0, lock_ttl: float = 3.0):
+        super().__init__(namespace=namespace, maxsize=maxsize, ttl=ttl)
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(redis_url)
+        self.encode = encode
+        self.decode = decode
+        self.lock_ttl = lock_ttl
+        self.channel = f"cache-invalidate:{namespace}"
+        self.generation_key = f"cache-generation:{namespace}"
+        self.remote_hits = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        raw = await self.redis.get(self._key(key))
+        if raw is None:
+            return None
+        self.remote_hits += 1
+        value = self.decode(raw)
+        self.local.set(key, value)
+        return value
+
+    async def load_generation(self) -> Any:
+        shared = await self.redis.get(self.generation_key)
+        return self.local.generation, int(shared or 0)
+
+    async def set(self, key: str, value: Any, generation: Optional[Any] = None) -> None:
+        if generation is None:
+            self.local.set(key, value)
+            await self.redis.set(self._key(key), self.encode(value), px=int(self.local.ttl * 1000))
+            return
+        local_generation, shared_generation = generation
+        if local_generation != self.local.generation:
+            return
+        stored = await self.redis.eval(
+            self._SET_IF_GENERATION, 2, self._key(key), self.generation_key,
+            self.encode(value), int(self.local.ttl * 1000), str(shared_generation),
+        )
+        if stored:
+            self.local.set(key, value, generation=local_generation)
+
+    async def invalidate(self, *keys: str) -> None:
+        if not keys:
+            return
+        for key in keys:
+            self.local.invalidate(key)
+        # Поколение увеличивается до удаления: загрузки, начатые раньше в других воркерах, не перезапишут ключ
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(self.generation_key)
+            pipe.delete(*[self._key(key) for key in keys])
+            pipe.publish(self.channel, "\n".join(keys))
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        self.local.clear()
+        await self.redis.incr(self.generation_key)
+        keys = [key async for key in self.redis.scan_iter(match=self._key("*"))]
+        if keys:
+            await self.redis.delete(*keys)
+        await self.redis.delete(f"version-epoch:{self.namespace}")
+        await self.redis.publish(self.channel, "*")
+
+    @asynccontextmanager
+    async def fill_lock(self, *keys: str):
+        async with super().fill_lock(*keys):
+            keys = sorted(set(keys))
+            token = uuid.uuid4().hex
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(self._lock_key(key), token, nx=True, px=int(self.lock_ttl * 1000))
+                acquired = [key for key, ok in zip(keys, await pipe.execute()) if ok]
+            busy = [key for key in keys if key not in acquired]
+            if busy:
+                # Часть ключей загружает другой воркер. Свои блокировки отпускаем, чтобы воркеры с пересекающимися
+                # наборами ключей не ждали друг друга до истечения блокировок, и ждём снятия чужих
+                await self._release_locks(acquired, token)
+                acquired = []
+                await self._wait_filled(busy)
+            try:
+                yield
+            finally:
+                await self._release_locks(acquired, token)
+
+    def _lock_key(self, key: str) -> str:
+        return f"lock:{self._key(key)}"
+
+    async def _release_locks(self, keys: List[str], token: str) -> None:
+        if not keys:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.eval(self._RELEASE_LOCK, 1, self._lock_key(key), token)
+            await pipe.execute()
+
+    async def _wait_filled(self, keys: List[str]) -> None:
+        """Ждёт, пока по каждому ключу появится значение или будет снята блокировка, но не дольше времени её жизни"""
+        deadline = time.monotonic() + self.lock_ttl
+        while keys and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.exists(self._lock_key(key))
+                    pipe.exists(self._key(key))
+                found = await pipe.execute()
+            keys = [key for key, locked, stored in zip(keys, found[::2], found[1::2]) if locked and not stored]
+
+    async def get_versions(self, *keys: str) -> List[str]:
+        epoch_key = f"version-epoch:{self.namespace}"
+        epoch, *counters = await self.redis.mget(epoch_key, *[self._version_key(key) for key in keys])
+        if epoch is None:
+            # Эпоха пропадает вместе с данными Redis - тогда счётчики начинаются заново с новой эпохой
+            await self.redis.set(epoch_key, uuid.uuid4().hex[:8], nx=True)
+            epoch = await self.redis.get(epoch_key)
+        epoch = epoch.decode() if isinstance(epoch, bytes) else epoch
+        return [f"{epoch}.{int(counter or 0)}" for counter in counters]
+
+    async def bump_versions(self, *keys: str) -> None:
+        if not keys:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.incr(self._version_key(key))
+            await pipe.execute()
+
+    def _version_key(self, key: str) -> str:
+        return f"version:{self.namespace}:{key}"
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.redis.aclose()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                try:
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._apply_invalidation(message["data"])
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Пока подписка не восстановлена, инвалидации могут теряться - сбрасываем локальный слой
+                logger.warning(f"Подписка на инвалидации кэша {self.namespace} прервана: {e}")
+                self.local.clear()
+                await asyncio.sleep(1)
+
+    def _apply_invalidation(self, data) -> None:
+        payload = data.decode() if isinstance(data, bytes) else data
+        if payload == "*":
+            self.local.clear()
+            return
+        for key in payload.split("\n"):
+            self.local.invalidate(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "remote_hits": self.remote_hits}
+
+
+# Все созданные кэши: для запуска слушателей инвалидаций и выдачи статистики
+cache_backends: List[MemoryCacheBackend] = []
+
+
+def create_cache(namespace: str, encode: Callable[[Any], bytes], decode: Callable[[bytes], Any],
+                 maxsize: int, ttl: float) -> MemoryCacheBackend:
+    """
+    Создаёт кэш выбранного через CACHE_BACKEND типа: memory (по умолчанию) или redis (REDIS_URL).
+    """
+    backend_type = os.getenv("CACHE_BACKEND", "memory")
+    if backend_type == "redis":
+        backend = RedisCacheBackend(
+            namespace=namespace, encode=encode, decode=decode,
+            redis_url=os.getenv("REDIS_URL", "redis://localhost:6379/0"), maxsize=maxsize, ttl=ttl,
+        )
+    else:
+        backend = MemoryCacheBackend(namespace=namespace, maxsize=maxsize, ttl=ttl)
+    cache_backends.append(backend)
+    return backend
+
+
+async def start_caches() -> None:
+    for backend in cache_backends:
+        await backend.start()
+
+
+async def stop_caches() -> None:
+    for backend in cache_backends:
+        await backend.stop()
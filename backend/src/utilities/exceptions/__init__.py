@@ -1,2 +1,3 @@
 from .user import *
-from .booking import *
\ No newline at end of file
+from .booking import *
+from .schedule import *
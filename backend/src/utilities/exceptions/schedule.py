@@ -0,0 +1,10 @@
+class BaseScheduleException(Exception):
+    """
+    Basic class for schedule exceptions
+    """
+
+
+class ScheduleOutOfRangeException(BaseScheduleException):
+    """
+    Throw an exception when slots are requested for months that have no table partitions
+    """
@@ -0,0 +1,26 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema: Any) -> TypeAdapter:
+    """TypeAdapter строит валидатор и сериализатор при создании, поэтому он создаётся один раз на тип"""
+    return TypeAdapter(schema)
+
+
+def json_response(
+        schema: Any, data: Any, headers: Optional[Mapping[str, str]] = None, include: Optional[Any] = None
+) -> Response:
+    """
+    Ответ со списком или страницей в один проход pydantic: данные (ORM-объекты, dataclass или dict)
+    валидируются пачкой по schema и сразу сериализуются в байты JSON.
+    Эндпоинт возвращает готовый Response, поэтому FastAPI не валидирует результат по response_model
+    повторно и не прогоняет его через jsonable_encoder; response_model остаётся только для документации.
+    include - какие поля выводить (формат include из pydantic), для выборочных полей ответа.
+    """
+    adapter = type_adapter(schema)
+    content = adapter.dump_json(adapter.validate_python(data, from_attributes=True), include=include)
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,19 @@
+import base64
+from datetime import date, time
+from typing import Tuple
+
+
+def encode_booking_cursor(booking_date: date, start_time: time, booking_id: int) -> str:
+    """Непрозрачный курсор keyset-пагинации по (date, start_time, id) последней выданной записи"""
+    raw = f"{booking_date.isoformat()}|{start_time.isoformat()}|{booking_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_booking_cursor(cursor: str) -> Tuple[date, time, int]:
+    """Разбирает курсор, при некорректном значении бросает ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        booking_date, start_time, booking_id = raw.split("|")
+        return date.fromisoformat(booking_date), time.fromisoformat(start_time), int(booking_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,145 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket: до requests запросов подряд, запас восстанавливается за seconds секунд"""
+    requests: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        """Сколько токенов восстанавливается за секунду"""
+        return self.requests / self.seconds
+
+
+def parse_rate_limit(value: str) -> Optional[RateLimit]:
+    """Разбирает лимит вида "20/10" (20 запросов за 10 секунд); "0" или "off" отключает лимит"""
+    value = value.strip().lower()
+    if value in ("", "0", "off"):
+        return None
+    requests, _, seconds = value.partition("/")
+    limit = RateLimit(requests=int(requests), seconds=float(seconds or 1))
+    if limit.requests <= 0 or limit.seconds <= 0:
+        raise ValueError(f"Некорректный лимит запросов: {value}")
+    return limit
+
+
+class MemoryRateLimiter:
+    """
+    Token bucket в памяти процесса: лимиты действуют на каждый воркер отдельно.
+    Корзина - [токены, время обновления]; число корзин ограничено maxsize, дольше всех не использованные
+    вытесняются (вытесненный ключ начинает с полной корзиной). Рассчитан на один event loop, без блокировок.
+    """
+    name = "memory"
+
+    def __init__(self, maxsize: int = 100_000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.allowed: Dict[str, int] = {}
+        self.limited: Dict[str, int] = {}
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def hit(self, name: str, key: str, limit: RateLimit) -> float:
+        """Списывает токен; возвращает 0, если запрос разрешён, иначе сколько секунд ждать следующего токена"""
+        return self._count(name, self._take(f"{name}:{key}", limit))
+
+    def _take(self, bucket_key: str, limit: RateLimit) -> float:
+        now = self.clock()
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = [float(limit.requests), now]
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+            bucket[0] = min(float(limit.requests), bucket[0] + (now - bucket[1]) * limit.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / limit.rate
+
+    def _count(self, name: str, retry_after: float) -> float:
+        counters = self.limited if retry_after else self.allowed
+        counters[name] = counters.get(name, 0) + 1
+        return retry_after
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "buckets": len(self._buckets), "allowed": self.allowed, "limited": self.limited}
+
+
+class RedisRateLimiter(MemoryRateLimiter):
+    """
+    Общий для всех воркеров token bucket в Redis: корзина - хэш, обновляется Lua-скриптом за один запрос.
+    Если Redis недоступен, запросы пропускаются (лимитер не должен ронять API) и предупреждение пишется в лог.
+    """
+    name = "redis"
+
+    _TAKE = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+    return tostring(retry_after)
+    """
+
+    def __init__(self, redis_url: str):
+        super().__init__(maxsize=0)
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(redis_url)
+        self.errors = 0
+
+    async def hit(self, name: str, key: str, limit: RateLimit) -> float:
+        try:
+            retry_after = float(await self.redis.eval(
+                self._TAKE, 1, f"rate-limit:{name}:{key}", limit.requests, limit.rate
+            ))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Лимит запросов {name} не проверен, Redis недоступен: {e}")
+            retry_after = 0.0
+        return self._count(name, retry_after)
+
+    async def stop(self) -> None:
+        await self.redis.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "errors": self.errors}
+
+
+def create_rate_limiter() -> MemoryRateLimiter:
+    """
+    Создаёт лимитер выбранного через RATE_LIMIT_BACKEND типа (по умолчанию как CACHE_BACKEND):
+    memory - отдельные лимиты в каждом воркере, redis (REDIS_URL) - общие.
+    """
+    backend_type = os.getenv("RATE_LIMIT_BACKEND", os.getenv("CACHE_BACKEND", "memory"))
+    if backend_type == "redis":
+        return RedisRateLimiter(redis_url=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryRateLimiter(maxsize=int(os.getenv("RATE_LIMIT_BUCKETS", "100000")))
+
+
+rate_limiter = create_rate_limiter()
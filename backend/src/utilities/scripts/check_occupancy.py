@@ -0,0 +1,38 @@
+from src.repository.db import async_session, init_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import asyncio
+import sys
+
+from src.repository.crud import TimeslotCRUDRepository
+
+
+async def get_async_session() -> AsyncSession:
+    init_engine()
+    session = async_session()  # Создаём сессию
+    return session
+
+
+async def check_occupancy(fix: bool = False):
+    """Сверяет счётчик timeslot.occupied с таблицей usertimeslotlink и при fix=True исправляет расхождения"""
+    session = await get_async_session()
+    timeslot_repo = TimeslotCRUDRepository(async_session=session)
+
+    drift = await timeslot_repo.get_occupancy_drift()
+    if not drift:
+        print("Счётчики занятости совпадают с записями.")
+    else:
+        for slot_id, occupied, actual in drift:
+            print(f"Слот {slot_id}: occupied={occupied}, фактически={actual}")
+        if fix:
+            fixed = await timeslot_repo.repair_occupancy_drift()
+            print(f"Исправлено {fixed} таймслотов.")
+        else:
+            print(f"Найдено {len(drift)} расхождений. Запустите с --fix, чтобы исправить.")
+
+    await session.close()
+
+
+# Запуск
+if __name__ == "__main__":
+    asyncio.run(check_occupancy(fix="--fix" in sys.argv))
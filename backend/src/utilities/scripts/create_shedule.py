@@ -1,76 +1,50 @@
-from src.repository.db import engine
+from src.repository.db import async_session, init_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import async_sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession
 
+import argparse
 import asyncio
-from src.models.db import TimeSlot
+import time as timer
+from datetime import date
+from typing import Optional
 
-from datetime import datetime, timedelta, time
-from sqlmodel import select
+from src.repository.crud import ScheduleCRUDRepository
+from src.services.schedule import ScheduleService
 
 
 async def get_async_session() -> AsyncSession:
-    async_session = async_sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
+    init_engine()
     session = async_session()  # Создаём сессию
     return session
 
 
-async def fill_schedule(start_date: datetime, duration: int = 30):
+async def fill_schedule(start_date: Optional[date] = None, days: int = 7, force: bool = False):
+    """Разворачивает шаблон расписания в слоты; дни, шаблон которых не менялся, пропускаются"""
     session = await get_async_session()
-    slots = []
-    current_date = start_date.date()
-
-    for day in range(7):  # 7 дней в неделю
-        for hour in range(8, 18):  # Рабочие часы с 8:00 до 18:00
-            for minute in (0, 30):  # Два слота по 30 минут в каждом часе
-                # Стартовое время слота
-                slot_start = time(hour=hour, minute=minute, second=0)
-                slot_end = (datetime.combine(current_date, slot_start) + timedelta(minutes=duration)).time()
-                WEEKDAYS_EN = {
-                    0: "Monday",
-                    1: "Tuesday",
-                    2: "Wednesday",
-                    3: "Thursday",
-                    4: "Friday",
-                    5: "Saturday",
-                    6: "Sunday",
-                }
-                # Проверяем, существует ли уже такой слот в базе
-                statement = select(TimeSlot).where(
-                    TimeSlot.date == current_date,
-                    TimeSlot.start_time == slot_start,
-                    TimeSlot.end_time == slot_end,
-                )
-                existing_slot = await session.execute(statement)
-
-                if existing_slot.first() is None:
-                    slots.append(TimeSlot(
-                        date=current_date,
-                        start_time=slot_start,
-                        end_time=slot_end,
-                        weekday = WEEKDAYS_EN[day]
-
-                    ))
-
-        # Переход на следующий день
-        current_date += timedelta(days=1)
-
-    if slots:
-        session.add_all(slots)
-        await session.commit()
-        print(f"Добавлено {len(slots)} таймслотов.")
-    else:
-        print("Новых таймслотов не добавлено.")
-
-    await session.close()
-
-
-# Пример вызова функции
-async def main():
-    await fill_schedule(datetime.now())
+    try:
+        started = timer.perf_counter()
+        result = await ScheduleService(schedule_repo=ScheduleCRUDRepository(async_session=session)).generate(
+            start_date=start_date, days=days, force=force,
+        )
+        elapsed = timer.perf_counter() - started
+        print(f"Дней: {result.days}, изменилось: {result.changed_days}, слотов по шаблону: {result.candidates}, "
+              f"добавлено: {result.created}, изменено: {result.updated}, удалено: {result.removed}, "
+              f"оставлено из-за записей: {result.kept} ({elapsed:.2f} с).")
+        return result
+    finally:
+        await session.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Создаёт таймслоты по шаблону расписания, существующие слоты не дублируются")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="Первый день (YYYY-MM-DD), по умолчанию сегодня")
+    parser.add_argument("--days", type=int, default=7, help="Количество дней")
+    parser.add_argument("--force", action="store_true", help="Перестроить все дни, а не только изменившиеся")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    await fill_schedule(start_date=args.start, days=args.days, force=args.force)
 
 
 # Запуск
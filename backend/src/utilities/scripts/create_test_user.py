@@ -1,6 +1,5 @@
-from src.repository.db import engine
+from src.repository.db import async_session, init_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import asyncio
@@ -10,9 +9,7 @@ from sqlmodel import select
 
 
 async def get_async_session() -> AsyncSession:
-    async_session = async_sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
+    init_engine()
     session = async_session()  # Создаём сессию
     return session
 
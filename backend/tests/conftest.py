@@ -0,0 +1,40 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models import db  # noqa: F401 - регистрирует таблицы в SQLModel.metadata
+from src.repository.db import create_engine
+from src.services.availability import day_availability_cache
+
+# Тесты с базой данных запускаются только при заданном TEST_DATABASE_URL (отдельная Postgres-база, таблицы пересоздаются)
+TEST_DB_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def run_db():
+    """
+    Возвращает функцию, которая выполняет асинхронный сценарий на чистой тестовой базе.
+    Сценарий получает async_sessionmaker, привязанный к движку тестовой базы.
+    """
+    if not TEST_DB_URL:
+        pytest.skip("TEST_DATABASE_URL не задан")
+
+    def runner(scenario):
+        async def main():
+            await day_availability_cache.clear()
+            engine = create_engine(TEST_DB_URL, pool_size=20, max_overflow=80)
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(SQLModel.metadata.drop_all)
+                    await conn.run_sync(SQLModel.metadata.create_all)
+                return await scenario(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return runner
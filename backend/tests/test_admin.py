@@ -0,0 +1,54 @@
+import httpx
+from fastapi import FastAPI
+
+from src.api.dependencies.session import get_async_session
+from src.api.routers import main_router
+from src.models.db import User
+
+
+def admin_client(session_factory) -> httpx.AsyncClient:
+    async def test_session():
+        async with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(main_router, prefix="/api")
+    app.dependency_overrides[get_async_session] = test_session
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def add_users(session_factory):
+    async with session_factory() as session:
+        session.add_all([
+            User(telegram_id=7100, first_name="a", second_name="a", age=30, is_admin=True),
+            User(telegram_id=7101, first_name="u", second_name="u", age=20),
+        ])
+        await session.commit()
+
+
+def test_internal_metrics_are_admin_only(run_db):
+    async def scenario(session_factory):
+        await add_users(session_factory)
+        async with admin_client(session_factory) as client:
+            for path in ("/api/internal/metrics/", "/api/slots/cache-stats"):
+                assert (await client.get(path)).status_code == 422
+                assert (await client.get(path, params={"admin_telegram_id": 7199})).status_code == 401
+                assert (await client.get(path, params={"admin_telegram_id": 7101})).status_code == 403
+                response = await client.get(path, params={"admin_telegram_id": 7100})
+                assert response.status_code == 200
+                assert "single_flight" in response.json()
+
+    run_db(scenario)
+
+
+def test_admin_booking_views_are_admin_only(run_db):
+    async def scenario(session_factory):
+        await add_users(session_factory)
+        async with admin_client(session_factory) as client:
+            for path in ("/api/bookings/all", "/api/bookings/stats"):
+                assert (await client.get(path)).status_code == 422
+                assert (await client.get(path, params={"admin_telegram_id": 7199})).status_code == 401
+                assert (await client.get(path, params={"admin_telegram_id": 7101})).status_code == 403
+                assert (await client.get(path, params={"admin_telegram_id": 7100})).status_code == 200
+
+    run_db(scenario)
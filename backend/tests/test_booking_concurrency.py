@@ -0,0 +1,141 @@
+import asyncio
+from collections import Counter
+from datetime import date, time
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from src.models.db import Booking, TimeSlot, User, UserTimeSlotLink
+from src.repository.crud import BookingCRUDRepository, TimeslotCRUDRepository, UserCRUDRepository
+from src.services.booking import BookingService
+from src.utilities.exceptions import (
+    BookingRequestException,
+    BookingSaveFailedException,
+    RequestedSlotsBusyException,
+)
+
+PARALLEL_BOOKINGS = 300
+
+
+async def book(session_factory, telegram_id: int, start_time: str, end_time: str) -> str:
+    """Бронирует от имени пользователя в отдельной сессии и возвращает исход"""
+    async with session_factory() as session:
+        service = BookingService(
+            booking_repo=BookingCRUDRepository(async_session=session),
+            timeslot_repo=TimeslotCRUDRepository(async_session=session),
+            user_repo=UserCRUDRepository(async_session=session),
+        )
+        try:
+            await service.create_booking(
+                telegram_id=telegram_id, booking_date=date.today().isoformat(),
+                start_time=start_time, end_time=end_time,
+            )
+            return "booked"
+        except (BookingRequestException, RequestedSlotsBusyException, BookingSaveFailedException):
+            # Слот заполнен к моменту чтения или его заняли между чтением и резервированием
+            return "busy"
+
+
+async def reschedule(session_factory, telegram_id: int, booking_id: int, start_time: time, end_time: time) -> str:
+    """Переносит бронь пользователя в отдельной сессии"""
+    async with session_factory() as session:
+        service = BookingService(
+            booking_repo=BookingCRUDRepository(async_session=session),
+            timeslot_repo=TimeslotCRUDRepository(async_session=session),
+            user_repo=UserCRUDRepository(async_session=session),
+        )
+        await service.reschedule_booking(
+            telegram_id=telegram_id, booking_id=booking_id, booking_date=date.today().isoformat(),
+            start_time=start_time.isoformat(), end_time=end_time.isoformat(),
+        )
+        return "moved"
+
+
+async def seed(session_factory, slot_times, users_count: int, occupied=None):
+    async with session_factory() as session:
+        users = [User(telegram_id=5000 + i, first_name="u", second_name="u", age=20) for i in range(users_count)]
+        slots = [
+            TimeSlot(date=date.today(), start_time=start, end_time=end, weekday="Monday",
+                     occupied=(occupied or {}).get(start, 0))
+            for start, end in slot_times
+        ]
+        session.add_all(users + slots)
+        await session.commit()
+        return [user.telegram_id for user in users]
+
+
+async def slot_state(session_factory):
+    async with session_factory() as session:
+        slots = (await session.execute(select(TimeSlot).order_by(TimeSlot.start_time))).scalars().all()
+        links = dict((await session.execute(
+            select(UserTimeSlotLink.time_slot_id, func.count()).group_by(UserTimeSlotLink.time_slot_id)
+        )).all())
+        bookings = (await session.execute(select(func.count()).select_from(Booking))).scalar_one()
+        return slots, links, bookings
+
+
+def test_parallel_bookings_never_exceed_capacity(run_db):
+    async def scenario(session_factory):
+        telegram_ids = await seed(session_factory, [(time(10, 0), time(10, 30))], PARALLEL_BOOKINGS)
+
+        results = await asyncio.gather(*(
+            book(session_factory, telegram_id, "10:00:00", "10:30:00") for telegram_id in telegram_ids
+        ))
+
+        slots, links, bookings = await slot_state(session_factory)
+        slot = slots[0]
+        assert Counter(results)["booked"] == slot.capacity
+        assert slot.occupied == slot.capacity
+        assert links[slot.id] == slot.capacity
+        assert bookings == slot.capacity
+
+    run_db(scenario)
+
+
+def test_failed_chain_releases_reserved_slots(run_db):
+    async def scenario(session_factory):
+        # Во втором слоте цепочки осталось одно место, первый свободен полностью
+        telegram_ids = await seed(
+            session_factory,
+            [(time(10, 0), time(10, 30)), (time(10, 30), time(11, 0))],
+            PARALLEL_BOOKINGS,
+            occupied={time(10, 30): 3},
+        )
+
+        results = await asyncio.gather(*(
+            book(session_factory, telegram_id, "10:00:00", "11:00:00") for telegram_id in telegram_ids
+        ))
+
+        first, second = (await slot_state(session_factory))[0]
+        assert Counter(results)["booked"] == 1
+        assert second.occupied == second.capacity
+        # Неудачные попытки не оставили занятых мест в первом слоте
+        assert first.occupied == 1
+
+    run_db(scenario)
+
+
+def test_crossing_reschedules_do_not_deadlock(run_db):
+    async def scenario(session_factory):
+        # Пары соседних слотов a-b и b-c: первый пользователь пары записан в первый слот, второй - во второй
+        pairs = [(time(8 + i, 0), time(8 + i, 30), time(9 + i, 0)) for i in range(10)]
+        telegram_ids = await seed(session_factory, [slot for a, b, c in pairs for slot in ((a, b), (b, c))], 20)
+        for (a, b, c), first, second in zip(pairs, telegram_ids[::2], telegram_ids[1::2]):
+            assert await book(session_factory, first, a.isoformat(), b.isoformat()) == "booked"
+            assert await book(session_factory, second, b.isoformat(), c.isoformat()) == "booked"
+        async with session_factory() as session:
+            booking_ids = (await session.execute(select(Booking.id).order_by(Booking.id))).scalars().all()
+
+        # Встречные переносы в каждой паре одновременно: первый во второй слот, второй - в первый
+        moves = []
+        for index, (a, b, c) in enumerate(pairs):
+            first, second = telegram_ids[2 * index], telegram_ids[2 * index + 1]
+            moves.append(reschedule(session_factory, first, booking_ids[2 * index], b, c))
+            moves.append(reschedule(session_factory, second, booking_ids[2 * index + 1], a, b))
+        results = await asyncio.gather(*moves)
+
+        slots, links, _ = await slot_state(session_factory)
+        assert results == ["moved"] * len(moves)
+        assert all(slot.occupied == 1 and links[slot.id] == 1 for slot in slots)
+
+    run_db(scenario)
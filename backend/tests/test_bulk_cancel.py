@@ -0,0 +1,83 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import select
+
+from src.models.db import Booking, TimeSlot, User, UserTimeSlotLink
+from src.models.db.booking_timeslot_link import BookingTimeSlotLink
+from src.repository.crud import BookingCRUDRepository, TimeslotCRUDRepository, UserCRUDRepository
+from src.services.booking import BookingService
+from src.utilities.exceptions import UserUnauthorizedException
+
+SLOT_TIMES = [(time(10, 0), time(10, 30)), (time(10, 30), time(11, 0)), (time(11, 0), time(11, 30))]
+
+
+def make_service(session) -> BookingService:
+    return BookingService(
+        booking_repo=BookingCRUDRepository(async_session=session),
+        timeslot_repo=TimeslotCRUDRepository(async_session=session),
+        user_repo=UserCRUDRepository(async_session=session),
+    )
+
+
+async def seed_bookings(session_factory):
+    async with session_factory() as session:
+        admin = User(telegram_id=6000, first_name="a", second_name="a", age=30, is_admin=True)
+        users = [User(telegram_id=6001 + i, first_name="u", second_name="u", age=20) for i in range(3)]
+        slots = [
+            TimeSlot(date=date.today(), start_time=start, end_time=end, weekday="Monday")
+            for start, end in SLOT_TIMES
+        ]
+        session.add_all([admin] + users + slots)
+        await session.commit()
+
+    # Первые двое бронируют весь интервал, третий - только последний слот
+    async with session_factory() as session:
+        service = make_service(session)
+        today = date.today().isoformat()
+        await service.create_booking(users[0].telegram_id, today, "10:00:00", "11:30:00")
+        await service.create_booking(users[1].telegram_id, today, "10:00:00", "11:30:00")
+        await service.create_booking(users[2].telegram_id, today, "11:00:00", "11:30:00")
+    return admin, users
+
+
+async def counts(session_factory):
+    async with session_factory() as session:
+        occupied = (await session.execute(select(func.sum(TimeSlot.occupied)))).scalar_one()
+        result = [occupied]
+        for model in (Booking, UserTimeSlotLink, BookingTimeSlotLink):
+            result.append((await session.execute(select(func.count()).select_from(model))).scalar_one())
+        return result
+
+
+def test_delete_booking_returns_freed_slots(run_db):
+    async def scenario(session_factory):
+        _, users = await seed_bookings(session_factory)
+        async with session_factory() as session:
+            repo = BookingCRUDRepository(async_session=session)
+            booking = (await session.execute(
+                select(Booking).join(User, User.id == Booking.user_id).where(User.telegram_id == users[0].telegram_id)
+            )).scalar_one()
+            freed = await repo.delete_booking(booking)
+
+        assert len(freed) == len(SLOT_TIMES)
+        assert await counts(session_factory) == [4, 2, 4, 4]
+
+    run_db(scenario)
+
+
+def test_admin_cancels_whole_day(run_db):
+    async def scenario(session_factory):
+        admin, users = await seed_bookings(session_factory)
+        async with session_factory() as session:
+            with pytest.raises(UserUnauthorizedException):
+                await make_service(session).cancel_bookings_for_day(users[0].telegram_id, date.today())
+
+        async with session_factory() as session:
+            result = await make_service(session).cancel_bookings_for_day(admin.telegram_id, date.today())
+
+        assert result == {"cancelled": 3, "freed_slots": 7}
+        assert await counts(session_factory) == [0, 0, 0, 0]
+
+    run_db(scenario)
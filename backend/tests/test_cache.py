@@ -0,0 +1,239 @@
+import asyncio
+import os
+from datetime import date, time
+
+from src.services import TimeslotService
+from src.services.availability import (
+    DaySlot, day_availability_cache, day_loads, decode_day, encode_day, invalidate_days,
+)
+import pytest
+
+from src.utilities import cache as cache_module
+from src.utilities.cache import MemoryCacheBackend, RedisCacheBackend, TTLCache
+from src.utilities.single_flight import SingleFlight
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" становится самым свежим
+    cache.set("c", 3)  # вытесняет "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (2, 1, 1, 2)
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.utilities.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("day", "state")
+    now[0] += 6
+
+    assert cache.get("day") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_stale_load_is_dropped_after_invalidation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate("day")  # запись произошла, пока значение читалось из базы
+    cache.set("day", "stale", generation=generation)
+
+    assert cache.get("day") is None
+
+
+def test_memory_versions_change_when_cached_data_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    backend = MemoryCacheBackend(namespace="test-day", ttl=30)
+
+    async def versions():
+        return await backend.get_versions("2025-01-01")
+
+    first = asyncio.run(versions())
+    now[0] += 10
+    assert asyncio.run(versions()) == first
+    # Изменение из другого процесса не увеличивает локальный счётчик, но через TTL версия всё равно меняется
+    now[0] += 30
+    assert asyncio.run(versions()) != first
+
+
+@pytest.mark.skipif(not os.getenv("TEST_REDIS_URL"), reason="TEST_REDIS_URL не задан")
+def test_stale_load_from_other_worker_is_dropped_after_invalidation():
+    def backend():
+        return RedisCacheBackend(
+            namespace="test-user", encode=str.encode, decode=bytes.decode,
+            redis_url=os.environ["TEST_REDIS_URL"], maxsize=10, ttl=60,
+        )
+
+    async def scenario():
+        first, second = backend(), backend()
+        try:
+            await first.clear()
+            generation = await first.load_generation()
+            # Второй воркер изменил пользователя, пока первый читал его из базы
+            await second.invalidate("1")
+            await first.set("1", "stale", generation=generation)
+            assert await second.get("1") is None
+
+            generation = await first.load_generation()
+            await first.set("1", "fresh", generation=generation)
+            assert await second.get("1") == "fresh"
+        finally:
+            await first.stop()
+            await second.stop()
+
+    asyncio.run(scenario())
+
+
+
+def test_memory_fill_lock_serializes_overlapping_keys():
+    cache = MemoryCacheBackend(namespace="test-lock", maxsize=10, ttl=60)
+    order = []
+
+    async def fill(name, *keys):
+        async with cache.fill_lock(*keys):
+            order.append(f"{name}+")
+            await asyncio.sleep(0.01)
+            order.append(f"{name}-")
+
+    async def scenario():
+        # Наборы ключей пересекаются в обратном порядке: блокировки берутся по порядку, взаимного ожидания нет
+        await asyncio.gather(fill("a", "d1", "d2"), fill("b", "d2", "d1"), fill("c", "d3"))
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=1))
+    assert order.index("a-") < order.index("b+") or order.index("b-") < order.index("a+")
+    assert order.index("c+") < max(order.index("a-"), order.index("b-"))
+    assert cache._locks == {}
+
+
+@pytest.mark.skipif(not os.getenv("TEST_REDIS_URL"), reason="TEST_REDIS_URL не задан")
+def test_redis_fill_lock_waiter_wakes_on_release():
+    def backend():
+        return RedisCacheBackend(
+            namespace="test-lock", encode=str.encode, decode=bytes.decode,
+            redis_url=os.environ["TEST_REDIS_URL"], maxsize=10, ttl=60, lock_ttl=3,
+        )
+
+    async def scenario():
+        first, second = backend(), backend()
+        try:
+            await first.clear()
+            released = asyncio.Event()
+
+            async def hold():
+                # Значение не записано (например, пользователя нет в базе) - ожидающий должен проснуться по снятию блокировки
+                async with first.fill_lock("day:1", "day:2"):
+                    await asyncio.sleep(0.2)
+                released.set()
+
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0.05)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            async with second.fill_lock("day:2", "day:3"):
+                assert released.is_set()
+            assert loop.time() - started < 1
+            await holder
+        finally:
+            await first.stop()
+            await second.stop()
+
+    asyncio.run(scenario())
+
+def test_day_state_codec_roundtrip():
+    day = date(2026, 10, 19)
+    slots = (
+        DaySlot(id=1, date=day, start_time=time(8, 0), end_time=time(8, 30), capacity=4, occupied=2,
+                visitors=frozenset({111, 222})),
+        DaySlot(id=2, date=day, start_time=time(8, 30), end_time=time(9, 0), capacity=4, occupied=0,
+                visitors=frozenset()),
+    )
+
+    assert decode_day(encode_day(slots)) == slots
+    assert decode_day(encode_day(())) == ()
+
+
+class CountingTimeslotRepo:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_slot_states(self, start_date, end_date):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return [(1, start_date, time(8, 0), time(8, 30), 4, 1)], [(1, 111)]
+
+
+def test_concurrent_cold_loads_share_one_query():
+    async def scenario():
+        await day_availability_cache.clear()
+        repo = CountingTimeslotRepo()
+        service = TimeslotService(timeslot_repo=repo)
+        day = date(2026, 10, 19)
+        results = await asyncio.gather(*(service.get_day_slots(day) for _ in range(20)))
+        await day_availability_cache.clear()
+        return repo.calls, results
+
+    calls, results = asyncio.run(scenario())
+
+    assert calls == 1
+    assert all(result == results[0] for result in results)
+    assert results[0][0].visitors == frozenset({111})
+
+
+def test_concurrent_loads_share_result_without_cache_and_split_on_invalidation(monkeypatch):
+    # Кэш выключен: раньше ожидающие после блокировки не находили значение в кэше и загружали день заново
+    monkeypatch.setattr(day_availability_cache.local, "ttl", 0)
+
+    async def scenario():
+        await day_availability_cache.clear()
+        repo = CountingTimeslotRepo()
+        service = TimeslotService(timeslot_repo=repo)
+        day = date(2026, 10, 19)
+        before = day_loads.stats()
+        await asyncio.gather(*(service.get_day_slots(day) for _ in range(20)))
+        after = day_loads.stats()
+        assert repo.calls == 1
+        assert after["coalesced"] - before["coalesced"] == 19
+        assert after["executions"] - before["executions"] == 1
+
+        # Запрос, пришедший после инвалидации, не получает результат загрузки, начатой до неё
+        first = asyncio.create_task(service.get_day_slots(day))
+        await asyncio.sleep(0)
+        await invalidate_days([day])
+        await asyncio.gather(first, service.get_day_slots(day))
+        assert repo.calls == 3
+        assert day_loads.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_shares_errors_and_survives_cancelled_leader():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return len(calls)
+
+        results = await asyncio.gather(*(flight.do("k", load) for _ in range(3)), return_exceptions=True)
+        assert [type(result) for result in results] == [RuntimeError] * 3 and len(calls) == 1
+
+        leader = asyncio.create_task(flight.do("k", load))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        # Ожидающий выполняет загрузку сам вместо того, чтобы получить чужую отмену
+        assert await follower == 3
+        assert flight.stats() == {"calls": 5, "executions": 3, "coalesced": 2, "in_flight": 0}
+
+    asyncio.run(scenario())
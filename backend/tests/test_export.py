@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from datetime import date, time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from src.api.dependencies.session import get_async_session
+from src.api.endpoints.bookings import bookings_router, export_bookings
+from src.models.db import Booking, User
+from src.repository.crud import BookingCRUDRepository
+from src.services import export as export_module
+
+
+def test_export_is_admin_only(run_db):
+    async def scenario(session_factory):
+        async with session_factory() as session:
+            session.add_all([
+                User(telegram_id=7000, first_name="a", second_name="a", age=30, is_admin=True),
+                User(telegram_id=7001, first_name="u", second_name="u", age=20, phone_number="+70000000000"),
+            ])
+            await session.commit()
+
+        async def test_session():
+            async with session_factory() as session:
+                yield session
+
+        app = FastAPI()
+        app.include_router(bookings_router, prefix="/bookings")
+        app.dependency_overrides[get_async_session] = test_session
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            params = {"include_users": "true"}
+            assert (await client.get("/bookings/export", params=params)).status_code == 422
+            forbidden = await client.get("/bookings/export", params={**params, "admin_telegram_id": 7001})
+            assert forbidden.status_code == 403
+            assert "+70000000000" not in forbidden.text
+            unknown = await client.get("/bookings/export", params={**params, "admin_telegram_id": 7999})
+            assert unknown.status_code == 401
+
+    run_db(scenario)
+
+
+def test_export_streams_filtered_bookings_as_csv_and_ndjson(run_db, monkeypatch):
+    async def scenario(session_factory):
+        # Выгрузка открывает свою сессию, а не берёт сессию запроса
+        monkeypatch.setattr(export_module, "async_session", session_factory)
+        streamed = []
+        stream_bookings = BookingCRUDRepository.stream_bookings
+
+        def spy_stream_bookings(self, **kwargs):
+            streamed.append(kwargs)
+            return stream_bookings(self, **kwargs)
+
+        monkeypatch.setattr(BookingCRUDRepository, "stream_bookings", spy_stream_bookings)
+
+        async with session_factory() as session:
+            admin = User(telegram_id=7010, first_name="a", second_name="a", age=30, is_admin=True)
+            user = User(telegram_id=7011, first_name="Иван", second_name="Петров", age=20, phone_number="+70000000001")
+            session.add_all([admin, user])
+            await session.flush()
+            session.add_all([
+                Booking(user_id=user.id, date=date(2026, 3, day), start_time=time(hour, 0), end_time=time(hour + 1, 0))
+                for day, hour in ((1, 10), (2, 9), (2, 8), (5, 10))
+            ])
+            await session.commit()
+
+        response = await export_bookings(
+            export_format="csv", from_date=None, to_date=None, telegram_id=None, include_users=False
+        )
+        assert isinstance(response, StreamingResponse)
+
+        async def test_session():
+            async with session_factory() as session:
+                yield session
+
+        app = FastAPI()
+        app.include_router(bookings_router, prefix="/bookings")
+        app.dependency_overrides[get_async_session] = test_session
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            params = {"admin_telegram_id": 7010, "from_date": "2026-03-02", "to_date": "2026-03-05"}
+            response = await client.get("/bookings/export", params=params)
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/csv")
+            assert response.headers["content-disposition"] == 'attachment; filename="bookings.csv"'
+            rows = list(csv.reader(io.StringIO(response.text)))
+            assert rows[0] == ["id", "date", "start_time", "end_time", "telegram_id"]
+            # Брони 1 марта отфильтрованы, остальные - в порядке (date, start_time, id)
+            assert [row[1:] for row in rows[1:]] == [
+                ["2026-03-02", "08:00:00", "09:00:00", "7011"],
+                ["2026-03-02", "09:00:00", "10:00:00", "7011"],
+                ["2026-03-05", "10:00:00", "11:00:00", "7011"],
+            ]
+
+            response = await client.get(
+                "/bookings/export", params={**params, "format": "ndjson", "include_users": "true", "to_date": "2026-03-02"}
+            )
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/x-ndjson"
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert [(line["date"], line["start_time"]) for line in lines] == [
+                ("2026-03-02", "08:00:00"), ("2026-03-02", "09:00:00"),
+            ]
+            assert lines[0]["first_name"] == "Иван" and lines[0]["phone_number"] == "+70000000001"
+            assert set(lines[0]) == {
+                "id", "date", "start_time", "end_time", "telegram_id", "first_name", "second_name", "phone_number", "age",
+            }
+
+        assert [call["with_users"] for call in streamed] == [False, True]
+        assert streamed[1]["to_date"] == date(2026, 3, 2)
+
+    run_db(scenario)
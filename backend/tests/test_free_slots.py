@@ -0,0 +1,186 @@
+import random
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.db import TimeSlot, User, UserTimeSlotLink
+from src.repository.crud import TimeslotCRUDRepository, UserCRUDRepository
+from src.services import BookingService, TimeslotService
+from src.services.availability import DayAvailability, DaySlot
+from src.utilities.exceptions import BookingRequestException
+
+
+def make_slot(slot_id: int, start: time, minutes: int = 30):
+    end = (datetime.combine(date.today(), start) + timedelta(minutes=minutes)).time()
+    return SimpleNamespace(id=slot_id, start_time=start, end_time=end)
+
+
+def test_find_training_slots_requires_consecutive_chain():
+    # 08:00-09:30 подряд, затем разрыв, 10:00-10:30 одиночный, 11:00-12:00 подряд
+    slots = [
+        make_slot(1, time(8, 0)), make_slot(2, time(8, 30)), make_slot(3, time(9, 0)),
+        make_slot(4, time(10, 0)),
+        make_slot(5, time(11, 0)), make_slot(6, time(11, 30)),
+    ]
+    day = DayAvailability(slots, all_free=True)
+
+    assert [s.id for s in day.training_starts(30)] == [1, 2, 3, 4, 5, 6]
+    assert [s.id for s in day.training_starts(60)] == [1, 2, 5]
+    assert [s.id for s in day.training_starts(90)] == [1]
+    assert day.training_starts(120) == []
+
+
+def reference_training_starts(slots, user_id, training_duration, start_time=None):
+    """Прежний поиск проходом по списку: цепочка продолжается, пока конец слота совпадает с началом следующего"""
+    available = [
+        slot for slot in slots
+        if slot.is_available_for(user_id) and (start_time is None or slot.start_time >= start_time)
+    ]
+    result, chain_end, next_start = [], None, None
+    for slot in reversed(available):
+        if slot.end_time != next_start:
+            chain_end = slot.end_time.hour * 60 + slot.end_time.minute
+        next_start = slot.start_time
+        if chain_end - (slot.start_time.hour * 60 + slot.start_time.minute) >= training_duration:
+            result.append(slot)
+    return result[::-1]
+
+
+@pytest.mark.parametrize("slot_minutes", [15, 30, 60])
+def test_bitmap_matches_list_walk_on_random_days(slot_minutes):
+    rng = random.Random(slot_minutes)
+    day = date.today()
+    for _ in range(50):
+        slots = []
+        start = datetime.combine(day, time(6, 0))
+        for slot_id in range(rng.randint(0, 40)):
+            # Разрывы в расписании и изредка слоты двойной длины
+            start += timedelta(minutes=slot_minutes * rng.choice([0, 0, 0, 1, 3]))
+            minutes = slot_minutes * rng.choice([1, 1, 1, 1, 2])
+            if start + timedelta(minutes=minutes) > datetime.combine(day, time(22, 0)):
+                break
+            capacity = rng.randint(1, 4)
+            visitors = frozenset(rng.sample(range(1, 6), rng.randint(0, capacity)))
+            slots.append(DaySlot(
+                id=slot_id, date=day, start_time=start.time(), end_time=(start + timedelta(minutes=minutes)).time(),
+                capacity=capacity, occupied=len(visitors), visitors=visitors,
+            ))
+            start += timedelta(minutes=minutes)
+        availability = DayAvailability(slots)
+        for user_id in (1, 5, None):
+            for duration in (0, 10, slot_minutes, 2 * slot_minutes, 90, 180):
+                start_time = rng.choice([None, time(8, 0), time(9, 10)])
+                expected = reference_training_starts(
+                    slots, user_id if user_id is not None else -1, duration, start_time
+                )
+                assert availability.training_starts(duration, user_id=user_id, start_time=start_time) == expected
+
+
+def reference_select_chain(slots, start_time, end_time):
+    """Прежний выбор цепочки брони проходом по списку: от слота с началом start_time, пока слоты идут встык"""
+    chain = []
+    for slot in slots:
+        if slot.start_time == start_time:
+            chain.append(slot)
+        elif chain:
+            if chain[-1].end_time != slot.start_time:
+                break
+            chain.append(slot)
+        if chain and chain[-1].end_time >= end_time:
+            return chain
+    if not chain:
+        return f"No available slot found starting at {start_time}"
+    return "Requested consecutive slots are not available."
+
+
+@pytest.mark.parametrize("slot_minutes", [15, 30, 60])
+def test_select_chain_matches_list_walk_on_random_days(slot_minutes):
+    rng = random.Random(slot_minutes)
+    day = date.today()
+    for _ in range(50):
+        slots = []
+        start = datetime.combine(day, time(6, 0))
+        for slot_id in range(rng.randint(0, 40)):
+            start += timedelta(minutes=slot_minutes * rng.choice([0, 0, 0, 1, 3]))
+            minutes = slot_minutes * rng.choice([1, 1, 1, 1, 2])
+            if start + timedelta(minutes=minutes) > datetime.combine(day, time(22, 0)):
+                break
+            slots.append(make_slot(slot_id, start.time(), minutes))
+            start += timedelta(minutes=minutes)
+        for _ in range(20):
+            start_time = rng.choice([slot.start_time for slot in slots] + [time(5, 0), time(6, 10)])
+            # Конец брони может попадать внутрь слота: тогда в цепочку входит слот, который его покрывает
+            end = datetime.combine(day, start_time) + timedelta(minutes=rng.choice([10, slot_minutes, 60, 90, 180]))
+            expected = reference_select_chain(slots, start_time, end.time())
+            try:
+                chain = BookingService._select_chain(slots, str(start_time), start_time, end.time())
+            except BookingRequestException as exc:
+                assert str(exc) == expected
+            else:
+                assert chain == expected
+
+
+def test_released_booking_slots_count_as_free_for_reschedule():
+    day = date.today()
+    # Пользователь 1 занимает последние места в 10:00-11:00, слот 11:00-11:30 свободен
+    slots = [
+        DaySlot(id=slot_id, date=day, start_time=start, end_time=end, capacity=1, occupied=occupied, visitors=visitors)
+        for slot_id, start, end, occupied, visitors in [
+            (1, time(10, 0), time(10, 30), 1, frozenset({1})),
+            (2, time(10, 30), time(11, 0), 1, frozenset({1})),
+            (3, time(11, 0), time(11, 30), 0, frozenset()),
+        ]
+    ]
+    availability = DayAvailability(slots)
+
+    assert availability.training_starts(60, user_id=1) == []
+    released = availability.release(1, [1, 2])
+    # Перенос на полчаса позже пересекается с текущей бронью
+    assert [slot.id for slot in released.training_starts(60, user_id=1)] == [1, 2]
+    assert [slot.remaining for slot in released.slots] == [1, 1, 1]
+    # Другим пользователям места переносимой брони не достаются, закэшированный день не меняется
+    assert availability.training_starts(60, user_id=2) == []
+    assert availability.slots == tuple(slots)
+
+
+@pytest.mark.parametrize("training_duration", [30, 60, 90, 120])
+def test_sql_and_python_free_slots_match(run_db, training_duration):
+    async def scenario(session_factory):
+        rng = random.Random(training_duration)
+        day = date.today()
+        async with session_factory() as session:
+            users = [User(telegram_id=1000 + i, first_name="u", second_name="u", age=20) for i in range(5)]
+            session.add_all(users)
+            slots = []
+            for hour in range(8, 18):
+                for minute in (0, 30):
+                    # Пропускаем часть слотов, чтобы в дне были разрывы
+                    if rng.random() < 0.1:
+                        continue
+                    start = time(hour, minute)
+                    end = (datetime.combine(day, start) + timedelta(minutes=30)).time()
+                    slots.append(TimeSlot(date=day, start_time=start, end_time=end, weekday="Monday"))
+            session.add_all(slots)
+            await session.flush()
+            for slot in slots:
+                visitors = rng.sample(users, rng.choice([0, 0, 1, 2, 4]))
+                session.add_all(
+                    UserTimeSlotLink(user_id=user.id, time_slot_id=slot.id, date=slot.date) for user in visitors
+                )
+                slot.occupied = len(visitors)
+            await session.commit()
+
+        async with session_factory() as session:
+            timeslot_repo = TimeslotCRUDRepository(async_session=session)
+            user_repo = UserCRUDRepository(async_session=session)
+            for telegram_id in (1000, 1004):
+                sql_slots = await TimeslotService(timeslot_repo, user_repo, use_sql=True).get_free_slots(
+                    telegram_id=telegram_id, selected_date=day, training_duration=training_duration
+                )
+                python_slots = await TimeslotService(timeslot_repo, user_repo, use_sql=False).get_free_slots(
+                    telegram_id=telegram_id, selected_date=day, training_duration=training_duration
+                )
+                assert [s.id for s in sql_slots] == [s.id for s in python_slots]
+
+    run_db(scenario)
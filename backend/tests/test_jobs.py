@@ -0,0 +1,84 @@
+from datetime import date, time, timedelta
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from src.models.db import DailyStats, JobRun, TimeSlot
+from src.repository.crud import JobCRUDRepository
+from src.repository.db import advisory_lock_key
+from src.services import jobs
+from src.services.jobs import Job, JobRunner
+
+
+def test_advisory_lock_key_is_stable_and_signed_64_bit():
+    key = advisory_lock_key("schedule-bot:job:cleanup")
+    assert key == advisory_lock_key("schedule-bot:job:cleanup")
+    assert key != advisory_lock_key("schedule-bot:job:schedule_horizon")
+    assert -2 ** 63 <= key < 2 ** 63
+
+
+def test_jobs_run_once_per_interval_and_record_runs(run_db, monkeypatch):
+    monkeypatch.setattr(jobs, "SCHEDULE_HORIZON_DAYS", 3)
+    monkeypatch.setattr(jobs, "SLOT_RETENTION_DAYS", 2)
+
+    async def broken(session):
+        raise RuntimeError("boom")
+
+    async def scenario(session_factory):
+        today = date.today()
+        async with session_factory() as session:
+            # Прошедшие дни: по два свободных слота и один занятый
+            for days_ago in (5, 4, 1):
+                day = today - timedelta(days=days_ago)
+                session.add(TimeSlot(date=day, start_time=time(8, 0), end_time=time(8, 30), weekday="Monday"))
+                session.add(TimeSlot(date=day, start_time=time(9, 0), end_time=time(9, 30), weekday="Monday"))
+                session.add(TimeSlot(date=day, start_time=time(10, 0), end_time=time(10, 30), weekday="Monday",
+                                     occupied=1))
+            await session.commit()
+
+        horizon = Job("schedule_horizon", 3600, jobs.extend_schedule_horizon)
+        rollup = Job("daily_stats_rollup", 3600, jobs.roll_up_daily_stats)
+        cleanup = Job("cleanup", 3600, jobs.clean_up_past_data)
+        failing = Job("broken", 3600, broken)
+        runner = JobRunner([horizon, rollup, cleanup, failing], session_factory=session_factory)
+
+        assert await runner.run_job(horizon) == "success"
+        # Задача уже выполнена в этом интервале (неважно, каким экземпляром) - повторно не запускается
+        assert await runner.run_job(horizon) is None
+        assert (horizon.runs, horizon.skipped) == (1, 1)
+
+        # Очистка до подсчёта итогов ничего не удаляет
+        assert await runner.run_job(cleanup) == "success"
+        assert await runner.run_job(rollup) == "success"
+        assert await runner.run_job(cleanup, force=True) == "success"
+        assert await runner.run_job(failing) == "failed"
+        assert await runner.run_job(failing) == "failed"
+
+        async with session_factory() as session:
+            stats = (await session.execute(select(DailyStats).order_by(DailyStats.date))).scalars().all()
+            assert [(row.date, row.slots, row.occupied) for row in stats] == [
+                (today - timedelta(days=days_ago), 3, 1) for days_ago in (5, 4, 1)
+            ]
+            past = (await session.execute(
+                select(TimeSlot.date, func.count()).where(TimeSlot.date < today).group_by(TimeSlot.date)
+            )).all()
+            # Свободные слоты старше двух дней удалены, занятые и недавние остались
+            assert sorted(past) == [
+                (today - timedelta(days=5), 1), (today - timedelta(days=4), 1), (today - timedelta(days=1), 3),
+            ]
+            assert (await session.execute(
+                select(func.count()).select_from(TimeSlot).where(TimeSlot.date >= today)
+            )).scalar_one() == 60
+
+            runs = await JobCRUDRepository(async_session=session).get_runs()
+            assert len(runs) == 6
+            assert {run.job: run.status for run in runs}["broken"] == "failed"
+            assert all(run.duration_ms >= 0 and run.instance == jobs.INSTANCE for run in runs)
+            assert runs[0].details == "RuntimeError: boom"
+            assert (await session.execute(
+                select(func.count()).select_from(JobRun).where(JobRun.status == "failed")
+            )).scalar_one() == 2
+
+        assert runner.stats()["jobs"]["broken"]["failures"] == 2
+
+    run_db(scenario)
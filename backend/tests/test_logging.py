@@ -0,0 +1,42 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.main import log_requests
+from src.utilities.log_config import JsonFormatter, TextFormatter
+
+
+def test_text_format_keeps_extra_fields():
+    record = logging.makeLogRecord({
+        "name": "access", "levelname": "INFO", "msg": "request",
+        "method": "GET", "path": "/api/slots/", "status": 200, "duration_ms": 1.5,
+    })
+
+    line = TextFormatter().format(record)
+    assert line.endswith("request method=GET path=/api/slots/ status=200 duration_ms=1.5")
+    assert '"duration_ms": 1.5' in JsonFormatter().format(record)
+
+
+def test_streaming_response_is_timed_until_body_is_sent(caplog):
+    app = FastAPI()
+    app.middleware("http")(log_requests)
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for chunk in (b"a", b"b"):
+                await asyncio.sleep(0.1)
+                yield chunk
+
+        return StreamingResponse(chunks())
+
+    with caplog.at_level(logging.INFO, logger="access"):
+        response = TestClient(app).get("/stream")
+
+    assert response.content == b"ab"
+    records = [record for record in caplog.records if record.name == "access"]
+    assert len(records) == 1
+    assert records[0].status == 200 and records[0].duration_ms >= 200
@@ -0,0 +1,16 @@
+from datetime import date, time
+
+import pytest
+
+from src.utilities.pagination import decode_booking_cursor, encode_booking_cursor
+
+
+def test_booking_cursor_roundtrip():
+    key = (date(2025, 3, 1), time(9, 30), 42)
+    assert decode_booking_cursor(encode_booking_cursor(*key)) == key
+
+
+@pytest.mark.parametrize("cursor", ["", "zzz", encode_booking_cursor(date(2025, 3, 1), time(9, 30), 1)[:-3]])
+def test_invalid_booking_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_booking_cursor(cursor)
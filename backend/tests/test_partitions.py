@@ -0,0 +1,222 @@
+import asyncio
+import os
+import re
+from datetime import date, time, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.db import Booking, TimeSlot, User, UserTimeSlotLink
+from src.models.db.booking_timeslot_link import BookingTimeSlotLink
+from src.repository import db as db_module
+from src.repository.crud import (
+    BookingCRUDRepository,
+    PartitionCRUDRepository,
+    ScheduleCRUDRepository,
+    TimeslotCRUDRepository,
+    UserCRUDRepository,
+)
+from src.repository.crud.partition import add_months, month_start, partition_name
+from src.services.booking import BookingService
+from src.services.jobs import maintain_partitions
+from src.services.schedule import ScheduleService
+from src.utilities.exceptions import ScheduleOutOfRangeException
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "src" / "repository" / "migrations"
+
+
+def test_month_arithmetic_and_partition_names():
+    assert month_start(date(2026, 10, 18)) == date(2026, 10, 1)
+    assert add_months(date(2026, 10, 1), 3) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 1, 1), -13) == date(2024, 12, 1)
+    assert partition_name("usertimeslotlink", date(2027, 1, 1)) == "usertimeslotlink_p2027_01"
+
+
+def test_links_carry_slot_date_across_reschedule(run_db):
+    async def scenario(session_factory):
+        today = date.today()
+        # Перенос на другой месяц: в Postgres связи и бронь переезжают в другие секции
+        next_month = add_months(month_start(today), 1)
+        async with session_factory() as session:
+            session.add(User(telegram_id=8000, first_name="u", second_name="u", age=20))
+            session.add_all(
+                TimeSlot(date=day, start_time=start, end_time=end, weekday="Monday")
+                for day in (today, next_month)
+                for start, end in ((time(10, 0), time(10, 30)), (time(10, 30), time(11, 0)))
+            )
+            await session.commit()
+
+        async with session_factory() as session:
+            service = BookingService(
+                booking_repo=BookingCRUDRepository(async_session=session),
+                timeslot_repo=TimeslotCRUDRepository(async_session=session),
+                user_repo=UserCRUDRepository(async_session=session),
+            )
+            booking = await service.create_booking(8000, today.isoformat(), "10:00:00", "11:00:00")
+            await service.reschedule_booking(8000, booking.id, next_month.isoformat(), "10:30:00", "11:00:00")
+
+        async with session_factory() as session:
+            booking = (await session.execute(select(Booking))).scalar_one()
+            assert booking.date == next_month
+            for model in (UserTimeSlotLink, BookingTimeSlotLink):
+                rows = (await session.execute(
+                    select(model.date, TimeSlot.date, TimeSlot.start_time)
+                    .join(TimeSlot, TimeSlot.id == model.time_slot_id)
+                )).all()
+                assert rows == [(next_month, next_month, time(10, 30))]
+            # Таблицы из SQLModel.metadata.create_all не секционированы - обслуживать нечего
+            assert await maintain_partitions(session) == {"partitioned": False}
+
+    run_db(scenario)
+
+
+async def reset_schema(url: str) -> None:
+    engine = db_module.create_engine(url)
+    try:
+        async with engine.begin() as conn:
+            for statement in ("DROP SCHEMA IF EXISTS archive CASCADE", "DROP SCHEMA public CASCADE",
+                              "CREATE SCHEMA public"):
+                await conn.execute(text(statement))
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+def migrated_db(monkeypatch):
+    """
+    Схема, построенная миграциями (секционированные таблицы с составными внешними ключами), а не create_all.
+    Только Postgres; схема public тестовой базы пересоздаётся до и после теста
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url or not url.startswith("postgresql"):
+        pytest.skip("Нужен TEST_DATABASE_URL с Postgres")
+    from alembic import command
+    from alembic.config import Config
+
+    asyncio.run(reset_schema(url))
+    # env.py берёт адрес базы из DATABASE_URL приложения
+    monkeypatch.setattr(db_module, "DB_URL", url)
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    command.upgrade(config, "head")
+
+    def runner(scenario):
+        async def main():
+            engine = db_module.create_engine(url)
+            try:
+                return await scenario(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    yield runner
+    asyncio.run(reset_schema(url))
+
+
+def test_migrated_partitions_keep_links_consistent(migrated_db):
+    async def scenario(session_factory):
+        today = date.today()
+        next_month = add_months(month_start(today), 1)
+        async with session_factory() as session:
+            assert await PartitionCRUDRepository(async_session=session).is_partitioned()
+            session.add(User(telegram_id=8100, first_name="u", second_name="u", age=20))
+            session.add_all(
+                TimeSlot(date=day, start_time=start, end_time=end, weekday="Monday")
+                for day in (today, next_month)
+                for start, end in ((time(10, 0), time(10, 30)), (time(10, 30), time(11, 0)))
+            )
+            await session.commit()
+
+        # Перенос в другой месяц: бронь переезжает в другую секцию, связи пересоздаются с новой датой
+        async with session_factory() as session:
+            service = BookingService(
+                booking_repo=BookingCRUDRepository(async_session=session),
+                timeslot_repo=TimeslotCRUDRepository(async_session=session),
+                user_repo=UserCRUDRepository(async_session=session),
+            )
+            booking = await service.create_booking(8100, today.isoformat(), "10:00:00", "11:00:00")
+            await service.reschedule_booking(8100, booking.id, next_month.isoformat(), "10:00:00", "11:00:00")
+
+        async with session_factory() as session:
+            booking = (await session.execute(select(Booking))).scalar_one()
+            assert booking.date == next_month
+            rows = (await session.execute(
+                select(BookingTimeSlotLink.date, TimeSlot.date)
+                .join(TimeSlot, TimeSlot.id == BookingTimeSlotLink.time_slot_id)
+            )).all()
+            assert rows == [(next_month, next_month)] * 2
+            slot = (await session.execute(select(TimeSlot).where(TimeSlot.date == today))).scalars().first()
+
+        # Составной внешний ключ (time_slot_id, date) не даёт связи разойтись с датой слота
+        async with session_factory() as session:
+            user = (await session.execute(select(User))).scalar_one()
+            session.add(UserTimeSlotLink(user_id=user.id, time_slot_id=slot.id, date=next_month))
+            with pytest.raises(IntegrityError):
+                await session.commit()
+
+    migrated_db(scenario)
+
+
+def test_schedule_outside_partitions_is_rejected(migrated_db):
+    async def scenario(session_factory):
+        async with session_factory() as session:
+            service = ScheduleService(schedule_repo=ScheduleCRUDRepository(async_session=session))
+            far_day = add_months(month_start(date.today()), 20)
+            with pytest.raises(ScheduleOutOfRangeException):
+                await service.generate(start_date=far_day, days=1)
+            with pytest.raises(ScheduleOutOfRangeException):
+                await service.set_day(far_day, closed=True)
+            assert (await service.generate(days=3)).created > 0
+            assert (await maintain_partitions(session))["created"] == []
+
+    migrated_db(scenario)
+
+
+def test_slot_statements_touch_one_partition(migrated_db):
+    async def scenario(session_factory):
+        today = date.today()
+        async with session_factory() as session:
+            session.add(User(telegram_id=8200, first_name="u", second_name="u", age=20))
+            session.add_all([
+                TimeSlot(date=today, start_time=time(10, 0), end_time=time(10, 30), weekday="Monday"),
+                TimeSlot(date=today, start_time=time(10, 30), end_time=time(11, 0), weekday="Monday"),
+            ])
+            await session.commit()
+
+        # Запоминаем запросы к timeslot во время брони и отмены, затем смотрим их планы
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if "timeslot" in statement and statement.lstrip().startswith(("UPDATE", "SELECT timeslot.id")):
+                statements.append((statement, parameters))
+
+        async with session_factory() as session:
+            sync_engine = (await session.connection()).engine.sync_engine
+            event.listen(sync_engine, "before_cursor_execute", capture)
+            try:
+                booking_repo = BookingCRUDRepository(async_session=session)
+                service = BookingService(
+                    booking_repo=booking_repo,
+                    timeslot_repo=TimeslotCRUDRepository(async_session=session),
+                    user_repo=UserCRUDRepository(async_session=session),
+                )
+                booking = await service.create_booking(8200, today.isoformat(), "10:00:00", "11:00:00")
+                await booking_repo.delete_booking(booking)
+            finally:
+                event.remove(sync_engine, "before_cursor_execute", capture)
+
+        assert statements
+        async with session_factory() as session:
+            connection = await session.connection()
+            for statement, parameters in statements:
+                plan = "\n".join((await connection.exec_driver_sql("EXPLAIN " + statement, parameters)).scalars())
+                assert set(re.findall(r"timeslot_p\d{4}_\d{2}", plan)) == {partition_name("timeslot", today)}, plan
+
+    migrated_db(scenario)
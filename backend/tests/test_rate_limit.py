@@ -0,0 +1,107 @@
+import asyncio
+import importlib
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.dependencies import rate_limit
+from src.api.dependencies.rate_limit import get_ip_rate_limit
+from src.main import http_exception_handler
+from src.utilities.rate_limit import MemoryRateLimiter, RateLimit, parse_rate_limit
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+# Имя rate_limit в пакете dependencies занято одноимённой зависимостью
+rate_limit_module = importlib.import_module("src.api.dependencies.rate_limit")
+
+
+def test_parse_rate_limit():
+    assert parse_rate_limit("20/10") == RateLimit(requests=20, seconds=10)
+    assert parse_rate_limit("5") == RateLimit(requests=5, seconds=1)
+    assert parse_rate_limit("off") is None and parse_rate_limit("0") is None
+    with pytest.raises(ValueError):
+        parse_rate_limit("5/0")
+
+
+def test_token_bucket_refills_at_rate_and_evicts_idle_keys():
+    now = [100.0]
+    limiter = MemoryRateLimiter(maxsize=2, clock=lambda: now[0])
+    limit = RateLimit(requests=3, seconds=6)  # один токен в 2 секунды
+
+    async def hits(key, count):
+        return [await limiter.hit("slots", key, limit) for _ in range(count)]
+
+    async def scenario():
+        assert await hits("user:1", 3) == [0, 0, 0]
+        assert await hits("user:1", 1) == [pytest.approx(2.0)]
+        # Отдельная корзина у каждого ключа
+        assert await hits("user:2", 1) == [0]
+        now[0] += 1
+        assert await hits("user:1", 1) == [pytest.approx(1.0)]
+        now[0] += 1
+        assert await hits("user:1", 2) == [0, pytest.approx(2.0)]
+        # Запас не накапливается сверх requests
+        now[0] += 60
+        assert await hits("user:1", 4) == [0, 0, 0, pytest.approx(2.0)]
+        # Третий ключ вытесняет дольше всех не использованный user:2
+        await hits("user:3", 1)
+        assert "slots:user:2" not in limiter._buckets
+
+    asyncio.run(scenario())
+    assert limiter.stats()["buckets"] == 2
+    assert limiter.stats()["limited"]["slots"] == 4
+
+
+def test_route_answers_429_with_retry_after_per_user(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_TEST_ROUTE", "2/60")
+    app = FastAPI()
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+
+    @app.post("/limited", dependencies=[Depends(rate_limit("test_route"))])
+    async def limited(payload: dict):
+        return {"ok": True}
+
+    client = TestClient(app)
+    body = {"user": {"telegram_id": 501}}
+    assert [client.post("/limited", json=body).status_code for _ in range(2)] == [200, 200]
+    response = client.post("/limited", json=body)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    # Другой пользователь и запрос без telegram_id (ключ - IP клиента) ограничиваются отдельно
+    assert client.post("/limited", json={"user": {"telegram_id": 502}}).status_code == 200
+    assert client.post("/limited", json={}).status_code == 200
+
+
+def ip_limited_client(name: str) -> TestClient:
+    app = FastAPI()
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+
+    @app.post("/limited", dependencies=[Depends(rate_limit(name))])
+    async def limited(payload: dict):
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def post_as_users(client: TestClient, first_id: int, count: int):
+    return [client.post("/limited", json={"user": {"telegram_id": first_id + i}}).status_code for i in range(count)]
+
+
+def test_many_users_behind_one_ip_are_limited_per_user(monkeypatch):
+    # Бот или общий прокси: все пользователи приходят с одного адреса, лимит на IP по умолчанию выключен
+    monkeypatch.setenv("RATE_LIMIT_TEST_SHARED_ROUTE", "1/60")
+    assert get_ip_rate_limit("test_shared_route") is None
+    assert post_as_users(ip_limited_client("test_shared_route"), 700, 50) == [200] * 50
+
+
+def test_rotating_telegram_ids_hit_the_opt_in_ip_bucket(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_TEST_IP_ROUTE", "1/60")
+    monkeypatch.setenv("RATE_LIMIT_TEST_IP_ROUTE_IP", "3/60")
+    assert post_as_users(ip_limited_client("test_ip_route"), 600, 4) == [200, 200, 200, 429]
+    # Доверенный адрес (TestClient ходит с "testclient") с корзины IP не списывается
+    monkeypatch.setattr(rate_limit_module, "RATE_LIMIT_TRUSTED_IPS", frozenset({"testclient"}))
+    assert post_as_users(ip_limited_client("test_ip_route"), 650, 4) == [200] * 4
+    # Вместо явного RATE_LIMIT_<ИМЯ>_IP - лимит маршрута, умноженный на RATE_LIMIT_IP_MULTIPLIER
+    monkeypatch.delenv("RATE_LIMIT_TEST_IP_ROUTE_IP")
+    monkeypatch.setattr(rate_limit_module, "RATE_LIMIT_IP_MULTIPLIER", 5)
+    assert get_ip_rate_limit("test_ip_route") == RateLimit(requests=5, seconds=60)
@@ -0,0 +1,81 @@
+import asyncio
+import os
+from datetime import date, time
+
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.db import TimeSlot
+from src.repository import routing
+from src.repository.db import create_engine
+from src.repository.routing import (
+    RoutingSession, mark_written, reads_from_replica, route_reads, use_primary, user_write_key, written_recently,
+)
+
+
+def count_statements(engine):
+    """Счётчик SQL-запросов, выполненных через движок"""
+    counter = {"statements": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(*args):
+        counter["statements"] += 1
+
+    return counter
+
+
+def test_reads_go_to_replica_until_first_write(run_db):
+    async def scenario(session_factory):
+        primary = session_factory.kw["bind"]
+        # Без настоящей реплики её заменяет второй движок на ту же базу
+        replica = create_engine(
+            os.getenv("TEST_REPLICA_DATABASE_URL") or primary.url.render_as_string(hide_password=False)
+        )
+        try:
+            factory = async_sessionmaker(
+                primary, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+            )
+            primary_count, replica_count = count_statements(primary), count_statements(replica)
+            today = date.today()
+
+            async with factory() as session:
+                route_reads(session, replica)
+                assert (await session.execute(select(TimeSlot))).all() == []
+                assert (replica_count["statements"], primary_count["statements"]) == (1, 0)
+
+                session.add(TimeSlot(date=today, start_time=time(10, 0), end_time=time(10, 30), weekday="Monday"))
+                await session.flush()
+                assert not reads_from_replica(session)
+                # После записи сессия читает основную базу и видит свою незакоммиченную строку
+                assert len((await session.execute(select(TimeSlot))).all()) == 1
+                assert replica_count["statements"] == 1
+                await session.commit()
+
+            async with factory() as session:
+                route_reads(session, replica)
+                await session.execute(update(TimeSlot).values(occupied=1))
+                assert (await session.execute(select(TimeSlot.occupied))).scalar_one() == 1
+                assert replica_count["statements"] == 1
+                await session.commit()
+
+            async with factory() as session:
+                route_reads(session, replica)
+                use_primary(session)
+                await session.execute(select(TimeSlot))
+                assert replica_count["statements"] == 1
+        finally:
+            await replica.dispose()
+
+    run_db(scenario)
+
+
+def test_recent_writes_are_tracked_per_key():
+    async def scenario():
+        await routing.recent_writes.clear()
+        await mark_written(user_write_key(42))
+        assert await written_recently(user_write_key(7), user_write_key(42))
+        assert not await written_recently(user_write_key(7))
+
+    asyncio.run(scenario())
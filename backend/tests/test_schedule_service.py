@@ -0,0 +1,73 @@
+from datetime import date, time, timedelta
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from src.models.db import TimeSlot, User, UserTimeSlotLink
+from src.repository.crud import ScheduleCRUDRepository
+from src.services.schedule import DayInterval, ScheduleService, build_day_slots, day_fingerprint
+
+
+def test_build_day_slots_covers_intervals():
+    day = date(2026, 10, 19)
+    rows = build_day_slots(day, [DayInterval(time(8, 0), time(18, 0), 30)])
+
+    assert len(rows) == 20
+    assert (rows[0]["start_time"], rows[-1]["end_time"]) == (time(8, 0), time(18, 0))
+    assert {row["weekday"] for row in rows} == {"Monday"}
+    # Неполный слот в конце интервала не создаётся, интервалы с перерывом идут по порядку
+    rows = build_day_slots(day, [DayInterval(time(14, 0), time(15, 0), 60), DayInterval(time(8, 0), time(9, 40), 30)])
+    assert [row["start_time"] for row in rows] == [time(8, 0), time(8, 30), time(9, 0), time(14, 0)]
+    assert day_fingerprint(()) != day_fingerprint([DayInterval(time(8, 0), time(18, 0))])
+
+
+async def count_slots(session, day=None):
+    query = select(func.count()).select_from(TimeSlot)
+    if day is not None:
+        query = query.where(TimeSlot.date == day)
+    return (await session.execute(query)).scalar_one()
+
+
+def test_generate_is_idempotent_and_incremental(run_db):
+    async def scenario(session_factory):
+        start = date.today()
+        holiday = start + timedelta(days=10)
+        async with session_factory() as session:
+            # Часть слотов уже есть в базе
+            session.add(TimeSlot(date=start, start_time=time(8, 0), end_time=time(8, 30), weekday="Monday"))
+            await session.commit()
+
+        async with session_factory() as session:
+            service = ScheduleService(schedule_repo=ScheduleCRUDRepository(async_session=session))
+            first = await service.generate(start_date=start, days=60)
+            second = await service.generate(start_date=start, days=60)
+            assert (first.changed_days, first.candidates, first.created) == (60, 1200, 1199)
+            assert (second.changed_days, second.created) == (0, 0)
+            assert await count_slots(session) == 1200
+
+            # В праздник кто-то уже записан: его слот остаётся, остальные удаляются, другие дни не трогаются
+            user = User(telegram_id=4000, first_name="u", second_name="u", age=20)
+            session.add(user)
+            booked = (await session.execute(
+                select(TimeSlot).where(TimeSlot.date == holiday, TimeSlot.start_time == time(10, 0))
+            )).scalar_one()
+            booked.occupied = 1
+            await session.flush()
+            session.add(UserTimeSlotLink(user_id=user.id, time_slot_id=booked.id, date=holiday))
+            await session.commit()
+
+            closed = await service.set_day(holiday, closed=True, reason="Праздник")
+            assert (closed.changed_days, closed.removed, closed.kept) == (1, 19, 1)
+            assert await count_slots(session, holiday) == 1
+
+            # Короткий день вместо закрытия: только 10:00-12:00
+            short = await service.set_day(holiday, [DayInterval(time(10, 0), time(12, 0), 30, 2)])
+            assert (short.changed_days, short.created, short.updated) == (1, 3, 1)
+            assert await count_slots(session, holiday) == 4
+
+            # Возврат к недельному расписанию и повторная развёртка горизонта: меняется только праздник
+            await service.reset_day(holiday)
+            assert await count_slots(session, holiday) == 20
+            assert (await service.generate(start_date=start, days=60)).changed_days == 0
+
+    run_db(scenario)
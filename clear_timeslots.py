@@ -1,14 +1,28 @@
 import asyncio
-from backend.src.repository.db import async_session
+import sys
+import os
+
+# Добавляем путь к backend в sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from src.repository.db import async_session, init_engine
+from src.services.availability import day_availability_cache
+from src.utilities.cache import stop_caches
 from sqlalchemy import text
 
 async def clear_timeslots():
     print('Очистка всех бронирований и связей с таймслотами...')
+    init_engine()
     async with async_session() as session:
         await session.execute(text('DELETE FROM bookingtimeslotlink'))
         await session.execute(text('DELETE FROM usertimeslotlink'))
         await session.execute(text('DELETE FROM booking'))
+        # Счётчики занятых мест обнуляем в той же транзакции, иначе слоты останутся "занятыми"
+        await session.execute(text('UPDATE timeslot SET occupied = 0 WHERE occupied <> 0'))
         await session.commit()
+    # Сбрасываем кэш доступности и версии ETag всех дней (до API доходит при CACHE_BACKEND=redis)
+    await day_availability_cache.clear()
+    await stop_caches()
     print('Очистка завершена.')
 
 if __name__ == '__main__':
@@ -1,7 +1,18 @@
 import asyncio
 import sys
-from backend.src.repository.db import async_session
-from sqlalchemy import text
+import os
+from collections import defaultdict
+
+# Добавляем путь к backend в sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from src.repository.db import async_session, init_engine
+from src.repository.crud import BookingCRUDRepository, TimeslotCRUDRepository
+from src.repository.crud.user import user_cache
+from src.services.availability import bump_user_bookings_version, invalidate_days
+from src.utilities.cache import stop_caches
+from src.models.db import UserTimeSlotLink
+from sqlalchemy import delete, text
 
 async def delete_user(telegram_id: int):
     """
@@ -12,6 +23,7 @@ async def delete_user(telegram_id: int):
     """
     print(f'Удаление пользователя с Telegram ID: {telegram_id}')
 
+    init_engine()
     async with async_session() as session:
         try:
             # Проверяем существование пользователя
@@ -28,23 +40,32 @@ async def delete_user(telegram_id: int):
             user_id = user.id
             print(f'✅ Найден пользователь: {user.first_name} {user.second_name}')
 
-            # Удаляем все связи пользователя с таймслотами
-            print('Удаление связей пользователя с таймслотами...')
-            await session.execute(
-                text('DELETE FROM usertimeslotlink WHERE user_id = :user_id'),
-                {'user_id': user_id}
-            )
-
-            # Удаляем все бронирования пользователя
+            # Удаляем бронирования пользователя через репозиторий: он же уменьшает счётчики occupied у слотов
             print('Удаление бронирований пользователя...')
-            await session.execute(
-                text('DELETE FROM bookingtimeslotlink WHERE booking_id IN (SELECT id FROM booking WHERE user_id = :user_id)'),
+            result = await session.execute(
+                text('SELECT id, date FROM booking WHERE user_id = :user_id'),
                 {'user_id': user_id}
             )
-            await session.execute(
-                text('DELETE FROM booking WHERE user_id = :user_id'),
-                {'user_id': user_id}
+            bookings = result.all()
+            deleted, _ = await BookingCRUDRepository(async_session=session).delete_bookings(
+                [row.id for row in bookings], [row.date for row in bookings]
+            )
+            changed_days = {booking_date for _, _, booking_date in deleted}
+
+            # Удаляем оставшиеся связи пользователя с таймслотами (не относящиеся к броням) и освобождаем места
+            print('Удаление связей пользователя с таймслотами...')
+            result = await session.execute(
+                delete(UserTimeSlotLink)
+                .where(UserTimeSlotLink.user_id == user_id)
+                .returning(UserTimeSlotLink.time_slot_id, UserTimeSlotLink.date)
             )
+            slots_by_date = defaultdict(list)
+            for slot_id, slot_date in result.all():
+                slots_by_date[slot_date].append(slot_id)
+            timeslot_repo = TimeslotCRUDRepository(async_session=session)
+            for slot_date, slot_ids in sorted(slots_by_date.items()):
+                await timeslot_repo.change_occupancy(slot_ids, -1, slot_date)
+            changed_days.update(slots_by_date)
 
             # Удаляем самого пользователя
             print('Удаление пользователя...')
@@ -54,6 +75,12 @@ async def delete_user(telegram_id: int):
             )
 
             await session.commit()
+            # Сбрасываем пользователя в кэше, иначе API ещё USER_CACHE_TTL секунд будет его аутентифицировать.
+            # До API инвалидация доходит через общий кэш (CACHE_BACKEND=redis)
+            await user_cache.invalidate(str(telegram_id))
+            # Освобождённые места: сбрасываем кэш доступности дней и версии ETag
+            await invalidate_days(changed_days)
+            await bump_user_bookings_version(telegram_id)
             print(f'✅ Пользователь {user.first_name} {user.second_name} успешно удален')
             return True
 
@@ -61,6 +88,8 @@ async def delete_user(telegram_id: int):
             await session.rollback()
             print(f'❌ Ошибка при удалении пользователя: {e}')
             return False
+        finally:
+            await stop_caches()
 
 async def list_users():
     """Выводит список всех пользователей в базе данных"""
@@ -69,6 +98,7 @@ async def list_users():
     print(f'{"ID":<5} {"Telegram ID":<12} {"Имя":<15} {"Фамилия":<15} {"Возраст":<8} {"Админ":<6}')
     print('-' * 80)
 
+    init_engine()
     async with async_session() as session:
         try:
             result = await session.execute(
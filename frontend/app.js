@@ -41,6 +41,10 @@ let currentStep = 1;
 let registrationData = {};
 
 // Вспомогательная функция для API запросов с детальным логированием и таймаутами
+// Последние ответы GET-запросов с ETag: url -> { etag, body, headers }
+const etagCache = new Map();
+const ETAG_CACHE_LIMIT = 100;
+
 async function apiRequest(url, options = {}) {
     const defaultOptions = {
         method: 'GET',
@@ -65,6 +69,12 @@ async function apiRequest(url, options = {}) {
         }
     };
 
+    const isGet = mergedOptions.method.toUpperCase() === 'GET';
+    const cached = isGet ? etagCache.get(url) : undefined;
+    if (cached) {
+        mergedOptions.headers['If-None-Match'] = cached.etag;
+    }
+
     try {
         // Добавляем таймаут 10 секунд
         const timeoutPromise = new Promise((_, reject) => {
@@ -73,7 +83,22 @@ async function apiRequest(url, options = {}) {
 
         const fetchPromise = fetch(url, mergedOptions);
         const response = await Promise.race([fetchPromise, timeoutPromise]);
-        
+
+        // Данные не изменились - отдаём сохранённое тело как обычный ответ
+        if (response.status === 304 && cached) {
+            return new Response(cached.body, { status: 200, headers: cached.headers });
+        }
+
+        const etag = response.headers.get('ETag');
+        if (isGet && response.ok && etag) {
+            const body = await response.clone().text();
+            etagCache.delete(url);
+            etagCache.set(url, { etag, body, headers: { 'Content-Type': response.headers.get('Content-Type') || 'application/json' } });
+            if (etagCache.size > ETAG_CACHE_LIMIT) {
+                etagCache.delete(etagCache.keys().next().value);
+            }
+        }
+
         return response;
 
     } catch (error) {
@@ -787,7 +812,7 @@ async function loadAvailableDays() {
     try {
         console.log('Loading available days...');
 
-        const response = await apiRequest(`${API_BASE_URL}/slots/available-days`);
+        const response = await apiRequest(`${API_BASE_URL}/slots/available-days?telegram_id=${currentUser.id}`);
 
         if (!response.ok) {
             const errorText = await response.text();
@@ -904,7 +929,9 @@ async function loadAvailableTimes(day) {
     try {
         console.log(`Loading available times for day: ${day}`);
 
-        const response = await apiRequest(`${API_BASE_URL}/slots/?selected_date=${day}&telegram_id=${currentUser.id}`);
+        // При переносе слоты переносимой брони считаются свободными
+        const excludeParam = window.rescheduleBookingId ? `&exclude_booking_id=${window.rescheduleBookingId}` : '';
+        const response = await apiRequest(`${API_BASE_URL}/slots/?selected_date=${day}&telegram_id=${currentUser.id}${excludeParam}`);
         const data = await response.json();
 
         console.log(`Raw slots data: ${JSON.stringify(data)}`);
@@ -991,29 +1018,6 @@ async function confirmBooking() {
         const calculatedEndTime = endTime.toTimeString().slice(0, 8);
         console.log(`Calculated end time: ${calculatedEndTime}`);
 
-        if (isReschedule) {
-            // Логика переноса: сначала удаляем старое, потом создаем новое
-            console.log('Удаляем старое бронирование...');
-            const deleteResponse = await apiRequest(`${API_BASE_URL}/bookings/${window.rescheduleBookingId}?telegram_id=${currentUser.id}`, {
-                method: 'DELETE'
-            });
-
-            if (!deleteResponse.ok) {
-                showError('Ошибка удаления старого бронирования');
-                return;
-            }
-            
-            console.log('Старое бронирование удалено, обновляем доступные слоты...');
-            
-            // Обновляем доступные дни и времена после удаления
-            await loadAvailableDays();
-            if (selectedDay) {
-                await loadAvailableTimes(selectedDay);
-            }
-            
-            console.log('Создаем новое бронирование...');
-        }
-
         const bookingData = {
             booking: {
                 date: selectedDay,
@@ -1027,8 +1031,12 @@ async function confirmBooking() {
 
         console.log(`Booking data: ${JSON.stringify(bookingData)}`);
 
-        const response = await apiRequest(`${API_BASE_URL}/bookings/`, {
-            method: 'POST',
+        // Перенос выполняется одним запросом: старая бронь сохраняется, если новое время недоступно
+        const url = isReschedule
+            ? `${API_BASE_URL}/bookings/${window.rescheduleBookingId}`
+            : `${API_BASE_URL}/bookings/`;
+        const response = await apiRequest(url, {
+            method: isReschedule ? 'PATCH' : 'POST',
             body: JSON.stringify(bookingData)
         });
 
@@ -1055,7 +1063,7 @@ async function confirmBooking() {
         } else {
             const error = await response.json();
             console.log(`Booking error: ${JSON.stringify(error)}`);
-            showError(error.detail || (isReschedule ? 'Ошибка переноса записи' : 'Ошибка создания записи'));
+            showError(error.message || error.detail || (isReschedule ? 'Ошибка переноса записи' : 'Ошибка создания записи'));
         }
     } catch (error) {
         console.log(`Booking failed: ${error.message}`);
@@ -1206,14 +1214,14 @@ function cancelReschedule() {
 async function loadAdminData() {
     try {
         // Load admin statistics
-        const statsResponse = await apiRequest(`${API_BASE_URL}/bookings/stats`);
+        const statsResponse = await apiRequest(`${API_BASE_URL}/bookings/stats?admin_telegram_id=${currentUser.id}`);
         const stats = await statsResponse.json();
 
         document.getElementById('total-bookings').textContent = stats.total || 0;
         document.getElementById('today-bookings').textContent = stats.today || 0;
 
         // Load all bookings
-        const bookingsResponse = await apiRequest(`${API_BASE_URL}/bookings/all`);
+        const bookingsResponse = await apiRequest(`${API_BASE_URL}/bookings/all?admin_telegram_id=${currentUser.id}`);
         const allBookings = await bookingsResponse.json();
         renderAllBookings(allBookings);
     } catch (error) {
@@ -1228,12 +1236,14 @@ function renderAllBookings(bookings) {
     bookings.forEach(booking => {
         const bookingItem = document.createElement('div');
         bookingItem.className = 'admin-booking-item';
-        bookingItem.innerHTML = `
-            <div class="user-name">${booking.user_name || 'Неизвестный пользователь'}</div>
-            <div class="booking-details">
-                ${formatDayName(booking.day)} - ${formatTime(booking.start_time)} - ${formatTime(booking.end_time)}
-            </div>
-        `;
+        // Имя вводит сам пользователь, поэтому текст вставляется через textContent, а не в разметку
+        const userName = document.createElement('div');
+        userName.className = 'user-name';
+        userName.textContent = booking.user_name || 'Неизвестный пользователь';
+        const bookingDetails = document.createElement('div');
+        bookingDetails.className = 'booking-details';
+        bookingDetails.textContent = `${formatDayName(booking.date)} ${booking.date} - ${formatTime(booking.start_time)} - ${formatTime(booking.end_time)}`;
+        bookingItem.append(userName, bookingDetails);
         allBookingsContainer.appendChild(bookingItem);
     });
 }
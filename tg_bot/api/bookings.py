@@ -3,6 +3,7 @@ from typing import List, Dict, Any
 from datetime import date, datetime, timedelta, time
 # Убираем зависимость от w3lib, используем urllib.parse
 from urllib.parse import urlencode, parse_qs, urlparse, urlunparse
+from .http_cache import get_with_etag
 
 API_BASE_URL = "https://7917e2946164.ngrok-free.app/api"
 
@@ -22,12 +23,18 @@ async def get_bookings_for_day(selected_date: date) -> List[Dict[str, Any]]:
     Получает все записи на конкретный день (для администратора).
     """
     async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_BASE_URL}/bookings",
-                                    params={"booking_date": selected_date.isoformat()})
-        if response.status_code == 200:
-            data = response.json()
-            return data  # Возвращаем список всех записей
-        raise Exception(f"Ошибка получения записей на день: {response.text}")
+        bookings = []
+        params = {"booking_date": selected_date.isoformat(), "limit": 500}
+        # Ответ постраничный: идём по next_cursor, пока страницы не закончатся
+        while True:
+            response = await client.get(f"{API_BASE_URL}/bookings/", params=params)
+            if response.status_code != 200:
+                raise Exception(f"Ошибка получения записей на день: {response.text}")
+            page = response.json()
+            bookings.extend(page["items"])
+            if not page["next_cursor"]:
+                return bookings  # Возвращаем список всех записей
+            params["cursor"] = page["next_cursor"]
 
 
 async def get_bookings_for_user(telegram_id: int) -> List[Dict[str, Any]]:
@@ -36,7 +43,7 @@ async def get_bookings_for_user(telegram_id: int) -> List[Dict[str, Any]]:
     """
     async with httpx.AsyncClient() as client:
         # Используем новый эндпоинт с telegram_id в пути
-        response = await client.get(f"{API_BASE_URL}/bookings/user/{telegram_id}")
+        response = await get_with_etag(client, f"{API_BASE_URL}/bookings/user/{telegram_id}")
         if response.status_code == 200:
             data = response.json()
             return data  # Возвращаем список всех записей
@@ -60,3 +67,19 @@ async def book_slots(start_time: str, end_time: str, selected_day: str, user_id:
             raise Exception(f"Ошибка 404: маршрут не найден. Проверьте URL: {url}")
         else:
             raise Exception(f"Ошибка записи на слоты: {response.text}")
+
+
+async def reschedule_booking(booking_id: int, start_time: str, end_time: str, selected_day: str,
+                             user_id: int) -> Dict[str, Any]:
+    """
+    Переносит запись на другое время одним запросом. Если новое время недоступно, старая запись остаётся.
+    """
+    async with httpx.AsyncClient() as client:
+        payload = {"booking": {"date": selected_day, "start_time": start_time, "end_time": end_time},
+                   "user": {"telegram_id": user_id}}
+
+        response = await client.patch(f"{API_BASE_URL}/bookings/{booking_id}", json=payload)
+
+        if response.status_code == 200:
+            return response.json()
+        raise Exception(f"Ошибка переноса записи: {response.text}")
@@ -0,0 +1,34 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+# URL запроса -> (ETag, тело ответа, заголовки) последнего успешного ответа
+_MAX_ENTRIES = 256
+_responses: "OrderedDict[str, Tuple[str, bytes, Dict[str, str]]]" = OrderedDict()
+
+
+async def get_with_etag(client: httpx.AsyncClient, url: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+    """
+    GET-запрос с If-None-Match. Если сервер ответил 304, возвращает сохранённый ответ
+    со статусом 200, чтобы вызывающий код не отличал его от обычного.
+    """
+    key = str(httpx.URL(url, params=params))
+    headers = {}
+    cached = _responses.get(key)
+    if cached:
+        headers["If-None-Match"] = cached[0]
+
+    response = await client.get(url, params=params, headers=headers)
+
+    if response.status_code == 304 and cached:
+        _responses.move_to_end(key)
+        return httpx.Response(200, content=cached[1], headers=cached[2], request=response.request)
+
+    etag = response.headers.get("etag")
+    if response.status_code == 200 and etag:
+        _responses[key] = (etag, response.content, dict(response.headers))
+        _responses.move_to_end(key)
+        while len(_responses) > _MAX_ENTRIES:
+            _responses.popitem(last=False)
+    return response
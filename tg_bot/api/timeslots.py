@@ -1,6 +1,7 @@
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import date, datetime, timedelta
+from .http_cache import get_with_etag
 
 API_BASE_URL = "https://7917e2946164.ngrok-free.app/api"  # Замените на ваш реальный URL API
 
@@ -10,7 +11,8 @@ async def get_free_days(current_date: date = date.today(), telegram_id: Optional
     Получает все свободные дни для бронирования.
     """
     async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_BASE_URL}/slots/available-days")
+        params = {"telegram_id": telegram_id} if telegram_id is not None else {}
+        response = await get_with_etag(client, f"{API_BASE_URL}/slots/available-days", params=params)
         if response.status_code == 200:
             data = response.json()
             return data.get("available_days", [])
@@ -23,9 +25,26 @@ async def get_available_slots(selected_date: str, telegram_id: int) -> List[Dict
     Получает все доступные временные промежутки на выбранный день.
     """
     async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_BASE_URL}/slots",
-                                    params={"selected_date": selected_date, "telegram_id": telegram_id})
+        response = await get_with_etag(client, f"{API_BASE_URL}/slots/",
+                                       params={"selected_date": selected_date, "telegram_id": telegram_id})
         if response.status_code == 200:
             data = response.json()
             return data.get("available_periods", []) # Список доступных временных промежутков
-        raise Exception(f"Ошибка получения доступных слотов: {response.text}")
\ No newline at end of file
+        raise Exception(f"Ошибка получения доступных слотов: {response.text}")
+
+
+async def get_available_slots_compact(selected_date: str, telegram_id: int,
+                                      exclude_booking_id: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """
+    Получает доступные слоты на выбранный день в компактном виде:
+    (начало в минутах от полуночи, длительность в минутах, свободных мест).
+    exclude_booking_id - переносимая бронь: её слоты показываются как свободные.
+    """
+    params = {"selected_date": selected_date, "telegram_id": telegram_id, "view": "compact"}
+    if exclude_booking_id is not None:
+        params["exclude_booking_id"] = exclude_booking_id
+    async with httpx.AsyncClient() as client:
+        response = await get_with_etag(client, f"{API_BASE_URL}/slots/", params=params)
+        if response.status_code == 200:
+            return [tuple(slot) for slot in response.json().get("slots", [])]
+        raise Exception(f"Ошибка получения доступных слотов: {response.text}")
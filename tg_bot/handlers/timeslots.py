@@ -2,11 +2,13 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from keyboards.days_keyboard import get_days_keyboard
 from keyboards.time_keyboard import get_time_keyboard
 from keyboards.user_bookings_keyboard import get_user_bookings_keyboard
-from api.timeslots import get_free_days, get_available_slots
+from api.timeslots import get_free_days, get_available_slots, get_available_slots_compact
 from api.bookings import book_slots, get_bookings_for_user
-from api.bookings import delete_booking
+from api.bookings import delete_booking, reschedule_booking as reschedule_booking_request
 from helpers import *
+from states import RescheduleStates
 from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
 from datetime import datetime, timedelta, time
 
 router = Router()
@@ -15,11 +17,13 @@ logger = logging.getLogger('SuperBot')
 
 
 @router.callback_query(F.data == "choose_day")
-async def choose_day_callback(callback: CallbackQuery):
+async def choose_day_callback(callback: CallbackQuery, state: FSMContext):
     """
     Хендлер для callback-запроса на кнопку «Выбрать день».
     Отправляет клавиатуру с доступными днями недели.
     """
+    # Новая запись: незавершённый перенос больше не актуален
+    await state.clear()
     try:
         telegram_id = callback.from_user.id
         # Получаем доступные дни через API
@@ -58,15 +62,20 @@ async def get_user_bookings(callback: CallbackQuery):
 
 
 @router.callback_query(lambda c: c.data.startswith("DAY_"))
-async def choose_time_callback(callback: CallbackQuery):
+async def choose_time_callback(callback: CallbackQuery, state: FSMContext):
     """
     Хендлер для выбора времени на основе выбранного дня.
     """
     try:
         selected_day = callback.data.split("_")[1]  # Извлекаем выбранный день из callback_data
         telegram_id = callback.from_user.id
-        # Запрашиваем доступные слоты через API
-        available_slots = await get_available_slots(selected_date=selected_day, telegram_id=telegram_id)
+        # При переносе слоты переносимой записи тоже доступны: можно сдвинуть её, например, на полчаса
+        reschedule_booking_id = (await state.get_data()).get("reschedule_booking_id")
+        # Запрашиваем доступные слоты через API в компактном виде: нужны только начало и длительность
+        available_slots = compact_slots_to_periods(
+            await get_available_slots_compact(selected_date=selected_day, telegram_id=telegram_id,
+                                              exclude_booking_id=reschedule_booking_id)
+        )
         slots_strike = []
         good_start_times = []
         for i in range(len(available_slots) - 1):
@@ -153,10 +162,12 @@ async def confirm_booking_callback(callback: CallbackQuery):
 
 
 @router.callback_query(lambda c: c.data.startswith("CONFIRM_"))
-async def book_slots_callback(callback: CallbackQuery):
+async def book_slots_callback(callback: CallbackQuery, state: FSMContext):
     """
-    Хендлер для бронирования слотов.
+    Хендлер для бронирования слотов. В режиме переноса переносит выбранную ранее запись.
     """
+    data = await state.get_data()
+    reschedule_booking_id = data.get("reschedule_booking_id")
     try:
         data_parts = callback.data.split("_")
         selected_day = data_parts[1]
@@ -176,10 +187,17 @@ async def book_slots_callback(callback: CallbackQuery):
         #     await callback.answer()
         #     return
 
+        end_time = str((datetime.strptime(start_time, "%H:%M:%S") + timedelta(minutes=90)).time())
+        if reschedule_booking_id:
+            await reschedule_booking_request(booking_id=reschedule_booking_id, start_time=start_time,
+                                             end_time=end_time, selected_day=selected_day, user_id=user_id)
+            await state.clear()
+            await callback.message.edit_text(f"Запись #{reschedule_booking_id} перенесена на {selected_day} в {start_time}!")
+            await callback.answer()
+            return
+
         # Пытаемся забронировать слоты
-        result = await book_slots(start_time=start_time,
-                                  end_time=str(
-                                      (datetime.strptime(start_time, "%H:%M:%S") + timedelta(minutes=90)).time()),
+        result = await book_slots(start_time=start_time, end_time=end_time,
                                   selected_day=selected_day, user_id=user_id)
 
         # Сообщаем пользователю о результате
@@ -188,7 +206,10 @@ async def book_slots_callback(callback: CallbackQuery):
         )
         await callback.answer()
     except Exception as e:
-        await callback.message.edit_text("Ошибка при бронировании слотов. Попробуйте снова.")
+        if reschedule_booking_id:
+            await callback.message.edit_text("Не удалось перенести запись, прежнее время сохранено. Попробуйте снова.")
+        else:
+            await callback.message.edit_text("Ошибка при бронировании слотов. Попробуйте снова.")
         await callback.answer()
 
 
@@ -207,6 +228,26 @@ async def cancel_booking(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("RESCHEDULE_"))
-async def reschedule_booking(callback: CallbackQuery):
-    # Перенос работает только в веб-приложении
-    await callback.answer("Для переноса записи используйте веб-приложение", show_alert=True)
+async def reschedule_booking(callback: CallbackQuery, state: FSMContext):
+    """
+    Начинает перенос записи: дальше пользователь выбирает день и время как при обычной записи,
+    а при подтверждении запись переносится одним запросом PATCH /bookings/{id}.
+    """
+    booking_id = int(callback.data.split("_")[1])
+    telegram_id = callback.from_user.id
+    try:
+        available_days = await get_free_days(telegram_id=telegram_id)
+        if not available_days:
+            await callback.answer("Нет доступных дней для переноса.", show_alert=True)
+            return
+
+        await state.set_state(RescheduleStates.choosing_time)
+        await state.update_data(reschedule_booking_id=booking_id)
+        await callback.message.edit_text(
+            f"Перенос записи #{booking_id}. Выберите новый день:",
+            reply_markup=get_days_keyboard(available_days)
+        )
+        await callback.answer()
+    except Exception as e:
+        await callback.answer("Произошла ошибка при получении доступных дней.", show_alert=True)
+        print(f"Ошибка в reschedule_booking: {e}")
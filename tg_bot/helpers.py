@@ -1,6 +1,20 @@
 import logging
 from aiogram import Router
-from typing import List, Dict
+from typing import List, Dict, Tuple
+
+def compact_slots_to_periods(slots: List[Tuple[int, int, int]]) -> List[Dict]:
+    """
+    Переводит компактные слоты API (начало в минутах, длительность, свободных мест)
+    в словари со start_time/end_time в формате 'HH:MM:SS'.
+    """
+    def to_time(minutes: int) -> str:
+        return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+    return [
+        {"start_time": to_time(start), "end_time": to_time(start + duration), "remaining": remaining}
+        for start, duration, remaining in slots
+    ]
+
 
 def extract_start_times_for_training(slots: List[Dict]) -> List[str]:
     """
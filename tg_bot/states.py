@@ -7,3 +7,7 @@ class RegisterStates(StatesGroup):
     phone_number = State()
     age = State()
     confirmation = State()
+
+
+class RescheduleStates(StatesGroup):
+    choosing_time = State()